@@ -4,15 +4,22 @@ Python 2 Verilog
 
 from .api import (
     Modes,
+    RecordPolicy,
     context_to_verilog,
+    get_actual_compiled,
     get_actual_raw,
+    get_actual_raw_interpreted,
+    get_actual_raw_parallel,
+    get_actual_streamed,
     get_context,
     get_expected,
     get_namespace,
     get_original_func,
     namespace_to_file,
     namespace_to_verilog,
+    namespace_to_verilog_parallel,
     new_namespace,
     py_to_verilog,
+    verify_streamed,
     verilogify,
 )
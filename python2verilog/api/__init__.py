@@ -10,13 +10,20 @@ from .namespace import (
     get_namespace,
     namespace_to_file,
     namespace_to_verilog,
+    namespace_to_verilog_parallel,
     new_namespace,
 )
+from .policy import RecordPolicy
 from .python import py_to_codegen, py_to_context, py_to_verilog
 from .verilogify import (
+    get_actual_compiled,
     get_actual_raw,
+    get_actual_raw_interpreted,
+    get_actual_raw_parallel,
+    get_actual_streamed,
     get_context,
     get_expected,
     get_original_func,
+    verify_streamed,
     verilogify,
 )
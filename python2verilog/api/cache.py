@@ -0,0 +1,169 @@
+"""
+Persistent on-disk cache of compiled Verilog
+
+Entries are keyed by a hash of everything the output depends on,
+i.e. the source and options of a context, its callees, the config,
+the env vars that change the output, the source of python2verilog itself,
+and the version of pytohdl, which translates some generators
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Optional
+
+import pytohdl  # pylint: disable=import-error
+
+from python2verilog import ir
+from python2verilog.backend.verilog.config import CodegenConfig
+from python2verilog.utils import env, lru
+from python2verilog.utils.typed import typed_strict
+
+_compiler_digest: Optional[str] = None
+_translator_digest: Optional[str] = None
+
+# Env vars the generated Verilog depends on
+OUTPUT_VARS = (env.Vars.IS_SYSTEM_VERILOG, env.Vars.DEBUG_COMMENTS)
+
+
+def compiler_digest() -> str:
+    """
+    Hash of the python2verilog sources, so entries from other versions are not used
+    """
+    global _compiler_digest  # pylint: disable=global-statement
+    if _compiler_digest is None:
+        digest = hashlib.sha256()
+        package = Path(__file__).parent.parent
+        for path in sorted(package.rglob("*.py")):
+            digest.update(str(path.relative_to(package)).encode())
+            digest.update(path.read_bytes())
+        _compiler_digest = digest.hexdigest()
+    return _compiler_digest
+
+
+def translator_digest() -> str:
+    """
+    Hash of the version and module file of pytohdl,
+    so entries translated by other versions are not used
+    """
+    global _translator_digest  # pylint: disable=global-statement
+    if _translator_digest is None:
+        digest = hashlib.sha256()
+        digest.update(str(getattr(pytohdl, "__version__", None)).encode())
+        path = getattr(pytohdl, "__file__", None)
+        if path:
+            digest.update(Path(path).read_bytes())
+        _translator_digest = digest.hexdigest()
+    return _translator_digest
+
+
+def _context_fields(context: ir.Context, with_test_cases: bool) -> dict[str, Any]:
+    """
+    Fields of a context that the generated Verilog depends on
+    """
+    fields: dict[str, Any] = {
+        "name": context.name,
+        "prefix": context.prefix,
+        "testbench_suffix": context.testbench_suffix,
+        "is_generator": context.is_generator,
+        "py_string": context.py_string,
+        "input_types": [repr(type_) for type_ in context.input_types or []],
+        "output_types": [repr(type_) for type_ in context.output_types or []],
+        "optimization_level": context.optimization_level,
+    }
+    if with_test_cases:
+        fields["test_cases"] = [list(case) for case in context.test_cases]
+    return fields
+
+
+class Cache:
+    """
+    Content-addressed cache of (module, testbench) pairs
+
+    Writes are atomic (write to a temporary file then rename),
+    and the least recently used entries are evicted once the
+    total size of the entries exceeds `max_bytes`
+    """
+
+    SUFFIX = ".json"
+    DEFAULT_MAX_BYTES = lru.DEFAULT_MAX_BYTES
+
+    def __init__(self, directory: Path | str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = Path(directory)
+        self.max_bytes = typed_strict(max_bytes, int)
+
+    @classmethod
+    def from_env(cls) -> Optional[Cache]:
+        """
+        Creates the cache configured by env vars, or None if caching is off
+        """
+        directory = env.get_var(env.Vars.CACHE_DIR)
+        if directory is None:
+            return None
+        if not directory:
+            cache_home = os.getenv("XDG_CACHE_HOME") or Path.home() / ".cache"
+            directory = str(Path(cache_home) / "python2verilog")
+        return cls(directory, lru.max_bytes())
+
+    @staticmethod
+    def key(context: ir.Context, config: CodegenConfig) -> str:
+        """
+        Gets the key of a context's module and testbench
+        """
+        contents = {
+            "compiler": compiler_digest(),
+            "translator": translator_digest(),
+            "context": _context_fields(context, with_test_cases=True),
+            "callees": {
+                name: _context_fields(callee, with_test_cases=False)
+                for name, callee in sorted(context.namespace.items())
+            },
+            "config": repr(config),
+            "env": {var.name: env.get_var(var) for var in OUTPUT_VARS},
+        }
+        return hashlib.sha256(json.dumps(contents, sort_keys=True).encode()).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / (key + self.SUFFIX)
+
+    def get(self, key: str) -> Optional[tuple[str, str]]:
+        """
+        Gets (module, testbench) for key, or None if not cached
+        """
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf8") as file:
+                entry = json.load(file)
+        except (OSError, ValueError):
+            return None
+        lru.touch(path)
+        logging.debug("Cache hit %s", key)
+        return entry["module"], entry["testbench"]
+
+    def put(self, key: str, module: str, testbench: str) -> None:
+        """
+        Stores (module, testbench) for key, then evicts if over the size limit
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        descriptor, temp_path = tempfile.mkstemp(
+            dir=self.directory, suffix=".tmp", prefix=key
+        )
+        try:
+            with os.fdopen(descriptor, mode="w", encoding="utf8") as file:
+                json.dump({"module": module, "testbench": testbench}, file)
+            os.replace(temp_path, self._path(key))
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        self.evict()
+
+    def evict(self) -> None:
+        """
+        Removes least recently used entries until the total size is within limit
+        """
+        lru.evict(self.directory, self.SUFFIX, self.max_bytes)
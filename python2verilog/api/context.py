@@ -4,10 +4,12 @@ Functions that take text as input
 
 
 import logging
+from typing import Optional
 
 import pytohdl  # pylint: disable=import-error
 
 from python2verilog import ir
+from python2verilog.api.cache import Cache
 from python2verilog.backend import verilog
 from python2verilog.backend.verilog.config import CodegenConfig, TestbenchConfig
 from python2verilog.frontend.function import Function
@@ -15,7 +17,7 @@ from python2verilog.optimizer import IncreaseWorkPerClockCycle
 from python2verilog.utils.typed import typed
 
 
-def context_to_codegen(context: ir.Context):
+def context_to_codegen(context: ir.Context, config: Optional[CodegenConfig] = None):
     """
     Converts a context to verilog and its ir
 
@@ -35,17 +37,27 @@ def context_to_codegen(context: ir.Context):
         logging.info("Running %s", IncreaseWorkPerClockCycle.__name__)
         IncreaseWorkPerClockCycle(ir_root, threshold=context.optimization_level - 1)
     logging.info("Running %s", verilog.CodeGen.__name__)
-    return verilog.CodeGen(ir_root, context), ir_root
+    return verilog.CodeGen(ir_root, context, config), ir_root
 
 
 def context_to_verilog(context: ir.Context, config: CodegenConfig) -> tuple[str, str]:
     """
     Converts a context to a verilog module and testbench
 
+    Uses the on-disk cache if it is enabled by env var
+
     :return: (module, testbench)
     """
     typed(context, ir.Context)
-    ver_code_gen, _ = context_to_codegen(context)
+
+    cache = Cache.from_env()
+    if cache:
+        key = cache.key(context, config)
+        cached = cache.get(key)
+        if cached:
+            return cached
+
+    ver_code_gen, _ = context_to_codegen(context, config)
 
     # Filter for generators and contexts that do not reference other contexts
     if context.is_generator and context.optimization_level == 0:
@@ -63,6 +75,8 @@ def context_to_verilog(context: ir.Context, config: CodegenConfig) -> tuple[str,
         module_str = ver_code_gen.get_module_str()
 
     tb_str = ver_code_gen.get_testbench_str(config)
+    if cache:
+        cache.put(key, module_str, tb_str)
     return module_str, tb_str
 
 
@@ -7,7 +7,7 @@ from __future__ import annotations
 from typing import Any, Callable
 
 from python2verilog.api.file_namespaces import _file_namespaces
-from python2verilog.api.namespace import namespace_to_file
+from python2verilog.api.namespace import conversion_pool, namespace_to_file
 from python2verilog.utils import env
 
 try:
@@ -41,6 +41,14 @@ def __namespace_exit_handler():
 def namespace_exit_handler():
     """
     Handles the conversions in each namespace for program exit
+
+    If enabled by env var, all namespaces are converted in one process pool
     """
-    for stem, namespace in _file_namespaces.items():
-        namespace_to_file(stem, namespace)
+    processes = env.get_var(env.Vars.PARALLEL_CONVERSION)
+    if processes is None:
+        for stem, namespace in _file_namespaces.items():
+            namespace_to_file(stem, namespace)
+        return
+    with conversion_pool(int(processes) if processes else None) as pool:
+        for stem, namespace in _file_namespaces.items():
+            namespace_to_file(stem, namespace, pool=pool)
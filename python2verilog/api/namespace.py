@@ -4,14 +4,24 @@ Handles namespaces
 
 from __future__ import annotations
 
+import hashlib
+import json
+import logging
+import multiprocessing
+from multiprocessing.pool import Pool
 from pathlib import Path
 from typing import Optional
 
 from python2verilog import ir
+from python2verilog.api.cache import Cache
 from python2verilog.api.context import context_to_verilog
 from python2verilog.api.file_namespaces import _file_namespaces
 from python2verilog.api.modes import Modes
 from python2verilog.backend.verilog.config import CodegenConfig
+from python2verilog.utils import env
+
+# Suffix of the manifest written with the files of a namespace
+MANIFEST_SUFFIX = ".manifest.json"
 
 
 def get_namespace(path: Path | str) -> dict[str, ir.Context]:
@@ -49,22 +59,52 @@ def new_namespace(path: Path | str) -> dict[str, ir.Context]:
     return get_namespace(namespace)
 
 
+def conversion_pool(processes: Optional[int] = None) -> Pool:
+    """
+    Process pool to convert contexts in
+
+    Workers are forked where the platform supports it,
+    as spawned workers re-import the main module,
+    which converts again if it calls verilogify outside of
+    an `if __name__ == "__main__":` guard.
+    Where only spawn is available, e.g. on Windows, such a guard is required.
+
+    :param processes: number of worker processes, defaults to cpu count
+    """
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork").Pool(processes)
+    return multiprocessing.Pool(processes)
+
+
 def namespace_to_file(
-    path: Path, namespace: dict[str, ir.Context], config: Optional[CodegenConfig] = None
+    path: Path,
+    namespace: dict[str, ir.Context],
+    config: Optional[CodegenConfig] = None,
+    pool: Optional[Pool] = None,
 ) -> tuple[str, str]:
     """
     Writes modules and testbenches files
 
+    Converts in worker processes if given a pool or enabled by env var.
+
+    When overwriting, only contexts that changed since the files were last written
+    are converted, see `_read_manifest`, and unchanged files are not written
+
+    The files are not streamed, as the cache, the manifest and the return value
+    need the output of each context as a string,
+    see `CodeGen.write_module` and `CodeGen.write_testbench` to stream a context
+
     :return: (modules, testbenches) for convenience
     """
     if not config:
         config = CodegenConfig()
 
-    module, testbench = namespace_to_verilog(namespace, config)
-
     if all(map(lambda ns: ns.mode == Modes.OVERWRITE, namespace.values())):
-        mode = "w"
-    elif all(map(lambda ns: Modes.write(ns.mode), namespace.values())):
+        return _namespace_to_file_incremental(path, namespace, config, pool)
+
+    module, testbench = _join(_convert(namespace, config, pool))
+
+    if all(map(lambda ns: Modes.write(ns.mode), namespace.values())):
         mode = "x"
     else:
         return module, testbench
@@ -77,6 +117,148 @@ def namespace_to_file(
     return module, testbench
 
 
+def _namespace_to_file_incremental(
+    path: Path,
+    namespace: dict[str, ir.Context],
+    config: CodegenConfig,
+    pool: Optional[Pool],
+) -> tuple[str, str]:
+    """
+    Overwrites modules and testbenches files,
+    reusing the output of contexts whose key is unchanged since the last write
+
+    :return: (modules, testbenches)
+    """
+    keys = {name: Cache.key(context, config) for name, context in namespace.items()}
+    old_files = _read_manifest(path)
+    previous = _previous_outputs(old_files) if old_files else {}
+
+    changed = {
+        name: context
+        for name, context in namespace.items()
+        if (name, keys[name]) not in previous
+    }
+    logging.info("Converting %s of %s in %s", list(changed), list(namespace), path)
+    converted = dict(zip(changed, _convert(changed, config, pool)))
+    results = [
+        converted[name] if name in converted else previous[(name, keys[name])]
+        for name in namespace
+    ]
+    module, testbench = _join(results)
+
+    _write_if_changed(str(path) + ".sv", module, old_files[1] if old_files else None)
+    _write_if_changed(
+        str(path) + "_tb.sv", testbench, old_files[2] if old_files else None
+    )
+    manifest = {
+        "module": _digest(module),
+        "testbench": _digest(testbench),
+        "contexts": [
+            [name, keys[name], len(mod), len(tb)]
+            for name, (mod, tb) in zip(namespace, results)
+        ],
+    }
+    _write_if_changed(str(path) + MANIFEST_SUFFIX, json.dumps(manifest))
+    return module, testbench
+
+
+def _previous_outputs(
+    old_files: tuple[list[tuple[str, str, int, int]], str, str]
+) -> dict[tuple[str, str], tuple[str, str]]:
+    """
+    Slices the files of the previous write into the output of each context
+
+    :param old_files: (entries, module, testbench), see `_read_manifest`
+    :return: (name, key) -> (module, testbench)
+    """
+    entries, old_module, old_testbench = old_files
+    previous: dict[tuple[str, str], tuple[str, str]] = {}
+    module_start = testbench_start = 0
+    for name, key, module_length, testbench_length in entries:
+        module_end = module_start + module_length
+        testbench_end = testbench_start + testbench_length
+        previous[(name, key)] = (
+            old_module[module_start:module_end],
+            old_testbench[testbench_start:testbench_end],
+        )
+        module_start, testbench_start = module_end, testbench_end
+    return previous
+
+
+def _write_if_changed(path: str, text: str, old_text: Optional[str] = None):
+    """
+    Writes a file, unless it already has the text
+
+    :param old_text: text of the file, read from the file if None
+    """
+    if old_text is None:
+        try:
+            with open(path, encoding="utf8") as file:
+                old_text = file.read()
+        except OSError:
+            pass
+    if text != old_text:
+        with open(path, mode="w", encoding="utf8") as file:
+            file.write(text)
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def _read_manifest(
+    path: Path,
+) -> Optional[tuple[list[tuple[str, str, int, int]], str, str]]:
+    """
+    Reads the manifest written with the files of a namespace,
+    i.e. the (name, key, module length, testbench length) of each context,
+    in the order of their output in the files
+
+    :return: (entries, module, testbench),
+        or None if missing or the files were modified since
+    """
+    try:
+        with open(str(path) + MANIFEST_SUFFIX, encoding="utf8") as file:
+            manifest = json.load(file)
+        with open(str(path) + ".sv", encoding="utf8") as file:
+            module = file.read()
+        with open(str(path) + "_tb.sv", encoding="utf8") as file:
+            testbench = file.read()
+    except (OSError, ValueError):
+        return None
+    if manifest.get("module") != _digest(module) or manifest.get(
+        "testbench"
+    ) != _digest(testbench):
+        logging.info("Files of %s were modified, converting all", path)
+        return None
+    return [tuple(entry) for entry in manifest["contexts"]], module, testbench
+
+
+def _convert(
+    namespace: dict[str, ir.Context],
+    config: CodegenConfig,
+    pool: Optional[Pool],
+) -> list[tuple[str, str]]:
+    """
+    Converts each context, in worker processes if given a pool or enabled by env var
+
+    :return: [(module, testbench), ...] in the order of the namespace
+    """
+    processes = env.get_var(env.Vars.PARALLEL_CONVERSION)
+    if pool or processes is not None:
+        return _convert_parallel(
+            namespace, config, int(processes) if processes else None, pool
+        )
+    return [context_to_verilog(context, config) for context in namespace.values()]
+
+
+def _join(results: list[tuple[str, str]]) -> tuple[str, str]:
+    return (
+        "".join(module for module, _ in results),
+        "".join(testbench for _, testbench in results),
+    )
+
+
 def namespace_to_verilog(
     namespace: dict[str, ir.Context], config: Optional[CodegenConfig] = None
 ) -> tuple[str, str]:
@@ -94,3 +276,46 @@ def namespace_to_verilog(
         module.append(mod)
         testbench.append(tb)
     return "".join(module), "".join(testbench)
+
+
+def namespace_to_verilog_parallel(
+    namespace: dict[str, ir.Context],
+    config: Optional[CodegenConfig] = None,
+    processes: Optional[int] = None,
+    pool: Optional[Pool] = None,
+) -> tuple[str, str]:
+    """
+    Namespace to modules and testbenches str,
+    with each context converted in a process pool
+
+    The output is identical to `namespace_to_verilog`.
+    Uses a multiprocessing pool, as unlike concurrent.futures,
+    it can be used at program exit
+
+    :param processes: number of worker processes, defaults to cpu count
+    :param pool: pool to convert in, instead of creating one
+    :return: (modules, testbenches)
+    """
+    if not config:
+        config = CodegenConfig()
+    return _join(_convert_parallel(namespace, config, processes, pool))
+
+
+def _convert_parallel(
+    namespace: dict[str, ir.Context],
+    config: CodegenConfig,
+    processes: Optional[int],
+    pool: Optional[Pool],
+) -> list[tuple[str, str]]:
+    """
+    :return: [(module, testbench), ...] in the order of the namespace
+    """
+    if len(namespace) <= 1 and pool is None:
+        return [context_to_verilog(context, config) for context in namespace.values()]
+
+    memo: dict[int, ir.Context] = {}
+    jobs = [(context.portable(memo), config) for context in namespace.values()]
+    if pool:
+        return pool.starmap(context_to_verilog, jobs)
+    with conversion_pool(processes) as new_pool:
+        return new_pool.starmap(context_to_verilog, jobs)
@@ -0,0 +1,119 @@
+"""
+Policies for what verilogified functions record and check when called
+"""
+
+from __future__ import annotations
+
+import random
+from dataclasses import dataclass
+from typing import Optional
+
+from python2verilog.utils.typed import guard, typed_strict
+
+
+@dataclass(frozen=True)
+class RecordPolicy:
+    """
+    Configurations for calls to verilogified functions
+    """
+
+    # Maximum number of recorded test cases,
+    # once full, a uniform sample of the calls is kept (reservoir sampling).
+    # None for no limit
+    max_test_cases: Optional[int] = None
+
+    # Probability of a call being considered for recording
+    sample_rate: float = 1.0
+
+    # Do not record a test case that is already recorded
+    dedupe: bool = False
+
+    # Number of yielded (or returned) values type checked across all calls,
+    # None to check every value
+    checked_outputs: Optional[int] = None
+
+    # Maximum number of values a generator may yield per call, None for no limit
+    max_yields: Optional[int] = 10000
+
+    # Seed for sampling
+    seed: Optional[int] = None
+
+    def __post_init__(self):
+        assert 0.0 <= self.sample_rate <= 1.0, f"Invalid {self.sample_rate=}"
+        for value in (self.max_test_cases, self.checked_outputs, self.max_yields):
+            assert value is None or (guard(value, int) and value >= 0)
+
+    @classmethod
+    def production(cls, max_test_cases: int = 64) -> RecordPolicy:
+        """
+        Policy for functions called from production code,
+        keeps a bounded sample of distinct test cases
+        and only checks types of the first output
+        """
+        return cls(
+            max_test_cases=max_test_cases,
+            dedupe=True,
+            checked_outputs=1,
+            max_yields=None,
+        )
+
+
+class TestCaseRecorder:
+    """
+    Records test cases of a context according to a policy
+    """
+
+    def __init__(self, policy: RecordPolicy):
+        self.policy = typed_strict(policy, RecordPolicy)
+        self.recorded: set[tuple[int, ...]] = set()
+        self.seen = 0
+        self.checked = 0
+        self.rng = random.Random(policy.seed)
+
+    def record(self, test_cases: list[tuple[int, ...]], args: tuple[int, ...]) -> bool:
+        """
+        Records test case
+
+        :param test_cases: recorded test cases, modified in-place
+        :return: True if args were added to the test cases
+        """
+        policy = self.policy
+        if policy.sample_rate < 1.0 and self.rng.random() >= policy.sample_rate:
+            return False
+        if policy.dedupe and args in self.recorded:
+            return False
+
+        self.seen += 1
+        if policy.max_test_cases is None or len(test_cases) < policy.max_test_cases:
+            test_cases.append(args)
+        else:
+            index = self.rng.randrange(self.seen)
+            if index >= policy.max_test_cases:
+                return False
+            self.recorded.discard(test_cases[index])
+            test_cases[index] = args
+
+        if policy.dedupe:
+            self.recorded.add(args)
+        return True
+
+    def should_check(self) -> bool:
+        """
+        Returns if the next output should be type checked
+        """
+        if self.policy.checked_outputs is None:
+            return True
+        if self.checked < self.policy.checked_outputs:
+            self.checked += 1
+            return True
+        return False
+
+    @property
+    def exhausted(self) -> bool:
+        """
+        True if no more outputs will be type checked
+        """
+        return (
+            self.policy.checked_outputs is not None
+            and self.checked >= self.policy.checked_outputs
+        )
@@ -4,12 +4,12 @@ Decorators
 
 from __future__ import annotations
 
-import ast
-import copy
 import inspect
 import logging
-import textwrap
+import os
+import sys
 import warnings
+from concurrent.futures import ProcessPoolExecutor
 from functools import wraps
 from types import FunctionType
 from typing import Iterator, Optional, Union, cast
@@ -19,9 +19,19 @@ import __main__ as main
 from python2verilog import ir
 from python2verilog.api.modes import Modes
 from python2verilog.api.namespace import get_namespace
+from python2verilog.api.policy import RecordPolicy, TestCaseRecorder
+from python2verilog.backend.verilog.config import TestbenchConfig
 from python2verilog.exceptions import StaticTypingError
-from python2verilog.simulation import iverilog
-from python2verilog.simulation.display import parse_stdout, strip_ready, strip_valid
+from python2verilog.simulation import iverilog, pool
+from python2verilog.simulation.csim import CSimulator
+from python2verilog.simulation.display import (
+    parse_stdout,
+    strip_ready,
+    strip_records,
+    strip_valid,
+)
+from python2verilog.simulation.interpreter import Interpreter
+from python2verilog.simulation.verify import compare_records
 from python2verilog.utils.decorator import decorator_with_args
 from python2verilog.utils.fifo import temp_fifo
 from python2verilog.utils.typed import guard, guard_dict, typed
@@ -34,13 +44,17 @@ def verilogify(
     namespace: Optional[dict[str, ir.Context]] = None,
     optimization_level: int = 1,
     mode: Modes = Modes.OVERWRITE,
+    policy: Optional[RecordPolicy] = None,
 ):
     """
     :param namespace: the namespace to put this function, for linking purposes
     :param mode: if WRITE or OVERWRITE, files will be written to the specified paths
+    :param policy: what calls record and check, see `RecordPolicy.production`
+        for functions called from production code
     """
     typed(func, FunctionType)
     guard(mode, Modes)
+    typed(policy, RecordPolicy)
 
     if not hasattr(main, "__file__") and namespace is None:
         # No way to query caller filename in IPython / Jupyter notebook
@@ -49,38 +63,49 @@ def verilogify(
             f" is required in IPython / Jupyter notebook instances"
         )
 
-    # Get caller filename for default output paths
-    # .stack()[2] as this function uses a decorator, so the first frames' filename
-    # is the filename that contains that decorator
-    filename = inspect.stack()[2].filename
-
     if namespace is None:
+        # Get caller filename for default output paths
+        # Frame 2 as this function uses a decorator, so the first frames' filename
+        # is the filename that contains that decorator.
+        # Only the code object is read, unlike inspect.stack()
+        frame = sys._getframe(2)  # pylint: disable=protected-access
+        filename = frame.f_code.co_filename
         namespace = get_namespace(filename)
     guard_dict(namespace, str, ir.Context)  # type: ignore[misc]
 
-    tree = ast.parse(textwrap.dedent(inspect.getsource(func)))
-    assert len(tree.body) == 1
-    func_ast = tree.body[0]
-    assert isinstance(
-        func_ast, ast.FunctionDef
-    ), f"Got {type(func_ast)} expected {ast.FunctionDef}"
-
+    # Source and ast are retrieved by the context on first conversion
     context = ir.Context(name=func.__name__)
-    context.py_ast = func_ast
     context.py_func = func
-    context.py_string = inspect.getsource(func)
 
-    for name in func_ast.args.args:
-        assert not name.arg.startswith(
+    code = func.__code__
+    arg_names = code.co_varnames[: code.co_argcount]
+    for name in arg_names:
+        assert not name.startswith(
             "_"
-        ), f'Parameter beginning with "_" are reserved {name.arg}'
-    context.input_vars = [ir.Var(name.arg) for name in func_ast.args.args]
+        ), f'Parameter beginning with "_" are reserved {name}'
+    context.input_vars = [ir.Var(name) for name in arg_names]
 
     context.mode = mode
     context.optimization_level = optimization_level
 
     context.namespace = namespace
 
+    recorder = TestCaseRecorder(policy if policy else RecordPolicy())
+
+    def tuplefy_yielded(either: Union[int, tuple[int]]) -> tuple[int]:
+        """
+        Converts int to tuple, otherwise returns input
+        """
+        if isinstance(either, int):
+            ret = (either,)
+        elif isinstance(either, tuple):
+            ret = either
+        else:
+            raise StaticTypingError(
+                f"Unexpected yielded value `{either}` from `{func.__name__}`"
+            )
+        return ret
+
     @wraps(func)
     def generator_wrapper(*args, **kwargs):
         nonlocal context
@@ -89,37 +114,27 @@ def verilogify(
                 "Keyword arguments not yet supported, use positional arguments only"
             )
 
-        context.test_cases.append(args)
-
         # Input inference
         if not context.input_types:
+            recorder.record(context.test_cases, args)
             context.input_types = [type(arg) for arg in args]
             for val in context.input_types:
                 assert val == int, f"Unexpected {val} as a input type"
-        else:
+        elif recorder.record(context.test_cases, args):
             context.check_input_types(args)
 
-        def tuplefy(either: Union[int, tuple[int]]) -> tuple[int]:
-            """
-            Converts int to tuple, otherwise returns input
-            """
-            if isinstance(either, int):
-                ret = (either,)
-            elif isinstance(either, tuple):
-                ret = either
-            else:
-                raise StaticTypingError(
-                    f"Unexpected yielded value `{either}` from `{func.__name__}`"
-                )
-            return ret
+        max_yields = recorder.policy.max_yields
+        if context.output_types and recorder.exhausted and max_yields is None:
+            # Nothing left to infer, check or limit
+            return func(*args)
 
         # Always get output one-ahead of what func user sees
         # For output type inference even if user doesn't use generator
         instance = func(*args)
         try:
             result = cast(Union[int, tuple[int]], next(instance))
-            tupled_result = tuplefy(result)
             if not context.output_types:
+                tupled_result = tuplefy_yielded(result)
                 logging.info(
                     "Using input `%s` as reference for %s's I/O types",
                     tupled_result,
@@ -131,10 +146,10 @@ def verilogify(
                         val == int
                     ), f"Unexpected {val} as a output type {list(map(type, tupled_result))}"
                 context.default_output_vars()
-            else:
-                context.check_output_types(tupled_result)
+            elif recorder.should_check():
+                context.check_output_types(tuplefy_yielded(result))
         except StopIteration:
-            pass
+            return instance
         except Exception as e:
             raise e
 
@@ -142,18 +157,36 @@ def verilogify(
         def inside():
             nonlocal result
             for i, new_result in enumerate(instance):
-                tupled_new_result = tuplefy(new_result)
-                context.check_output_types(tupled_new_result)
+                if recorder.should_check():
+                    context.check_output_types(tuplefy_yielded(new_result))
                 yield result
                 result = new_result
-                if i > 10000:
+                if max_yields is not None and i > max_yields:
                     raise RuntimeError(
-                        f"`{func.__name__}` yields more than 10000 values"
+                        f"`{func.__name__}` yields more than {max_yields} values"
                     )
             yield result
 
         return inside()
 
+    def tuplefy_returned(either: Union[int, tuple[int]]) -> tuple[int]:
+        """
+        Converts int to tuple, otherwise returns input
+        """
+        if isinstance(either, int):
+            ret = (either,)
+        else:
+            ret = either
+
+        for value in ret:
+            try:
+                assert guard(value, int)
+            except Exception as e:
+                raise StaticTypingError(
+                    f"Expected `int` type inputs and outputs for `{func.__name__}`"
+                ) from e
+        return ret
+
     @wraps(func)
     def function_wrapper(*args, **kwargs):
         nonlocal context
@@ -161,38 +194,21 @@ def verilogify(
             warnings.warn(
                 "Keyword arguments not yet supported, use positional arguments only"
             )
-        for arg in args:
-            assert guard(arg, int), "Only `int` type arguments are supported"
-
-        context.test_cases.append(args)
 
         # Input inference
         if not context.input_types:
+            for arg in args:
+                assert guard(arg, int), "Only `int` type arguments are supported"
+            recorder.record(context.test_cases, args)
             context.input_types = [type(arg) for arg in args]
-        else:
+        elif recorder.record(context.test_cases, args):
+            for arg in args:
+                assert guard(arg, int), "Only `int` type arguments are supported"
             context.check_input_types(args)
 
-        def tuplefy(either: Union[int, tuple[int]]) -> tuple[int]:
-            """
-            Converts int to tuple, otherwise returns input
-            """
-            if isinstance(either, int):
-                ret = (either,)
-            else:
-                ret = either
-
-            for value in ret:
-                try:
-                    assert guard(value, int)
-                except Exception as e:
-                    raise StaticTypingError(
-                        f"Expected `int` type inputs and outputs for `{func.__name__}`"
-                    ) from e
-            return ret
-
         result = func(*args)
-        tupled_result = tuplefy(result)
         if not context.output_types:
+            tupled_result = tuplefy_returned(result)
             logging.info(
                 "Using input `%s` as reference for %s's I/O types",
                 tupled_result,
@@ -200,8 +216,8 @@ def verilogify(
             )
             context.output_types = [type(arg) for arg in tupled_result]
             context.default_output_vars()
-        else:
-            context.check_output_types(tupled_result)
+        elif recorder.should_check():
+            context.check_output_types(tuplefy_returned(result))
 
         return result
 
@@ -221,7 +237,7 @@ def get_context(verilogified: FunctionType) -> ir.Context:
     """
     Gets a copy of the context from a verilogified function
     """
-    return copy.deepcopy(verilogified._python2verilog_context)  # type: ignore # pylint: disable=protected-access
+    return verilogified._python2verilog_context.copy()  # type: ignore # pylint: disable=protected-access
 
 
 def get_original_func(verilogified: FunctionType) -> FunctionType:
@@ -240,9 +256,10 @@ def get_expected(
     Limits number of values generators can yield
     """
     func = get_original_func(verilogified)
-    for test in get_context(verilogified).test_cases:
+    context = get_context(verilogified)
+    for test in context.test_cases:
         logging.debug("Test case %s", test)
-        if get_context(verilogified).is_generator:
+        if context.is_generator:
             for i, value in enumerate(func(*test)):
                 yield value
                 if i > max_yields_per_test_case:
@@ -262,17 +279,181 @@ def get_actual_raw(
     """
     Get actual output of the testbench
 
+    Simulated in the pool of warm workers if it is enabled by env var
+
     Includes protocol signals, e.g. ready, valid
     """
     context = get_context(verilogified)
-    with temp_fifo() as module_fifo, temp_fifo() as tb_fifo:
-        stdout, err = iverilog.run_with_fifos(
-            context.testbench_name,
-            {module_fifo: module, tb_fifo: testbench},
-            timeout=timeout,
+    simulation_pool = pool.get_pool()
+    if simulation_pool:
+        stdout, err = simulation_pool.run(
+            context.testbench_name, module, testbench, timeout=timeout
         )
-        assert not err, f"{stdout} {err}"
-        yield from parse_stdout(stdout)
+    else:
+        with temp_fifo() as module_fifo, temp_fifo() as tb_fifo:
+            stdout, err = iverilog.run_with_fifos(
+                context.testbench_name,
+                {module_fifo: module, tb_fifo: testbench},
+                timeout=timeout,
+            )
+    assert not err, f"{stdout} {err}"
+    yield from parse_stdout(stdout)
+
+
+def _simulate_shard(
+    image: iverilog.VvpImage,
+    test_cases: list[tuple[int, ...]],
+    timeout: Optional[int],
+) -> list[tuple[str, ...]]:
+    """
+    Simulates a shard of test cases, in a worker process
+    """
+    stdout, err = image.run_test_cases(test_cases, timeout=timeout)
+    assert not err, f"{stdout} {err}"
+    return list(parse_stdout(stdout))
+
+
+def get_actual_raw_parallel(
+    verilogified: FunctionType,
+    module: str,
+    testbench: str,
+    processes: Optional[int] = None,
+    timeout: Optional[int] = None,
+) -> Iterator[tuple[str, ...]]:
+    """
+    Get actual output of a testbench made with `read_test_cases`
+
+    The design is compiled once, then the test cases are split into contiguous
+    shards that are simulated in a process pool, and their outputs merged in order.
+    Test cases do not depend on each other in such testbenches,
+    so the output is identical to simulating all test cases at once.
+    With `random_ready`, the ready pattern restarts for each test case,
+    so ready and valid rows can differ from `get_actual_raw`,
+    but the outputs themselves are the same.
+
+    Includes protocol signals, e.g. ready, valid
+
+    :param processes: number of shards and worker processes, defaults to cpu count
+    """
+    context = get_context(verilogified)
+    image = iverilog.VvpImage(context.testbench_name, [module, testbench])
+
+    test_cases = context.test_cases
+    shard_count = max(1, min(processes or os.cpu_count() or 1, len(test_cases)))
+    size, remainder = divmod(len(test_cases), shard_count)
+    shards = []
+    start = 0
+    for i in range(shard_count):
+        end = start + size + (i < remainder)
+        shards.append(test_cases[start:end])
+        start = end
+
+    if shard_count == 1:
+        yield from _simulate_shard(image, shards[0], timeout)
+        return
+    with ProcessPoolExecutor(max_workers=shard_count) as executor:
+        for rows in executor.map(
+            _simulate_shard,
+            [image] * shard_count,
+            shards,
+            [timeout] * shard_count,
+        ):
+            yield from rows
+
+
+def get_actual_raw_interpreted(
+    verilogified: FunctionType,
+    config: Optional[TestbenchConfig] = None,
+    max_cycles: Optional[int] = None,
+) -> Iterator[tuple[str, ...]]:
+    """
+    Get actual output of the testbench, by interpreting the optimized IR
+    instead of simulating the Verilog
+
+    Includes protocol signals, e.g. ready, valid
+
+    :param config: config the testbench would be made with
+    :param max_cycles: raises if more clock cycles are needed
+    """
+    yield from Interpreter(get_context(verilogified)).run(
+        config=config, max_cycles=max_cycles
+    )
+
+
+def get_actual_streamed(
+    verilogified: FunctionType,
+    module: str,
+    testbench: str,
+    timeout: Optional[int] = None,
+) -> Iterator[Union[tuple[int, ...], int]]:
+    """
+    Get actual output of a testbench made with `stream_display`,
+    as it is simulated
+
+    Outputs are filtered by ready and valid, as with `get_actual`
+    """
+    context = get_context(verilogified)
+    image = iverilog.VvpImage(context.testbench_name, [module, testbench])
+    yield from strip_records(
+        image.stream_test_cases(
+            len(context.output_vars), context.test_cases, timeout=timeout
+        )
+    )
+
+
+def get_expected_by_test_case(
+    verilogified: FunctionType,
+) -> Iterator[tuple[tuple[int, ...], Iterator[Union[tuple[int, ...], int]]]]:
+    """
+    Get expected output of each test case, lazily
+
+    :return: (test case, outputs of the test case) for each test case
+    """
+    func = get_original_func(verilogified)
+    context = get_context(verilogified)
+    for test in context.test_cases:
+        yield test, func(*test) if context.is_generator else iter([func(*test)])
+
+
+def verify_streamed(
+    verilogified: FunctionType,
+    module: str,
+    testbench: str,
+    timeout: Optional[int] = None,
+) -> int:
+    """
+    Compares the output of a testbench made with `stream_display`
+    with the expected output, while it is simulated
+
+    Raises `OutputMismatchError` with the row and test case of the first mismatch,
+    the simulation is killed without waiting for the rest of its output
+
+    :return: number of outputs compared
+    """
+    context = get_context(verilogified)
+    image = iverilog.VvpImage(context.testbench_name, [module, testbench])
+    records = image.stream_test_cases(
+        len(context.output_vars), context.test_cases, timeout=timeout
+    )
+    try:
+        return compare_records(records, get_expected_by_test_case(verilogified))
+    finally:
+        records.close()
+
+
+def get_actual_compiled(
+    verilogified: FunctionType,
+    max_cycles: Optional[int] = None,
+) -> Iterator[Union[tuple[int, ...], int]]:
+    """
+    Get actual output of the testbench, by running a C simulator
+    compiled from the FSM instead of simulating the Verilog
+
+    Valid outputs only, as with `get_actual`, with the ready signal always high
+
+    :param max_cycles: raises if more clock cycles are needed
+    """
+    yield from CSimulator(get_context(verilogified)).run(max_cycles=max_cycles)
 
 
 def get_actual(
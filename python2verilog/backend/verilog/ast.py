@@ -9,7 +9,13 @@ from typing import Optional
 from python2verilog import ir
 from python2verilog.utils import env
 from python2verilog.utils.generics import GenericRepr
-from python2verilog.utils.lines import ImplementsToLines, Indent, Lines
+from python2verilog.utils.lines import (
+    ImplementsToLines,
+    ImplementsWriteLines,
+    Indent,
+    Lines,
+    LineWriter,
+)
 from python2verilog.utils.typed import guard, typed, typed_list, typed_strict
 
 
@@ -81,9 +87,18 @@ class LocalParam(Statement):
     localparam <name> = <value>;
     """
 
-    def __init__(self, name: str, value: ir.UInt, *args, **kwargs):
+    def __init__(
+        self, name: str, value: ir.UInt, *args, width: Optional[int] = None, **kwargs
+    ):
+        """
+        :param width: width of the sized value, None for unsized
+        """
         assert isinstance(value, ir.UInt)
-        super().__init__(f"localparam {name} = {value.verilog()};", *args, **kwargs)
+        if width is None:
+            string = f"localparam {name} = {value.verilog()};"
+        else:
+            string = f"localparam [{width - 1}:0] {name} = {width}'d{value.verilog()};"
+        super().__init__(string, *args, **kwargs)
 
 
 class TypeDef(Statement):
@@ -94,13 +109,20 @@ class TypeDef(Statement):
     } _state_t;
     """
 
-    def __init__(self, name: str, values: list[str]):
+    def __init__(self, name: str, values: list[str], width: Optional[int] = None):
+        """
+        :param width: width of the enum, None for the default
+        """
         self.name = typed(name, str)
         self.values = typed_list(values, str)
+        self.width = width
         super().__init__()
 
     def to_lines(self):
-        lines = Lines("typedef enum")
+        if self.width is None:
+            lines = Lines("typedef enum")
+        else:
+            lines = Lines(f"typedef enum logic [{self.width - 1}:0]")
         lines += "{"
         values = Lines()
         for value in self.values[:-1]:
@@ -174,7 +196,7 @@ class Instantiation(Statement):
         return lines
 
 
-class Module(ImplementsToLines):
+class Module(ImplementsWriteLines):
     """
     module name(...); endmodule
     """
@@ -185,7 +207,12 @@ class Module(ImplementsToLines):
         body: Optional[list[Statement]] = None,
         localparams: Optional[dict[str, ir.UInt]] = None,
         header: Optional[Lines] = None,
+        state_width: Optional[int] = None,
     ):
+        """
+        :param state_width: width of the state variable and sized localparams,
+            None for a 32-bit state variable and unsized localparams
+        """
         self.name = name
 
         self.inputs = Lines()
@@ -201,45 +228,52 @@ class Module(ImplementsToLines):
         if localparams:
             if env.get_var(env.Vars.IS_SYSTEM_VERILOG) is not None:
                 self.local_params = Lines("// State variables")
+                if state_width is None:
+                    values = list(localparams.keys())
+                else:
+                    values = [
+                        f"{key} = {state_width}'d{value.verilog()}"
+                        for key, value in localparams.items()
+                    ]
                 self.local_params.concat(
-                    TypeDef("_state_t", list(localparams.keys())).to_lines()
+                    TypeDef("_state_t", values, state_width).to_lines()
                 )
                 self.local_params += "_state_t _state;"
             else:
                 self.local_params = Lines("// State variables")
                 for key, value in localparams.items():
-                    self.local_params.concat(LocalParam(key, value).to_lines())
-                self.local_params.concat(Declaration("_state", reg=True).to_lines())
+                    self.local_params.concat(
+                        LocalParam(key, value, width=state_width).to_lines()
+                    )
+                self.local_params.concat(
+                    Declaration(
+                        "_state", reg=True, size=state_width if state_width else 32
+                    ).to_lines()
+                )
         else:
             self.local_params = Lines()
 
         self.header_comment = header
 
-    def to_lines(self):
-        """
-        To Verilog
-        """
+    def write_lines(self, writer: LineWriter, indent: int = 0):
         if self.header_comment:
-            lines = Lines(self.header_comment.lines)
-        else:
-            lines = Lines()
-        lines += f"module {self.name} ("
-        lines.concat(self.inputs, indent=1)
-        lines.concat(self.outputs, indent=1)
-
-        if self.inputs or self.outputs:  # This means there are ports
-            lines[-1] = lines[-1][0:-1]  # removes last comma
-
-        lines += ");"
-        lines.concat(self.local_params, 1)
+            writer.lines(self.header_comment, indent)
+        writer.line(f"module {self.name} (", indent)
+        ports = Lines()
+        ports.concat(self.inputs)
+        ports.concat(self.outputs)
+        if ports:  # This means there are ports
+            ports[-1] = ports[-1][0:-1]  # removes last comma
+        writer.lines(ports, indent + 1)
+        writer.line(");", indent)
+        writer.lines(self.local_params, indent + 1)
         for stmt in self.body:
-            lines.concat(stmt.to_lines(), 1)
-        lines += "endmodule"
-        lines.blank()
-        return lines
+            stmt.write_lines(writer, indent + 1)
+        writer.line("endmodule", indent)
+        writer.line("", indent)
 
 
-class Initial(Statement):
+class Initial(ImplementsWriteLines, Statement):
     """
     initial begin
         ...
@@ -252,16 +286,14 @@ class Initial(Statement):
         self.body = body
         super().__init__(*args, **kwargs)
 
-    def to_lines(self):
-        lines = Lines("initial begin")
-        if self.body:
-            for stmt in self.body:
-                lines.concat(stmt.to_lines(), 1)
-        lines += "end"
-        return lines
+    def write_lines(self, writer: LineWriter, indent: int = 0):
+        writer.line("initial begin", indent)
+        for stmt in self.body or []:
+            stmt.write_lines(writer, indent + 1)
+        writer.line("end", indent)
 
 
-class Always(Statement):
+class Always(ImplementsWriteLines, Statement):
     """
     always () begin
         ...
@@ -285,15 +317,11 @@ class Always(Statement):
             self.body = []
         super().__init__(*args, **kwargs)
 
-    def to_lines(self):
-        """
-        To Verilog
-        """
-        lines = Lines(f"always {self.trigger.verilog()} begin")
+    def write_lines(self, writer: LineWriter, indent: int = 0):
+        writer.line(f"always {self.trigger.verilog()} begin", indent)
         for stmt in self.body:
-            lines.concat(stmt.to_lines(), 1)
-        lines += "end"
-        return lines
+            stmt.write_lines(writer, indent + 1)
+        writer.line("end", indent)
 
 
 class PosedgeSyncAlways(Always):
@@ -396,7 +424,7 @@ class Declaration(Statement):
         return Lines(string)
 
 
-class CaseItem(ImplementsToLines):
+class CaseItem(ImplementsWriteLines):
     """
     Verilog case item, i.e.
     <condition>: begin
@@ -414,19 +442,14 @@ class CaseItem(ImplementsToLines):
         else:
             self.statements = []
 
-    def to_lines(self):
-        """
-        To Verilog lines
-        """
-        lines = Lines()
-        lines += f"{self.condition.to_string()}: begin"
+    def write_lines(self, writer: LineWriter, indent: int = 0):
+        writer.line(f"{self.condition.to_string()}: begin", indent)
         for stmt in self.statements:
-            lines.concat(stmt.to_lines(), indent=1)
-        lines += "end"
-        return lines
+            stmt.write_lines(writer, indent + 1)
+        writer.line("end", indent)
 
 
-class Case(Statement):
+class Case(ImplementsWriteLines, Statement):
     """
     Verilog case statement with various cases
     case (<expression>)
@@ -449,21 +472,19 @@ class Case(Statement):
             self.case_items = []
         super().__init__(*args, **kwargs)
 
-    def to_lines(self):
-        """
-        To Verilog Lines
-        """
+    def write_lines(self, writer: LineWriter, indent: int = 0):
         if len(self.case_items) == 0:
-            return Lines(f"// case({self.condition})\n//Empty case block\n// endcase")
-        lines = Lines()
-        lines += f"case ({self.condition.to_string()})"
+            writer.line(f"// case({self.condition})", indent)
+            writer.line("//Empty case block", indent)
+            writer.line("// endcase", indent)
+            return
+        writer.line(f"case ({self.condition.to_string()})", indent)
         for item in self.case_items:
-            lines.concat(item.to_lines(), indent=1)
-        lines += "endcase"
-        return lines
+            item.write_lines(writer, indent + 1)
+        writer.line("endcase", indent)
 
 
-class IfElse(Statement):
+class IfElse(ImplementsWriteLines, Statement):
     """
     Verilog if else
     """
@@ -481,22 +502,22 @@ class IfElse(Statement):
         self.then_body = typed_list(then_body, Statement)
         self.else_body = typed_list(else_body, Statement)
 
-    def to_lines(self):
-        lines = Lines()
-        lines += f"if ({self.condition.verilog()}) begin" + (
-            f" // {self.comment}" if self.comment else ""
+    def write_lines(self, writer: LineWriter, indent: int = 0):
+        writer.line(
+            f"if ({self.condition.verilog()}) begin"
+            + (f" // {self.comment}" if self.comment else ""),
+            indent,
         )
         for stmt in self.then_body:
-            lines.concat(stmt.to_lines(), indent=1)
+            stmt.write_lines(writer, indent + 1)
         if self.else_body:
-            lines += "end else begin"
+            writer.line("end else begin", indent)
             for stmt in self.else_body:
-                lines.concat(stmt.to_lines(), indent=1)
-        lines += "end"
-        return lines
+                stmt.write_lines(writer, indent + 1)
+        writer.line("end", indent)
 
 
-class While(Statement):
+class While(ImplementsWriteLines, Statement):
     """
     Unsynthesizable While
     while (<condition>) begin
@@ -518,10 +539,8 @@ class While(Statement):
         self.body = body
         super().__init__(*args, **kwargs)
 
-    def to_lines(self):
-        lines = Lines(f"while ({self.condition.to_string()}) begin")
-        if self.body:
-            for stmt in self.body:
-                lines.concat(stmt.to_lines(), 1)
-        lines += "end"
-        return lines
+    def write_lines(self, writer: LineWriter, indent: int = 0):
+        writer.line(f"while ({self.condition.to_string()}) begin", indent)
+        for stmt in self.body or []:
+            stmt.write_lines(writer, indent + 1)
+        writer.line("end", indent)
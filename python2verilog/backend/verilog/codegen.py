@@ -2,12 +2,13 @@
 Verilog Codegen
 """
 
-from typing import Optional
+from typing import Optional, TextIO
 
 from python2verilog import ir
 from python2verilog.backend.verilog import ast as ver
 from python2verilog.backend.verilog.config import CodegenConfig, TestbenchConfig
 from python2verilog.backend.verilog.fsm import FsmBuilder
+from python2verilog.backend.verilog.minimize import minimize_states
 from python2verilog.backend.verilog.module import Module
 from python2verilog.backend.verilog.testbench import Testbench
 from python2verilog.utils.typed import (
@@ -32,6 +33,9 @@ class CodeGen:
         self.context = typed_strict(context, ir.Context)
         self.config = typed_strict(config, CodegenConfig)
         root_case = FsmBuilder(root, context, config).get_case()
+        if context.optimization_level > 0:
+            # Optimizer copies paths, which often makes equivalent states
+            minimize_states(root_case, context)
 
         for item in root_case.case_items:
             self.context.add_state_weak(
@@ -50,7 +54,12 @@ class CodeGen:
         Get Verilog module
         """
         return (
-            Module(context=self.context, root=self.case)
+            Module(
+                context=self.context,
+                root=self.case,
+                state_encoding=self.config.state_encoding,
+                width_inference=self.config.width_inference,
+            )
             if self._module is None
             else self._module
         )
@@ -65,7 +74,13 @@ class CodeGen:
         """
         Get Verilog module as string
         """
-        return self.get_module_lines().to_string()
+        return self.get_module().to_string()
+
+    def write_module(self, stream: TextIO):
+        """
+        Writes Verilog module to a text stream
+        """
+        self.get_module().write(stream)
 
     def get_testbench(self, config: TestbenchConfig):
         """
@@ -91,4 +106,10 @@ class CodeGen:
         """
         New testbench as str
         """
-        return self.get_testbench_lines(config=config).to_string()
+        return self.get_testbench(config=config).to_string()
+
+    def write_testbench(self, stream: TextIO, config: TestbenchConfig):
+        """
+        Writes new testbench to a text stream
+        """
+        self.get_testbench(config=config).write(stream)
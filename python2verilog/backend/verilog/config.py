@@ -3,10 +3,58 @@ Configurations
 """
 
 from dataclasses import dataclass, field
+from enum import Enum
+from typing import Optional
 
 from python2verilog.utils import env
 
 
+class StateEncoding(Enum):
+    """
+    Encodings of the states of a module, sized from the number of states
+    """
+
+    # Sequential codes in the fewest bits, for area
+    BINARY = "binary"
+
+    # Gray codes in the fewest bits
+    GRAY = "gray"
+
+    # A bit per state, for timing
+    ONE_HOT = "one-hot"
+
+    def width(self, count: int) -> int:
+        """
+        Number of bits to encode count states
+        """
+        if self == StateEncoding.ONE_HOT:
+            return max(count, 1)
+        return max((count - 1).bit_length(), 1)
+
+    def code(self, index: int) -> int:
+        """
+        Code of the state at index
+        """
+        if self == StateEncoding.ONE_HOT:
+            return 1 << index
+        if self == StateEncoding.GRAY:
+            return index ^ (index >> 1)
+        return index
+
+
+class WidthInference(Enum):
+    """
+    Sources of the value ranges that registers are narrowed to
+    """
+
+    # Static interval analysis, with inputs in the full 32-bit range
+    STATIC = "static"
+
+    # Assuming inputs within the range of the recorded test cases,
+    # a module started with an input outside of it displays an error
+    TEST_CASES = "test-cases"
+
+
 @dataclass(frozen=True)
 class TestbenchConfig:
     """
@@ -16,6 +64,17 @@ class TestbenchConfig:
     # Enable random ready signal (for testing correctness)
     random_ready: bool = False
 
+    # Read test cases at runtime from the file given by `+test_cases=<path>`,
+    # instead of writing them into the testbench.
+    # With random_ready, the ready pattern restarts for each test case,
+    # so ready and valid rows can differ from a testbench without this option
+    read_test_cases: bool = False
+
+    # Write fixed-width hex records to the file given by `+display=<path>`
+    # (stdout by default), instead of comma separated decimals,
+    # see `display.parse_records`
+    stream_display: bool = False
+
 
 @dataclass(frozen=True)
 class CodegenConfig(TestbenchConfig):
@@ -27,3 +86,10 @@ class CodegenConfig(TestbenchConfig):
     add_debug_comments: bool = field(
         default_factory=lambda: bool(env.get_var(env.Vars.DEBUG_COMMENTS))
     )
+
+    # Encoding of states, None for sequential codes in 32 bits
+    state_encoding: Optional[StateEncoding] = None
+
+    # Narrow local registers and cached inputs to the widths of their values,
+    # ports keep 32 bits, None to keep 32 bits
+    width_inference: Optional[WidthInference] = None
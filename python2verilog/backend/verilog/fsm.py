@@ -4,7 +4,7 @@ Lowers IR Graph to FSM
 
 import itertools
 import logging
-from typing import Optional
+from typing import NamedTuple, Optional, Union
 
 from python2verilog import ir
 from python2verilog.backend.verilog import ast as ver
@@ -22,6 +22,47 @@ from python2verilog.utils.typed import (
 )
 
 
+class _Vertex(NamedTuple):
+    """
+    Task of `FsmBuilder.build` processing a node into stmts
+    """
+
+    node: int
+    stmts: list[ver.Statement]
+
+
+class _Edge(NamedTuple):
+    """
+    Task of `FsmBuilder.build` processing an edge into stmts
+    """
+
+    edge: int
+    stmts: list[ver.Statement]
+
+
+class _IfElse(NamedTuple):
+    """
+    Task of `FsmBuilder.build` appending an if else of built bodies to stmts
+    """
+
+    vertex: ir.IfElseNode
+    then_body: list[ver.Statement]
+    else_body: list[ver.Statement]
+    stmts: list[ver.Statement]
+
+
+class _CaseItem(NamedTuple):
+    """
+    Task of `FsmBuilder.build` appending a case item of built stmts
+    """
+
+    vertex: ir.Element
+    stmts: list[ver.Statement]
+
+
+_Task = Union[_Vertex, _Edge, _IfElse, _CaseItem]
+
+
 class FsmBuilder:
     """
     Creates a FSM using a case block from a IR Graph
@@ -33,12 +74,15 @@ class FsmBuilder:
         # Member Vars
         if not config:
             config = CodegenConfig()
-        self.visited: set[str] = set()
         self.context = context
         self.case = ver.Case(expression=context.state_var, case_items=[])
         self.root = typed_strict(root, ir.Node)
         self.config = typed_strict(config, CodegenConfig)
 
+        # Optimal paths as arrays, elements are referred to by index
+        self.arena = ir.Arena(self.root, ir.optimal_children)
+        self.visited = self.arena.visited()
+
         # Member Funcs
         instance = itertools.count()
         self.next_unique = lambda: next(instance)
@@ -47,14 +91,43 @@ class FsmBuilder:
         """
         Gets case statement/block
         """
-        # Start recursion and create FSM
-        self.case.case_items.append(self.new_caseitem(self.root))
+        # Create FSM
+        self.build(self.arena.index(self.root))
 
         # Reverse states for readability (states are built backwards)
         self.case.case_items = list(reversed(self.case.case_items))
+        if logging.getLogger().isEnabledFor(logging.DEBUG):
+            logging.debug(
+                "%s emitted %s case items and %s statements",
+                self.context.name,
+                self.case_item_count,
+                self.statement_count,
+            )
 
         return self.case
 
+    @property
+    def case_item_count(self) -> int:
+        """
+        Number of case items emitted
+        """
+        return len(self.case.case_items)
+
+    @property
+    def statement_count(self) -> int:
+        """
+        Number of statements emitted, including nested ones
+        """
+        count = 0
+        stack = [stmt for item in self.case.case_items for stmt in item.statements]
+        while stack:
+            stmt = stack.pop()
+            count += 1
+            if isinstance(stmt, ver.IfElse):
+                stack.extend(stmt.then_body)
+                stack.extend(stmt.else_body)
+        return count
+
     @staticmethod
     def create_quick_done(context: ir.Context) -> ver.IfElse:
         """
@@ -77,26 +150,61 @@ class FsmBuilder:
             ],
         )
 
-    def new_caseitem(self, root: ir.Node):
+    def build(self, index: int):
         """
-        Creates a new case item with the root's unique id as identifier
-        """
-        stmts = self.do_vertex(root)
-        logging.debug("new caseitem %s", root.unique_id)
-        item = ver.CaseItem(condition=ir.State(root.unique_id), statements=stmts)
+        Creates the case item of a root, and of the states reachable from it
 
-        return item
+        Walks the graph with an explicit stack instead of recursion,
+        as non-clocked chains can be much deeper than the recursion limit.
+        Tasks are popped in the order of a recursive depth-first walk,
+        so a case item is appended after the case items of its descendants
+        """
+        stack: list[_Task] = []
+        self.push_caseitem(index, stack)
+        while stack:
+            task = stack.pop()
+            if isinstance(task, _Vertex):
+                self.do_vertex(task.node, task.stmts, stack)
+            elif isinstance(task, _Edge):
+                self.do_edge(task.edge, task.stmts, stack)
+            elif isinstance(task, _IfElse):
+                comment = (
+                    task.vertex.unique_id if self.config.add_debug_comments else ""
+                )
+                task.stmts.append(
+                    ver.IfElse(
+                        condition=task.vertex.condition,
+                        then_body=task.then_body,
+                        else_body=task.else_body,
+                        comment=comment,
+                    )
+                )
+            else:
+                logging.debug("new caseitem %s", task.vertex.unique_id)
+                self.case.case_items.append(
+                    ver.CaseItem(
+                        condition=ir.State(task.vertex.unique_id),
+                        statements=task.stmts,
+                    )
+                )
 
-    def do_vertex(self, vertex: ir.Node):
+    def push_caseitem(self, index: int, stack: list[_Task]):
         """
-        Processes a node
+        Pushes the tasks creating a new case item with the vertex's unique id as identifier
         """
-        logging.debug("%s %s %s", self.do_vertex.__name__, vertex, len(self.visited))
+        stmts: list[ver.Statement] = []
+        stack.append(_CaseItem(self.arena.elements[index], stmts))
+        stack.append(_Vertex(index, stmts))
 
+    def do_vertex(self, index: int, stmts: list[ver.Statement], stack: list[_Task]):
+        """
+        Processes a node, appending its statements to stmts
+        """
+        vertex = self.arena.elements[index]
         assert isinstance(vertex, ir.Node), str(vertex)
-        self.visited.add(vertex.unique_id)
+        self.visited.add(index)
 
-        stmts: list[ver.Statement] = []
+        successors = self.arena.successors(index)
 
         if isinstance(vertex, ir.AssignNode):
             stmts.append(
@@ -106,38 +214,35 @@ class FsmBuilder:
                     comment=vertex.unique_id if self.config.add_debug_comments else "",
                 )
             )
-            stmts += self.do_edge(vertex.optimal_child)
+            stack.append(_Edge(successors[0], stmts))
 
         elif isinstance(vertex, ir.IfElseNode):
-            then_body = self.do_edge(vertex.optimal_true_edge)
-            else_body = self.do_edge(vertex.optimal_false_edge)
-            stmts.append(
-                ver.IfElse(
-                    condition=vertex.condition,
-                    then_body=then_body,
-                    else_body=else_body,
-                    comment=vertex.unique_id if self.config.add_debug_comments else "",
-                )
-            )
+            then_body: list[ver.Statement] = []
+            else_body: list[ver.Statement] = []
+            stack.append(_IfElse(vertex, then_body, else_body, stmts))
+            stack.append(_Edge(successors[1], else_body))
+            stack.append(_Edge(successors[0], then_body))
         else:
             raise TypeError(type(vertex))
 
-        return stmts
-
-    def do_edge(self, edge: ir.Edge):
+    def do_edge(self, index: int, stmts: list[ver.Statement], stack: list[_Task]):
         """
-        Processes a edge
+        Processes a edge, -1 being no edge, appending its statements to stmts
         """
+        if index < 0:
+            return
+        edge = self.arena.elements[index]
         if isinstance(edge, ir.NonClockedEdge):
-            return self.do_vertex(edge.optimal_child)
-        if isinstance(edge, ir.ClockedEdge):
-            if edge.optimal_child.unique_id not in self.visited:
-                self.case.case_items.append(self.new_caseitem(edge.optimal_child))
-            return [
+            stack.append(_Vertex(self.arena.successors(index)[0], stmts))
+        elif isinstance(edge, ir.ClockedEdge):
+            child = self.arena.successors(index)[0]
+            stmts.append(
                 ver.NonBlockingSubsitution(
-                    self.context.state_var, ir.State(edge.optimal_child.unique_id)
+                    self.context.state_var,
+                    ir.State(self.arena.elements[child].unique_id),
                 )
-            ]
-        if isinstance(edge, type(None)):
-            return []
-        raise RuntimeError(f"{type(edge)}")
+            )
+            if child not in self.visited:
+                self.push_caseitem(child, stack)
+        else:
+            raise RuntimeError(f"{type(edge)}")
@@ -0,0 +1,165 @@
+"""
+Minimizes the states of a FSM case statement
+
+The optimizer copies paths, so the FSM often has case items
+that are identical apart from the names of the states they transition to.
+Equivalent states are found by partition refinement (Moore's algorithm)
+and merged into the first of them
+"""
+
+import logging
+from typing import Hashable, Iterable, Union
+
+from python2verilog import ir
+from python2verilog.backend.verilog import ast as ver
+
+# Markers of the end of the branches of an if else in signatures
+_ELSE = "else"
+_END = "end"
+
+# Statements of a case item, with the states transitioned to taken out
+_Signature = tuple[Union[str, tuple[str, ...]], ...]
+
+
+def minimize_states(case: ver.Case, context: ir.Context) -> ver.Case:
+    """
+    Merges equivalent case items in-place,
+    i.e. case items with the same statements,
+    whose transitions are to equivalent states.
+
+    The entry state is never merged,
+    and states without a case item (e.g. idle and done) are only equivalent to themselves
+
+    :return: case
+    """
+    items = case.case_items
+    names = [item.condition.to_string() for item in items]
+    # A case selects the first item of a state
+    index_of: dict[str, int] = {}
+    for index, name in enumerate(names):
+        index_of.setdefault(name, index)
+
+    signatures: list[_Signature] = []
+    transitions: list[list[ver.Subsitution]] = []
+    for item in items:
+        signature, item_transitions = _signature(item)
+        signatures.append(signature)
+        transitions.append(item_transitions)
+
+    # Initial partition by statements
+    entry = str(context.entry_state)
+    blocks = _number(
+        (names[index] if names[index] == entry else "", signature)
+        for index, signature in enumerate(signatures)
+    )
+    blocks = _refine(blocks, transitions, index_of)
+    if len(set(blocks)) == len(items):
+        return case
+
+    kept = _merge(items, blocks, transitions, index_of)
+    logging.debug("%s merged %s states into %s", context.name, len(items), len(kept))
+    case.case_items = kept
+    return case
+
+
+def _refine(
+    blocks: list[int],
+    transitions: list[list[ver.Subsitution]],
+    index_of: dict[str, int],
+) -> list[int]:
+    """
+    Refines a partition by the blocks of the transition targets of each item,
+    until no block is split
+
+    :return: block of each item
+    """
+    count = len(set(blocks))
+    while True:
+        blocks = _number(
+            (
+                blocks[index],
+                tuple(
+                    blocks[index_of[target]] if target in index_of else target
+                    for target in map(_target, item_transitions)
+                ),
+            )
+            for index, item_transitions in enumerate(transitions)
+        )
+        new_count = len(set(blocks))
+        if new_count == count:
+            return blocks
+        count = new_count
+
+
+def _merge(
+    items: list[ver.CaseItem],
+    blocks: list[int],
+    transitions: list[list[ver.Subsitution]],
+    index_of: dict[str, int],
+) -> list[ver.CaseItem]:
+    """
+    Keeps the first item of each block as its representative,
+    redirecting transitions to the representative of their target
+
+    :return: kept items
+    """
+    representatives: dict[int, int] = {}
+    for index, block in enumerate(blocks):
+        representatives.setdefault(block, index)
+
+    kept = []
+    for index, item in enumerate(items):
+        if representatives[blocks[index]] != index:
+            continue
+        for transition in transitions[index]:
+            target = _target(transition)
+            if target in index_of:
+                representative = items[representatives[blocks[index_of[target]]]]
+                name = representative.condition.to_string()
+                if name != target:
+                    transition.rvalue = ir.State(name)
+        kept.append(item)
+    return kept
+
+
+def _target(transition: ver.Subsitution) -> str:
+    return transition.rvalue.to_string()
+
+
+def _number(keys: Iterable[Hashable]) -> list[int]:
+    """
+    Numbers keys by order of first appearance, equal keys get the same number
+    """
+    numbers: dict[Hashable, int] = {}
+    return [numbers.setdefault(key, len(numbers)) for key in keys]
+
+
+def _signature(item: ver.CaseItem) -> tuple[_Signature, list[ver.Subsitution]]:
+    """
+    Signature of the statements of a case item, excluding comments and
+    the states transitioned to
+
+    :return: (signature, transitions in order of appearance in the signature)
+    """
+    tokens: list[Union[str, tuple[str, ...]]] = []
+    transitions: list[ver.Subsitution] = []
+    stack: list[Union[str, ver.Statement]] = list(reversed(item.statements))
+    while stack:
+        stmt = stack.pop()
+        if isinstance(stmt, str):
+            tokens.append(stmt)
+        elif isinstance(stmt, ver.IfElse):
+            tokens.append(("if", stmt.condition.verilog()))
+            stack.append(_END)
+            stack.extend(reversed(stmt.else_body))
+            stack.append(_ELSE)
+            stack.extend(reversed(stmt.then_body))
+        elif isinstance(stmt, ver.Subsitution):
+            if isinstance(stmt.rvalue, ir.State):
+                tokens.append((stmt.oper, stmt.lvalue.verilog()))
+                transitions.append(stmt)
+            else:
+                tokens.append((stmt.oper, stmt.lvalue.verilog(), stmt.rvalue.verilog()))
+        else:
+            tokens.append(("", stmt.to_string()))
+    return tuple(tokens), transitions
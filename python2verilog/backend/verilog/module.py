@@ -2,10 +2,12 @@
 Creates module from context and FSM
 """
 
-from typing import Iterator, cast
+from typing import Iterator, Optional, cast
 
 from python2verilog import ir
 from python2verilog.backend.verilog import ast as ver
+from python2verilog.backend.verilog.config import StateEncoding, WidthInference
+from python2verilog.backend.verilog.widths import infer_widths, input_range_checks
 from python2verilog.ir.expressions import UInt
 from python2verilog.optimizer.helpers import backwards_replace
 from python2verilog.utils.lines import Lines
@@ -16,22 +18,27 @@ class Module(ver.Module):
     A module that implements the python2verilog module interface
     """
 
-    def __init__(self, context: ir.Context, root: ver.Case):
+    def __init__(
+        self,
+        context: ir.Context,
+        root: ver.Case,
+        state_encoding: Optional[StateEncoding] = None,
+        width_inference: Optional[WidthInference] = None,
+    ):
         """
         Creates a module wrapper from the context
 
         Requires context for I/O and declarations
+
+        :param state_encoding: encoding of states, None for sequential codes in 32 bits
+        :param width_inference: narrows local registers and cached inputs,
+            ports keep 32 bits, None to keep 32 bits
         """
         assert isinstance(root, ver.Case)
         assert isinstance(context, ir.Context)
 
-        inputs: list[str] = []
-        for var in context.input_vars:
-            inputs.append(var.py_name)
-
-        outputs = []
-        for var in context.output_vars:
-            outputs.append(var.ver_name)
+        inputs = [var.py_name for var in context.input_vars]
+        outputs = [var.ver_name for var in context.output_vars]
 
         def make_debug_display(context: ir.Context):
             """
@@ -62,6 +69,7 @@ class Module(ver.Module):
                 yield ver.NonBlockingSubsitution(instance.signals.ready, ir.UInt(0))
                 yield ver.NonBlockingSubsitution(instance.signals.start, ir.UInt(0))
 
+        start_ifelse = Module.make_start_ifelse(root, context)
         always_body = (
             [
                 ver.Statement("`ifdef DEBUG"),
@@ -111,11 +119,62 @@ class Module(ver.Module):
                 ),
                 ver.Statement(),
             ]
-            + Module.make_start_ifelse(root, context)
+            + start_ifelse
         )
 
-        always = ver.PosedgeSyncAlways(clock=context.signals.clock, body=always_body)
+        widths = Module._register_widths(start_ifelse, root, context, width_inference)
+        if width_inference:
+            cast(ver.IfElse, start_ifelse[0]).then_body[:0] = input_range_checks(
+                context, width_inference
+            )
+
+        module_body = Module._declarations(context, widths)
+
+        module_body.append(ver.Statement(comment="Core"))
+        module_body.append(
+            ver.PosedgeSyncAlways(clock=context.signals.clock, body=always_body)
+        )
+
+        state_vars, state_width = Module._state_vars(context, state_encoding)
+
+        super().__init__(
+            name=context.name,
+            body=module_body,
+            localparams=state_vars,
+            state_width=state_width,
+        )
+
+        self.inputs = self._input_lines(inputs=inputs, context=context)
+        self.outputs = self._output_lines(outputs=outputs, context=context)
+
+    @staticmethod
+    def _register_widths(
+        start_ifelse: list[ver.Statement],
+        root: ver.Case,
+        context: ir.Context,
+        width_inference: Optional[WidthInference],
+    ) -> dict[str, int]:
+        """
+        Widths of the local variables and cached inputs, see `infer_widths`
+
+        :return: name -> width, empty to keep 32 bits
+        """
+        if not width_inference:
+            return {}
+        return infer_widths(
+            cast(ver.IfElse, start_ifelse[0]).then_body,
+            root,
+            context,
+            width_inference,
+        )
 
+    @staticmethod
+    def _declarations(
+        context: ir.Context, widths: dict[str, int]
+    ) -> list[ver.Statement]:
+        """
+        Declarations of the local variables, cached inputs and generator instances
+        """
         module_body: list[ver.Statement] = []
 
         module_body += [
@@ -123,12 +182,16 @@ class Module(ver.Module):
         ]
         context.local_vars.sort(key=lambda x: x.ver_name)
         module_body += [
-            ver.Declaration(v.ver_name, reg=True, signed=True)
+            ver.Declaration(
+                v.ver_name, size=widths.get(v.ver_name, 32), reg=True, signed=True
+            )
             for v in context.local_vars
         ]
 
         module_body += [
-            ver.Declaration(var.ver_name, reg=True, signed=True)
+            ver.Declaration(
+                var.ver_name, size=widths.get(var.ver_name, 32), reg=True, signed=True
+            )
             for var in context.input_vars
         ]
 
@@ -184,23 +247,24 @@ class Module(ver.Module):
                     | {key.ver_name: value.ver_name for key, value in defaults.items()},
                 )
             )
+        return module_body
 
-        module_body.append(ver.Statement(comment="Core"))
-        module_body.append(always)
+    @staticmethod
+    def _state_vars(
+        context: ir.Context, state_encoding: Optional[StateEncoding]
+    ) -> tuple[dict[str, ir.UInt], Optional[int]]:
+        """
+        Codes of the states
 
+        :return: (state -> code, width of the state variable or None for 32 bits)
+        """
         # Consistent state var ordering in transpile
-        state_vars = {
-            key: ir.UInt(index) for index, key in enumerate(sorted(context.states))
-        }
-
-        super().__init__(
-            name=context.name,
-            body=module_body,
-            localparams=state_vars,
-        )
-
-        self.inputs = self._input_lines(inputs=inputs, context=context)
-        self.outputs = self._output_lines(outputs=outputs, context=context)
+        states = sorted(context.states)
+        if state_encoding is None:
+            return {key: ir.UInt(index) for index, key in enumerate(states)}, None
+        return {
+            key: ir.UInt(state_encoding.code(index)) for index, key in enumerate(states)
+        }, state_encoding.width(len(states))
 
     @staticmethod
     def _input_lines(inputs: list[str], context: ir.Context):
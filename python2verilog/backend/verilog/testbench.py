@@ -3,6 +3,7 @@ Creates testbench from context and FSM
 """
 import itertools
 import logging
+from typing import Callable, Iterable
 
 from python2verilog import ir
 from python2verilog.backend.verilog import ast as ver
@@ -23,12 +24,16 @@ class Testbench(ver.Module):
         self.context = context
         logging.debug("%s", config)
 
+        display_file = ir.Var("display_file")
+
         def make_display_stmt():
             """
             Creates a display statement for protocol signals and outputs
 
             $display("%0d, ...", ...);
             """
+            if config.stream_display:
+                return self._make_record_stmt(display_file)
             string = '$display("%0d, %0d, '
             string += "%0d, " * (len(self.context.output_vars) - 1)
             string += f'%0d", {context.signals.ready.ver_name}, {context.signals.valid.ver_name}'
@@ -76,6 +81,9 @@ class Testbench(ver.Module):
         initial_body.append(ver.BlockingSub(self.context.signals.ready, ir.UInt(1)))
         initial_body.append(ver.BlockingSub(self.context.signals.reset, ir.UInt(1)))
 
+        if config.stream_display:
+            initial_body += self._open_display_file(setups, display_file)
+
         initial_body.append(ver.AtNegedgeStatement(self.context.signals.clock))
         initial_body.append(ver.BlockingSub(self.context.signals.reset, ir.UInt(0)))
         if config.random_ready:
@@ -83,37 +91,26 @@ class Testbench(ver.Module):
 
         initial_body.append(ver.Statement())
 
-        logging.debug("Making test cases")
-        for i, test_case in enumerate(self.context.test_cases):
-            # New test case and start
-            initial_body.append(
-                ver.Statement(
-                    comment=f"============ Test Case {i} with "
-                    f"arguments {str(test_case)} ============"
-                )
-            )
-            for i, var in enumerate(self.context.input_vars):
-                initial_body.append(
-                    ver.BlockingSub(
-                        ir.Var(py_name=var.py_name, ver_name=var.py_name),
-                        ir.Int(int(test_case[i])),
-                    )
-                )
-            initial_body.append(ver.BlockingSub(self.context.signals.start, ir.UInt(1)))
+        def make_test_case(set_inputs: list[ver.Statement]) -> list[ver.Statement]:
+            """
+            Creates the statements that run a test case, after setting inputs
+            """
+            stmts: list[ver.Statement] = list(set_inputs)
+            stmts.append(ver.BlockingSub(self.context.signals.start, ir.UInt(1)))
 
             # Post-start
-            initial_body.append(ver.Statement())
-            initial_body.append(ver.AtNegedgeStatement(self.context.signals.clock))
-            for i, var in enumerate(self.context.input_vars):
-                initial_body.append(
+            stmts.append(ver.Statement())
+            stmts.append(ver.AtNegedgeStatement(self.context.signals.clock))
+            for var in self.context.input_vars:
+                stmts.append(
                     ver.BlockingSub(
                         ir.Var(py_name=var.py_name, ver_name=var.py_name),
                         ir.Unknown(),
                         comment="only need inputs when start is set",
                     )
                 )
-            initial_body.append(ver.BlockingSub(self.context.signals.start, ir.UInt(0)))
-            initial_body.append(ver.Statement())
+            stmts.append(ver.BlockingSub(self.context.signals.start, ir.UInt(0)))
+            stmts.append(ver.Statement())
 
             # While loop
             while_body: list[ver.Statement] = []
@@ -142,7 +139,7 @@ class Testbench(ver.Module):
                         ir.BinOp(random_wait_counter, "===", ir.Int(0)),
                     )
                 )
-            initial_body.append(
+            stmts.append(
                 ver.While(
                     condition=ir.UBinOp(
                         ir.UnaryOp(
@@ -161,7 +158,7 @@ class Testbench(ver.Module):
             )
 
             if not self.context.is_generator:
-                initial_body.append(
+                stmts.append(
                     ver.IfElse(
                         condition=self.context.signals.ready,
                         then_body=[make_display_stmt()],
@@ -169,15 +166,54 @@ class Testbench(ver.Module):
                     )
                 )
 
-            initial_body.append(ver.Statement())
+            stmts.append(ver.Statement())
+
+            return stmts
+
+        logging.debug("Making test cases")
+        if config.read_test_cases:
+            # Each test case starts from the same state, so its output does not
+            # depend on the others, e.g. when test cases are split across runs
+            reset: list[ver.Statement] = []
+            if config.random_ready:
+                reset.append(ver.BlockingSub(random_wait_counter, ir.Int(8)))
+            initial_body += self._read_test_cases(
+                setups, lambda set_inputs: make_test_case(reset + set_inputs)
+            )
+        else:
+            for i, test_case in enumerate(self.context.test_cases):
+                # New test case and start
+                initial_body.append(
+                    ver.Statement(
+                        comment=f"============ Test Case {i} with "
+                        f"arguments {str(test_case)} ============"
+                    )
+                )
+                initial_body += make_test_case(
+                    [
+                        ver.BlockingSub(
+                            ir.Var(py_name=var.py_name, ver_name=var.py_name),
+                            ir.Int(int(test_case[j])),
+                        )
+                        for j, var in enumerate(self.context.input_vars)
+                    ]
+                )
 
+        if config.stream_display:
+            initial_body.append(
+                ver.Statement(
+                    literal=f"if ({display_file.ver_name} != 32'h8000_0001) "
+                    f"$fclose({display_file.ver_name});"
+                )
+            )
         initial_body.append(ver.Statement(literal="$finish;"))
 
         initial_loop = ver.Initial(body=initial_body)
 
         logging.debug("Creating python test code")
         python_test_code = Lines()
-        for case in self.context.test_cases:
+        # Test cases are left out so the testbench does not change with them
+        for case in [] if config.read_test_cases else self.context.test_cases:
             python_test_code += f"print(list({self.context.name}(*{case})))"
 
         super().__init__(
@@ -188,3 +224,109 @@ class Testbench(ver.Module):
                 f"# Test Cases\n{python_test_code}*/\n"
             ),
         )
+
+    def _make_record_stmt(self, display_file: ir.Var) -> ver.Statement:
+        """
+        Writes a record of protocol signals and outputs,
+        i.e. a hex digit each for ready and valid,
+        then 8 hex digits for each output, then a newline
+
+        $fwrite(<file>, "%h%h%h...\\n", ...);
+        """
+        signals = [self.context.signals.ready, self.context.signals.valid]
+        signals += self.context.output_vars
+        return ver.Statement(
+            literal=f'$fwrite({display_file.ver_name}, "{"%h" * len(signals)}\\n", '
+            + ", ".join(var.ver_name for var in signals)
+            + ");"
+        )
+
+    @staticmethod
+    def _open_display_file(
+        setups: list[ver.Statement], display_file: ir.Var
+    ) -> list[ver.Statement]:
+        """
+        Creates statements that open the file given by `+display=<path>`,
+        or use stdout
+
+        Adds the required declarations to setups
+        """
+        path = ir.Var("display_path")
+        setups.append(ver.Declaration(path.ver_name, size=8 * 1024, reg=True))
+        setups.append(ver.Declaration(display_file.ver_name, reg=True))
+        return [
+            ver.Statement(
+                literal=f'if ($value$plusargs("display=%s", {path.ver_name})) '
+                f'{display_file.ver_name} = $fopen({path.ver_name}, "w");'
+            ),
+            ver.Statement(
+                literal=f"else {display_file.ver_name} = 32'h8000_0001; // stdout"
+            ),
+        ]
+
+    def _read_test_cases(
+        self,
+        setups: list[ver.Statement],
+        make_test_case: Callable[[list[ver.Statement]], list[ver.Statement]],
+    ) -> list[ver.Statement]:
+        """
+        Creates statements that run each test case in the file given by
+        `+test_cases=<path>`, see `format_test_cases`
+
+        Adds the required declarations to setups
+        """
+        path = ir.Var("test_cases_path")
+        file = ir.Var("test_cases_file")
+        count = ir.Var("test_cases_count")
+        status = ir.Var("test_cases_status")
+        setups.append(ver.Declaration(path.ver_name, size=8 * 1024, reg=True))
+        setups += [
+            ver.Declaration(var.ver_name, reg=True) for var in (file, count, status)
+        ]
+
+        def scan(var_name: str) -> list[ver.Statement]:
+            """
+            Reads a value into var_name, stopping the simulation if the file
+            ends early or is malformed
+            """
+            return [
+                ver.Statement(
+                    literal=f'{status.ver_name} = $fscanf({file.ver_name}, "%d", {var_name});'
+                ),
+                ver.Statement(
+                    literal=f"if ({status.ver_name} != 1) "
+                    f'$fatal(1, "Failed to read {var_name} from %0s", {path.ver_name});'
+                ),
+            ]
+
+        read_inputs = [
+            stmt for var in self.context.input_vars for stmt in scan(var.py_name)
+        ]
+        return [
+            ver.Statement(
+                literal=f'if (!$value$plusargs("test_cases=%s", {path.ver_name})) '
+                '$fatal(1, "Missing +test_cases=<path>");'
+            ),
+            ver.Statement(literal=f'{file.ver_name} = $fopen({path.ver_name}, "r");'),
+            ver.Statement(
+                literal=f"if ({file.ver_name} == 0) "
+                f'$fatal(1, "Failed to open %0s", {path.ver_name});'
+            ),
+            *scan(count.ver_name),
+            ver.Statement(),
+            ver.While(
+                condition=ir.UBinOp(count, ">", ir.UInt(0)),
+                body=make_test_case(read_inputs)
+                + [ver.BlockingSub(count, ir.UBinOp(count, "-", ir.UInt(1)))],
+            ),
+            ver.Statement(literal=f"$fclose({file.ver_name});"),
+        ]
+
+    @staticmethod
+    def format_test_cases(test_cases: Iterable[tuple[int, ...]]) -> str:
+        """
+        Formats test cases for a testbench that reads its test cases,
+        i.e. the number of test cases, then the arguments of each test case
+        """
+        lines = [" ".join(str(int(arg)) for arg in case) for case in test_cases]
+        return "\n".join([str(len(lines)), *lines]) + "\n"
@@ -0,0 +1,690 @@
+"""
+Infers the widths of the local registers of a module
+
+The ranges of the registers at the start of each state are found
+by interval analysis, following the transitions of the FSM.
+Statements are nonblocking, so within a clock cycle,
+conditions and right-hand sides read the values at the start of the cycle.
+
+Verilog computes `$signed(<left> <op> <right>)` in the width of its operands,
+so registers are widened until every arithmetic operation is computed
+in enough bits for its values.
+A narrow signed register is zero-extended when mixed with unsigned operands,
+so registers in expressions with unsigned operands are kept at 32 bits.
+
+Ports, including the output registers, keep 32 bits,
+as they connect to the testbench and to the modules calling this one.
+Inferring from test cases assumes inputs within the range of the recorded
+test cases, so a module started with an input outside of it displays an error,
+see `input_range_checks`
+"""
+
+import logging
+from typing import Iterator, NamedTuple, Optional
+
+from python2verilog import ir
+from python2verilog.backend.verilog import ast as ver
+from python2verilog.backend.verilog.config import WidthInference
+
+WIDTH = 32
+MIN = -(2 ** (WIDTH - 1))
+MAX = 2 ** (WIDTH - 1) - 1
+FULL = (MIN, MAX)
+
+# Number of times the range of a register in a state may grow before it is widened
+# to the next threshold, and of rounds narrowing the widened ranges
+GROWTH_LIMIT = 3
+
+_COMPARISONS = {"<", "<=", ">", ">=", "==", "!=", "===", "!==", "&&", "||"}
+_BITWISE = {"&", "|", "^"}
+_CHECKED = {"+", "-", "*", "/", "%", "<<", "**"}
+
+Interval = tuple[int, int]
+# Register -> range
+Ranges = dict[str, Interval]
+
+
+class _Frame(NamedTuple):
+    """
+    Position in nested statements
+    """
+
+    stmts: list[ver.Statement]
+    # Index of the next statement
+    position: int
+    parent: Optional["_Frame"]
+
+
+class _Path(NamedTuple):
+    """
+    Path through the statements of a state
+    """
+
+    frame: Optional[_Frame]
+    ranges: Ranges
+    # Ranges assigned to registers, read from the next cycle
+    updates: Ranges
+    # State transitioned to
+    target: Optional[str]
+
+
+class _Module(NamedTuple):
+    """
+    Parts of a module the analysis reads
+    """
+
+    # Statements when start is high
+    start: list[ver.Statement]
+    # State -> statements
+    items: dict[str, list[ver.Statement]]
+    state_var: str
+    # Output registers, which are signed and not narrowed
+    outputs: set[str]
+
+
+class _Collected(NamedTuple):
+    """
+    Ranges assigned to registers, and the expressions read with their ranges
+    """
+
+    assigned: Ranges
+    expressions: list[tuple[ir.Expression, Ranges]]
+
+
+def infer_widths(
+    start: list[ver.Statement],
+    case: ver.Case,
+    context: ir.Context,
+    inference: WidthInference,
+) -> dict[str, int]:
+    """
+    Infers the widths of the local variables and cached inputs of a module
+
+    :param start: statements when start is high, i.e. caching the inputs
+    :param case: case statement of the FSM
+    :return: ver_name -> width, at most 32
+    """
+    return _WidthInferrer(start, case, context, inference).widths
+
+
+def port_ranges(context: ir.Context, inference: WidthInference) -> Ranges:
+    """
+    Ranges of the input ports, bounded by the test cases if inferring from them
+    """
+    ports: Ranges = {var.py_name: FULL for var in context.input_vars}
+    if inference == WidthInference.TEST_CASES and context.test_cases:
+        for index, var in enumerate(context.input_vars):
+            values = [test_case[index] for test_case in context.test_cases]
+            ports[var.py_name] = _clip((min(values), max(values)))
+    return ports
+
+
+def input_range_checks(
+    context: ir.Context, inference: WidthInference
+) -> list[ver.Statement]:
+    """
+    Displays an error when an input is outside of the range widths are inferred for,
+    as registers would silently wrap around
+
+    The message has no commas, so parsing the output of a testbench raises
+    instead of skipping it as a row
+
+    :return: statements for when start is high
+    """
+    checks: list[ver.Statement] = []
+    for name, (low, high) in port_ranges(context, inference).items():
+        if (low, high) == FULL:
+            continue
+        port = ir.Expression(name)
+        checks.append(
+            ver.IfElse(
+                ir.UBinOp(
+                    ir.LessThan(port, ir.Int(low)),
+                    "||",
+                    ir.UBinOp(port, ">", ir.Int(high)),
+                ),
+                [
+                    ver.Statement(
+                        f'$display("Error: input {name} = %0d is outside of'
+                        f' {low} to {high} that widths were inferred for", {name});'
+                    )
+                ],
+                [],
+            )
+        )
+    return checks
+
+
+class _WidthInferrer:
+    """
+    Interval analysis of the registers of a module
+    """
+
+    def __init__(
+        self,
+        start: list[ver.Statement],
+        case: ver.Case,
+        context: ir.Context,
+        inference: WidthInference,
+    ):
+        self.registers = {var.ver_name for var in context.local_vars} | {
+            var.ver_name for var in context.input_vars
+        }
+        # A case selects the first item of a state
+        items: dict[str, list[ver.Statement]] = {}
+        for item in case.case_items:
+            items.setdefault(item.condition.to_string(), item.statements)
+        self.module = _Module(
+            start=start,
+            items=items,
+            state_var=context.state_var.ver_name,
+            outputs={var.ver_name for var in context.output_vars},
+        )
+
+        # Input port -> range
+        self.ports = port_ranges(context, inference)
+
+        # Bounds that ranges are widened to, as loops are bounded by them,
+        # i.e. constants and port bounds, plus and minus 1
+        self.thresholds = {MIN, MAX}
+        for low, high in self.ports.values():
+            self.thresholds.update((low - 1, low, high, high + 1))
+
+        # id(expression) -> expression as emitted
+        self.emitted: dict[int, ir.Expression] = {}
+        # Collected by transitions when not None
+        self.collected: Optional[_Collected] = None
+
+        collected = self.narrow(self.walk())
+
+        # Registers never assigned are kept at 32 bits
+        self.widths = {
+            name: (
+                _bits(collected.assigned[name]) if name in collected.assigned else WIDTH
+            )
+            for name in self.registers
+        }
+        changed = True
+        while changed:
+            changed = False
+            for expr, ranges in collected.expressions:
+                changed |= self.widen(expr, ranges)
+        logging.debug("Inferred widths %s of %s", self.widths, context.name)
+
+    def walk(self) -> dict[str, Ranges]:
+        """
+        Follows the transitions from the start statements until the ranges
+        at the start of each state stop growing, widening them to thresholds
+
+        :return: state -> ranges at the start of the state
+        """
+        states: dict[str, Ranges] = {}
+        growths: dict[tuple[str, str], int] = {}
+        # Ordered set of states to walk, None for the start statements
+        pending: dict[Optional[str], None] = {None: None}
+        while pending:
+            state, _ = pending.popitem()
+            for target, ranges in self.transitions(state, states):
+                if self.join(states, target, ranges, growths):
+                    pending[target] = None
+        return states
+
+    def narrow(self, states: dict[str, Ranges]) -> _Collected:
+        """
+        Recomputes the widened ranges from the transitions,
+        e.g. narrowing a widened loop counter to its loop condition
+
+        :return: collected by the last round
+        """
+        for _ in range(GROWTH_LIMIT):
+            self.collected = _Collected(assigned={}, expressions=[])
+            narrowed: dict[str, Ranges] = {}
+            for state in [None, *states]:
+                for target, ranges in self.transitions(state, states):
+                    self.join(narrowed, target, ranges)
+            if narrowed == states:
+                break
+            states = narrowed
+        assert self.collected is not None
+        return self.collected
+
+    def transitions(
+        self, state: Optional[str], states: dict[str, Ranges]
+    ) -> Iterator[tuple[str, Ranges]]:
+        """
+        Walks each path of the statements of a state
+
+        :param state: None for the start statements, where registers hold any value
+        :return: (state transitioned to, ranges at its start) of each path
+        """
+        if state is None:
+            statements = self.module.start
+            ranges = dict.fromkeys(self.registers, FULL)
+        elif state in self.module.items:
+            statements = self.module.items[state]
+            ranges = states[state]
+        else:
+            return
+
+        stack = [_Path(_Frame(statements, 0, None), ranges, {}, state)]
+        while stack:
+            path = self.follow(stack.pop(), stack)
+            # Idle when no state is given, and a path staying in its state
+            # without assignments adds no ranges
+            if (
+                path is not None
+                and path.target is not None
+                and (path.target != state or path.updates)
+            ):
+                yield path.target, path.ranges | path.updates
+
+    def follow(self, path: _Path, stack: list[_Path]) -> Optional[_Path]:
+        """
+        Follows a path to its end, or to an if else,
+        pushing the paths of its branches to stack
+
+        :return: the path at its end, None if it branched
+        """
+        frame, ranges, updates, target = path
+        while frame is not None:
+            if frame.position == len(frame.stmts):
+                frame = frame.parent
+                continue
+            stmt = frame.stmts[frame.position]
+            frame = frame._replace(position=frame.position + 1)
+            if isinstance(stmt, ver.Subsitution):
+                if stmt.lvalue.to_string() == self.module.state_var:
+                    target = stmt.rvalue.to_string()
+                else:
+                    self.assign(stmt, ranges, updates)
+            elif isinstance(stmt, ver.IfElse):
+                self.branch(stmt, _Path(frame, ranges, updates, target), stack)
+                return None
+        return _Path(None, ranges, updates, target)
+
+    def assign(self, stmt: ver.Subsitution, ranges: Ranges, updates: Ranges):
+        """
+        Updates the range of the register assigned to
+        """
+        name = stmt.lvalue.to_string()
+        rvalue = self.emit(stmt.rvalue, ranges)
+        if name in self.registers:
+            value = self.evaluate(rvalue, ranges)
+            updates[name] = value
+            if self.collected is not None:
+                assigned = self.collected.assigned
+                assigned[name] = _hull(assigned.get(name, value), value)
+
+    def branch(self, stmt: ver.IfElse, path: _Path, stack: list[_Path]):
+        """
+        Pushes the paths of the reachable branches of an if else,
+        the then branch on top
+        """
+        condition = self.emit(stmt.condition, path.ranges)
+        for body, truth in ((stmt.else_body, False), (stmt.then_body, True)):
+            refined = self.refine(condition, path.ranges, truth)
+            if refined is not None:
+                frame = _Frame(body, 0, path.frame)
+                stack.append(_Path(frame, refined, dict(path.updates), path.target))
+
+    def join(
+        self,
+        states: dict[str, Ranges],
+        state: str,
+        ranges: Ranges,
+        growths: Optional[dict[tuple[str, str], int]] = None,
+    ) -> bool:
+        """
+        Joins ranges into the ranges at the start of a state,
+        widening ranges that grew too many times to thresholds if given growths
+
+        :return: True if the ranges of the state changed
+        """
+        old = states.get(state)
+        if old is None:
+            states[state] = ranges
+            return True
+        changed = False
+        for name, value in ranges.items():
+            new = _hull(old[name], value)
+            if new == old[name]:
+                continue
+            if growths is not None:
+                growths[state, name] = growths.get((state, name), 0) + 1
+                if growths[state, name] > GROWTH_LIMIT:
+                    low, high = new
+                    if low < old[name][0]:
+                        low = max(bound for bound in self.thresholds if bound <= low)
+                    if high > old[name][1]:
+                        high = min(bound for bound in self.thresholds if bound >= high)
+                    new = (low, high)
+            old[name] = new
+            changed = True
+        return changed
+
+    def emit(self, expr: ir.Expression, ranges: Ranges) -> ir.Expression:
+        """
+        Expression as it is emitted in Verilog, cached,
+        and collected with the ranges it reads
+        """
+        emitted = self.emitted.get(id(expr))
+        if emitted is None:
+            emitted = self.emitted[id(expr)] = _emitted(expr)
+            for leaf in _leaves(emitted):
+                if isinstance(leaf, ir.Int):
+                    self.thresholds.update((leaf.value - 1, leaf.value, leaf.value + 1))
+        if self.collected is not None:
+            self.collected.expressions.append((emitted, ranges))
+        return emitted
+
+    def lookup(self, expr: ir.Expression, ranges: Ranges) -> Interval:
+        """
+        Range of a leaf
+        """
+        name = expr.to_string()
+        if name in ranges:
+            return ranges[name]
+        return self.ports.get(name, FULL)
+
+    def evaluate(self, expr: ir.Expression, ranges: Ranges) -> Interval:
+        """
+        Range of an expression
+        """
+        if isinstance(expr, ir.Int):
+            return _clip((expr.value, expr.value))
+        if isinstance(expr, ir.UInt):
+            return _clip((int(expr.to_string()), int(expr.to_string())))
+        if isinstance(expr, ir.Ternary):
+            return _hull(
+                self.evaluate(expr.left, ranges), self.evaluate(expr.right, ranges)
+            )
+        if isinstance(expr, ir.UnaryOp):
+            value = self.evaluate(expr.expr, ranges)
+            if expr.oper == "-":
+                return _clip((-value[1], -value[0]))
+            if expr.oper == "~":
+                return _clip((-value[1] - 1, -value[0] - 1))
+            if expr.oper == "!":
+                return (-1, 1)
+            return FULL
+        if isinstance(expr, ir.UBinOp):
+            return _binop(
+                expr.oper,
+                self.evaluate(expr.left, ranges),
+                self.evaluate(expr.right, ranges),
+            )
+        if type(expr) in (ir.Var, ir.ExclusiveVar, ir.Expression):
+            return self.lookup(expr, ranges)
+        return FULL
+
+    def refine(
+        self, condition: ir.Expression, ranges: Ranges, truth: bool
+    ) -> Optional[Ranges]:
+        """
+        Refines the ranges of registers compared in a condition
+
+        :return: ranges where condition is truth, None if it cannot be
+        """
+        if isinstance(condition, ir.UnaryOp) and condition.oper == "!":
+            return self.refine(condition.expr, ranges, not truth)
+        if not isinstance(condition, ir.UBinOp):
+            return ranges
+        oper = condition.oper
+        if (oper == "&&" and truth) or (oper == "||" and not truth):
+            left = self.refine(condition.left, ranges, truth)
+            if left is None:
+                return None
+            return self.refine(condition.right, left, truth)
+        if not truth:
+            oper = {
+                "<": ">=",
+                "<=": ">",
+                ">": "<=",
+                ">=": "<",
+                "==": "!=",
+                "===": "!==",
+                "!=": "==",
+                "!==": "===",
+            }.get(oper, "")
+        if oper not in ("<", "<=", ">", ">=", "==", "==="):
+            return ranges
+
+        refined = dict(ranges)
+        for expr, other, oper in (
+            (condition.left, condition.right, oper),
+            (condition.right, condition.left, _mirror(oper)),
+        ):
+            name = expr.to_string()
+            if name not in self.registers or type(expr) not in (
+                ir.Var,
+                ir.ExclusiveVar,
+            ):
+                continue
+            low, high = refined[name]
+            bound = self.evaluate(other, refined)
+            if oper == "<":
+                high = min(high, bound[1] - 1)
+            elif oper == "<=":
+                high = min(high, bound[1])
+            elif oper == ">":
+                low = max(low, bound[0] + 1)
+            elif oper == ">=":
+                low = max(low, bound[0])
+            else:
+                low, high = max(low, bound[0]), min(high, bound[1])
+            if low > high:
+                return None
+            refined[name] = (low, high)
+        return refined
+
+    def width(self, expr: ir.Expression) -> int:
+        """
+        Least width Verilog computes an expression in
+        """
+        if isinstance(expr, (ir.Int, ir.UInt)):
+            return WIDTH
+        if isinstance(expr, ir.Ternary):
+            return max(self.width(expr.left), self.width(expr.right))
+        if isinstance(expr, ir.UnaryOp):
+            return 1 if expr.oper == "!" else self.width(expr.expr)
+        if isinstance(expr, ir.UBinOp):
+            if expr.oper in _COMPARISONS:
+                return 1
+            if expr.oper in ("<<", ">>", ">>>", "**"):
+                return self.width(expr.left)
+            return max(self.width(expr.left), self.width(expr.right))
+        name = expr.to_string()
+        if name in self.widths:
+            return self.widths[name]
+        if name in self.ports or not isinstance(expr, (ir.Var, ir.Unknown)):
+            return WIDTH
+        return 1
+
+    def widen(self, expr: ir.Expression, ranges: Ranges) -> bool:
+        """
+        Widens the registers of an expression,
+        such that its operations are computed in enough bits
+
+        :return: True if a register was widened
+        """
+        if not all(map(self.is_signed, _leaves(expr))):
+            # Unsigned operands zero-extend narrow registers
+            return self.widen_leaves(expr, WIDTH)
+        changed = False
+        for node in _checked(expr):
+            width = _bits(self.evaluate(node, ranges))
+            if self.width(node) < width:
+                changed |= self.widen_leaves(node, width)
+        return changed
+
+    def widen_leaves(self, expr: ir.Expression, width: int) -> bool:
+        """
+        Widens the registers of an expression to at least width
+
+        :return: True if a register was widened
+        """
+        changed = False
+        for leaf in _leaves(expr):
+            name = leaf.to_string()
+            if name in self.widths and self.widths[name] < width:
+                self.widths[name] = width
+                changed = True
+        return changed
+
+    def is_signed(self, leaf: ir.Expression) -> bool:
+        """
+        If a leaf is signed in Verilog
+        """
+        if isinstance(leaf, (ir.Int, ir.UInt, ir.State)):
+            return True
+        name = leaf.to_string()
+        return (
+            name in self.registers or name in self.ports or name in self.module.outputs
+        )
+
+
+def _emitted(expr: ir.Expression) -> ir.Expression:
+    """
+    Expression as it is emitted in Verilog, i.e. with Mod and FloorDiv expanded
+    """
+    if isinstance(expr, ir.Mod):
+        left, right = _emitted(expr.left), _emitted(expr.right)
+        return ir.BinOp(
+            ir.BinOp(ir.BinOp(left, "%", right), "+", right),
+            "%",
+            right,
+        )
+    if isinstance(expr, ir.FloorDiv):
+        left, right = _emitted(expr.left), _emitted(expr.right)
+        return ir.Ternary(
+            condition=ir.BinOp(ir.BinOp(left, "%", right), "===", ir.Int(0)),
+            left=ir.BinOp(left, "/", right),
+            right=ir.BinOp(
+                ir.BinOp(left, "/", right),
+                "-",
+                ir.BinOp(
+                    ir.UBinOp(
+                        ir.BinOp(left, "<", ir.Int(0)),
+                        "^",
+                        ir.BinOp(right, "<", ir.Int(0)),
+                    ),
+                    "&",
+                    ir.Int(1),
+                ),
+            ),
+        )
+    if isinstance(expr, ir.UBinOp):
+        left, right = _emitted(expr.left), _emitted(expr.right)
+        if left is expr.left and right is expr.right:
+            return expr
+        if isinstance(expr, ir.BinOp):
+            return ir.BinOp(left, expr.oper, right)
+        return ir.UBinOp(left, expr.oper, right)
+    if isinstance(expr, ir.UnaryOp):
+        operand = _emitted(expr.expr)
+        return expr if operand is expr.expr else ir.UnaryOp(expr.oper, operand)
+    if isinstance(expr, ir.Ternary):
+        return ir.Ternary(
+            _emitted(expr.condition), _emitted(expr.left), _emitted(expr.right)
+        )
+    return expr
+
+
+def _children(expr: ir.Expression) -> list[ir.Expression]:
+    if isinstance(expr, ir.UBinOp):
+        return [expr.left, expr.right]
+    if isinstance(expr, ir.UnaryOp):
+        return [expr.expr]
+    if isinstance(expr, ir.Ternary):
+        return [expr.condition, expr.left, expr.right]
+    return []
+
+
+def _leaves(expr: ir.Expression) -> Iterator[ir.Expression]:
+    stack = [expr]
+    while stack:
+        node = stack.pop()
+        children = _children(node)
+        if children:
+            stack.extend(children)
+        else:
+            yield node
+
+
+def _checked(expr: ir.Expression) -> Iterator[ir.Expression]:
+    """
+    Operations that may overflow the width they are computed in
+    """
+    stack = [expr]
+    while stack:
+        node = stack.pop()
+        if (isinstance(node, ir.UBinOp) and node.oper in _CHECKED) or (
+            isinstance(node, ir.UnaryOp) and node.oper == "-"
+        ):
+            yield node
+        stack.extend(_children(node))
+
+
+def _binop(oper: str, left: Interval, right: Interval) -> Interval:
+    """
+    Range of a binary operation in Verilog
+    """
+    if oper in ("+", "-", "*"):
+        if oper == "+":
+            values = [left[0] + right[0], left[1] + right[1]]
+        elif oper == "-":
+            values = [left[0] - right[1], left[1] - right[0]]
+        else:
+            values = [a * b for a in left for b in right]
+        return _clip((min(values), max(values)))
+    if oper == "/":
+        if right == (0, 0):
+            return FULL
+        magnitude = max(abs(left[0]), abs(left[1]))
+        return _clip((-magnitude, magnitude))
+    if oper == "%":
+        magnitude = min(
+            max(abs(right[0]), abs(right[1])) - 1, max(abs(left[0]), abs(left[1]))
+        )
+        if magnitude < 0:
+            return FULL
+        return (
+            -magnitude if left[0] < 0 else 0,
+            magnitude if left[1] > 0 else 0,
+        )
+    if oper in _COMPARISONS:
+        return (-1, 1)
+    if oper in _BITWISE:
+        if oper == "&" and (left[0] >= 0 or right[0] >= 0):
+            return (0, min(high for low, high in (left, right) if low >= 0))
+        bits = max(_bits(left), _bits(right))
+        return (-(2 ** (bits - 1)), 2 ** (bits - 1) - 1)
+    if oper in (">>", ">>>") and left[0] >= 0:
+        return (0, left[1])
+    return FULL
+
+
+def _mirror(oper: str) -> str:
+    return {"<": ">", "<=": ">=", ">": "<", ">=": "<="}.get(oper, oper)
+
+
+def _hull(first: Interval, second: Interval) -> Interval:
+    return min(first[0], second[0]), max(first[1], second[1])
+
+
+def _clip(value: Interval) -> Interval:
+    """
+    Values outside of 32 bits wrap around to any value
+    """
+    if value[0] < MIN or value[1] > MAX:
+        return FULL
+    return value
+
+
+def _bits(value: Interval) -> int:
+    """
+    Number of bits of a signed register that holds the range
+    """
+    return max(
+        (number if number >= 0 else ~number).bit_length() + 1 for number in value
+    )
@@ -12,6 +12,46 @@ class UnknownValueError(Exception):
     """
 
 
+class TruncatedRecordError(ValueError):
+    """
+    A streamed record ended early, e.g. the simulation was killed while writing it
+    """
+
+
+class OutputMismatchError(Exception):
+    """
+    Simulated output differs from the output of the Python function
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        test_case_index: int,
+        test_case: tuple[int, ...],
+        output_index: int,
+        row: int,
+        expected: object,
+        actual: object,
+    ) -> None:
+        """
+        :param output_index: index of the output within its test case
+        :param row: index of the displayed row of the output,
+            i.e. a record or line of the testbench
+        :param expected: None if the simulation output more than expected
+        :param actual: None if the simulation ended early
+        """
+        self.test_case_index = test_case_index
+        self.test_case = test_case
+        self.output_index = output_index
+        self.row = row
+        self.expected = expected
+        self.actual = actual
+        super().__init__(
+            f"Expected {expected} but got {actual} at row {row}, "
+            f"output {output_index} of test case {test_case_index} {test_case}"
+        )
+
+
 class UnsupportedSyntaxError(Exception):
     """
     Python syntax was not within the supported subset
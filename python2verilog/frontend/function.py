@@ -4,7 +4,6 @@ The freshest in-order generator parser
 from __future__ import annotations
 
 import ast as pyast
-import copy
 import itertools
 import logging
 from typing import Collection, Iterable, Optional, TypeVar, cast
@@ -15,6 +14,9 @@ from python2verilog import ir
 from python2verilog.exceptions import StaticTypingError, UnsupportedSyntaxError
 from python2verilog.utils.typed import guard, typed_list, typed_strict
 
+# Prefix of inlining templates, replaced by the prefix of each call site
+TEMPLATE_PREFIX = "\0"
+
 
 class Function:
     """
@@ -25,7 +27,7 @@ class Function:
     ParseResult: TypeAlias = tuple[ir.Node, list[ir.Edge]]
 
     def __init__(self, context: ir.Context, prefix: str = "") -> None:
-        self.__context = copy.deepcopy(context)
+        self.__context = context.copy()
         self.__context.prefix = prefix
         self.__context.refresh_input_output_vars()  # Update to use prefix
         self.__head_and_tails: Optional[tuple[ir.Node, list[ir.Edge]]] = None
@@ -49,7 +51,7 @@ class Function:
         :return: context, head, tails
         """
         if self.__head_and_tails:
-            return copy.deepcopy(self.__context), *self.__head_and_tails
+            return self.__context.copy(), *self.__head_and_tails
 
         breaks: list[ir.Edge] = []
         continues: list[ir.Edge] = []
@@ -68,7 +70,35 @@ class Function:
             tail.child = self._create_done(prefix="_state_done")
 
         self.__head_and_tails = body_head, prev_tails
-        return copy.deepcopy(self.__context), *self.__head_and_tails
+        return self.__context.copy(), *self.__head_and_tails
+
+    @staticmethod
+    def parse_inline_template(
+        context: ir.Context, prefix: str
+    ) -> tuple[ir.Context, ir.Node, list[ir.Edge]]:
+        """
+        Parses function for inlining at a call site with prefix.
+
+        The function is parsed once into a template that is stored on its context,
+        then the template is copied with its prefix replaced for each call site.
+
+        :return: context, head, tails
+        """
+        # pylint: disable=protected-access
+        template = context._inline_template
+        if template is None:
+            template = Function(context, prefix=TEMPLATE_PREFIX).parse_inline()
+            object.__setattr__(context, "_inline_template", template)
+        template_cxt, template_head, template_tails = template
+
+        def rename(name: str) -> str:
+            return name.replace(TEMPLATE_PREFIX, prefix)
+
+        clones = ir.clone_graph(template_head, rename)
+        head = clones[id(template_head)]
+        assert isinstance(head, ir.Node)
+        tails = typed_list([clones[id(tail)] for tail in template_tails], ir.Edge)
+        return template_cxt.rename(rename), head, tails
 
     def _create_done(self, prefix: str) -> ir.Node:
         """
@@ -307,9 +337,9 @@ class Function:
 
         Implemented as an inline (no external unit).
         """
-        callee_cxt, body_head, prev_tails = Function(
+        callee_cxt, body_head, prev_tails = Function.parse_inline_template(
             callee_cxt, prefix=f"{prefix}_"
-        ).parse_inline()
+        )
 
         arguments = list(map(self._parse_expression, call_args))
 
@@ -26,8 +26,11 @@ from .expressions import (
     UnaryOp,
     Unknown,
     Var,
+    hash_cons,
+    rename_vars,
 )
 from .graph import (
+    Arena,
     AssignNode,
     BasicElement,
     BasicNode,
@@ -37,7 +40,9 @@ from .graph import (
     IfElseNode,
     Node,
     NonClockedEdge,
+    clone_graph,
     create_cytoscape_elements,
     create_networkx_adjacency_list,
+    optimal_children,
 )
 from .instance import Instance
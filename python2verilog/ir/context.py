@@ -7,15 +7,18 @@ from __future__ import annotations
 
 import ast
 import copy
+import inspect
 import logging
+import textwrap
 from dataclasses import dataclass, field
 from itertools import zip_longest
 from types import FunctionType
-from typing import Any, Optional
+from typing import Any, Callable, Optional
 
 from python2verilog.api.modes import Modes
 from python2verilog.exceptions import StaticTypingError, TypeInferenceError
-from python2verilog.ir.expressions import ExclusiveVar, State, Var
+from python2verilog.ir.expressions import ExclusiveVar, State, Var, rename_vars
+from python2verilog.ir.graph import Edge, Node
 from python2verilog.ir.instance import Instance
 from python2verilog.ir.signals import ProtocolSignals
 from python2verilog.utils.generics import GenericReprAndStr
@@ -40,7 +43,7 @@ class Context(GenericReprAndStr):
     test_cases: list[tuple[int, ...]] = field(default_factory=list)
 
     py_func: Optional[FunctionType] = None
-    py_string: Optional[str] = None
+    _py_string: Optional[str] = None
     _py_ast: Optional[ast.FunctionDef] = None
 
     input_types: Optional[list[type[Any]]] = None
@@ -69,6 +72,12 @@ class Context(GenericReprAndStr):
         default_factory=dict
     )  # generator instances
 
+    # (context, head, tails) of this function parsed for inlining,
+    # shared by all call sites, see `Function.parse_inline_template`
+    _inline_template: Optional[tuple[Context, Node, list[Edge]]] = field(
+        default=None, repr=False, compare=False
+    )
+
     def freeze(self):
         """
         Freeze this context to be immutable
@@ -80,6 +89,81 @@ class Context(GenericReprAndStr):
             raise AttributeError("Frozen")
         return super().__setattr__(attr, value)
 
+    def copy(self) -> Context:
+        """
+        Copy of this context that can be modified independently
+
+        Values (e.g. the Python ast, variables and states) are shared,
+        as they are never modified in-place,
+        only the containers that are modified in-place are copied
+        """
+        # pylint: disable=protected-access
+        cxt = copy.copy(self)
+        object.__setattr__(cxt, "_frozen", False)
+        cxt.test_cases = list(self.test_cases)
+        cxt._local_vars = list(self._local_vars)
+        cxt._states = set(self._states)
+        cxt.namespace = dict(self.namespace)
+        cxt.generator_instances = dict(self.generator_instances)
+        return cxt
+
+    def snapshot(self) -> Context:
+        """
+        Frozen copy of this context, safe to share between read-only consumers
+        """
+        if self._frozen:
+            return self
+        cxt = self.copy()
+        cxt.freeze()
+        return cxt
+
+    def portable(self, memo: Optional[dict[int, Context]] = None) -> Context:
+        """
+        Copy of this context and its namespace that can be pickled,
+        e.g. to convert it in another process
+
+        The source and ast are resolved, then the function is dropped,
+        as functions not defined at the top-level of a module cannot be pickled
+
+        :param memo: id(context) -> portable copy, shared by the contexts of a namespace
+        """
+        # pylint: disable=protected-access
+        if memo is None:
+            memo = {}
+        if id(self) in memo:
+            return memo[id(self)]
+        cxt = self.copy()
+        memo[id(self)] = cxt
+        cxt._py_ast = self.py_ast
+        cxt.py_string = typed_strict(self.py_string, str)
+        cxt.py_func = None
+        cxt._inline_template = None
+        cxt.namespace = {
+            name: callee.portable(memo) for name, callee in self.namespace.items()
+        }
+        return cxt
+
+    def rename(self, rename: Callable[[str], str]) -> Context:
+        """
+        Copy of this context with its prefix, entry state
+        and the names of its variables renamed
+        """
+        # pylint: disable=protected-access
+        cxt = self.copy()
+        cxt.prefix = rename(self.prefix)
+
+        def rename_all(variables):
+            return [rename_vars(var, rename) for var in variables]
+
+        if self._input_vars is not None:
+            cxt._input_vars = typed_list(rename_all(self._input_vars), Var)
+        if self._output_vars is not None:
+            cxt._output_vars = typed_list(rename_all(self._output_vars), ExclusiveVar)
+        cxt._local_vars = typed_list(rename_all(self._local_vars), Var)
+        if self._entry_state is not None:
+            cxt._entry_state = State(rename(self._entry_state.ver_name))
+        return cxt
+
     @classmethod
     def empty_valid(cls):
         """
@@ -162,7 +246,8 @@ class Context(GenericReprAndStr):
         :return: self
         """
         assert isinstance(self.py_ast, ast.FunctionDef), self
-        assert isinstance(self.py_func, FunctionType), self
+        # Portable contexts only have the function's source
+        assert self.py_func is None or isinstance(self.py_func, FunctionType), self
 
         if self.input_types is None:
             self._use_input_type_hints()
@@ -187,18 +272,44 @@ class Context(GenericReprAndStr):
 
         return self
 
+    @property
+    def py_string(self) -> Optional[str]:
+        """
+        Python source of the function
+
+        Retrieved from py_func on first use, as getting the source is slow
+        """
+        if self._py_string is None and self.py_func is not None:
+            object.__setattr__(self, "_py_string", inspect.getsource(self.py_func))
+        return self._py_string
+
+    @py_string.setter
+    def py_string(self, other: str):
+        self._py_string = typed_strict(other, str)
+
     @property
     def py_ast(self):
         """
         Python ast node rooted at function
+
+        Parsed from py_string on first use, shared so must not be modified
         """
+        if self._py_ast is None and self.py_string is not None:
+            tree = ast.parse(textwrap.dedent(self.py_string))
+            assert len(tree.body) == 1
+            func_ast = tree.body[0]
+            assert isinstance(
+                func_ast, ast.FunctionDef
+            ), f"Got {type(func_ast)} expected {ast.FunctionDef}"
+            object.__setattr__(self, "_py_ast", func_ast)
         assert isinstance(self._py_ast, ast.FunctionDef)
-        return copy.deepcopy(self._py_ast)
+        return self._py_ast
 
     @py_ast.setter
     def py_ast(self, other: ast.FunctionDef):
         assert isinstance(other, ast.FunctionDef)
         self._py_ast = other
+        self._inline_template = None
 
     @property
     def entry_state(self):
@@ -206,7 +317,7 @@ class Context(GenericReprAndStr):
         The first state that does work in the graph representation
         """
         assert isinstance(self._entry_state, State), self
-        return copy.deepcopy(self._entry_state)
+        return self._entry_state
 
     @entry_state.setter
     def entry_state(self, other: State):
@@ -219,7 +330,7 @@ class Context(GenericReprAndStr):
         The ready state
         """
         assert isinstance(self._done_state, State), self
-        return copy.deepcopy(self._done_state)
+        return self._done_state
 
     @done_state.setter
     def done_state(self, other: State):
@@ -232,7 +343,7 @@ class Context(GenericReprAndStr):
         Input variables
         """
         assert guard(self._input_vars, list)
-        return copy.deepcopy(self._input_vars)
+        return list(self._input_vars)
 
     @input_vars.setter
     def input_vars(self, other: list[Var]):
@@ -244,7 +355,7 @@ class Context(GenericReprAndStr):
         Output variables
         """
         assert guard(self._output_vars, list), f"Unknown output variables {self}"
-        return copy.deepcopy(self._output_vars)
+        return list(self._output_vars)
 
     def default_output_vars(self):
         """
@@ -270,7 +381,7 @@ class Context(GenericReprAndStr):
         """
         Gets local variables
         """
-        return copy.deepcopy(self._local_vars)
+        return list(self._local_vars)
 
     def add_local_var(self, var: Var):
         """
@@ -307,7 +418,7 @@ class Context(GenericReprAndStr):
         """
         State variables
         """
-        return copy.deepcopy(self._states)
+        return frozenset(self._states)
 
     def add_state(self, name: str):
         """
@@ -7,7 +7,10 @@ that are synthesizable
 """
 from __future__ import annotations
 
-from typing import Optional
+import copy
+import sys
+import weakref
+from typing import Callable, Optional, TypeVar
 
 from python2verilog.utils.generics import GenericRepr
 from python2verilog.utils.typed import guard, typed, typed_list, typed_strict
@@ -18,6 +21,8 @@ class Expression(GenericRepr):
     An expression that can be equated
     """
 
+    __slots__ = ("string", "__weakref__")
+
     def __init__(self, string: str):
         assert isinstance(string, str)
         if "_state" in string and self.__class__ == Expression:
@@ -34,6 +39,8 @@ class Expression(GenericRepr):
         return self.to_string()
 
     def __eq__(self, other: object):
+        if self is other:
+            return True
         if isinstance(other, Expression):
             return self.verilog() == other.verilog()
         return False
@@ -53,6 +60,8 @@ class Int(Expression):
     Signed integer literal
     """
 
+    __slots__ = ("value",)
+
     def __init__(self, value: int):
         self.value = int(typed_strict(value, int))  # Cast bool to int
         super().__init__(str(self.__class__))
@@ -78,6 +87,8 @@ class UInt(Expression):
     Unsigned integer literal
     """
 
+    __slots__ = ()
+
     def __init__(self, value: int):
         assert isinstance(value, int)
         super().__init__(str(value))
@@ -91,6 +102,8 @@ class Unknown(Expression):
     Unknown or "don't care" value
     """
 
+    __slots__ = ()
+
     def __init__(self):
         super().__init__("'x")
 
@@ -100,6 +113,8 @@ class Var(Expression):
     Named-variable
     """
 
+    __slots__ = ("ver_name", "py_name", "width", "is_signed", "initial_value")
+
     def __init__(
         self,
         py_name: str,
@@ -129,6 +144,8 @@ class State(Var):
     State constant
     """
 
+    __slots__ = ()
+
     def __init__(
         self, name, width: int = 32, isSigned: bool = True, initial_value: str = "0"
     ):
@@ -146,6 +163,8 @@ class ExclusiveVar(Var):
     a edge clocked or not
     """
 
+    __slots__ = ("exclusive_group",)
+
     def __init__(
         self,
         py_name: str,
@@ -169,11 +188,13 @@ class Ternary(Expression):
     <condition> ? <left> : <right>
     """
 
+    __slots__ = ("condition", "left", "right")
+
     def __init__(self, condition: Expression, left: Expression, right: Expression):
         self.condition = condition
         self.left = left
         self.right = right
-        super().__init__(self.to_string())
+        super().__init__(self.__class__.__name__)
 
     def to_string(self):
         return (
@@ -191,10 +212,12 @@ class UBinOp(Expression):
     Is usually better for comparators
     """
 
+    __slots__ = ("left", "right", "oper")
+
     def __init__(self, left: Expression, oper: str, right: Expression):
         self.left = typed_strict(left, Expression)
         self.right = typed_strict(right, Expression)
-        self.oper = typed_strict(oper, str)
+        self.oper = sys.intern(typed_strict(oper, str))
         super().__init__(self.__class__.__name__)
 
     def to_string(self):
@@ -216,6 +239,8 @@ class BinOp(UBinOp):
     https://www.01signal.com/verilog-design/arithmetic/signed-wire-reg/
     """
 
+    __slots__ = ()
+
     def verilog(self):
         return "$signed" + super().verilog()
 
@@ -228,6 +253,8 @@ class Add(BinOp):
     <left> + <right>
     """
 
+    __slots__ = ()
+
     def __init__(self, left: Expression, right: Expression):
         super().__init__(left, "+", right)
 
@@ -237,6 +264,8 @@ class Sub(BinOp):
     <left> - <right>
     """
 
+    __slots__ = ()
+
     def __init__(self, left: Expression, right: Expression):
         super().__init__(left, "-", right)
 
@@ -246,6 +275,8 @@ class Mul(BinOp):
     <left> * <right>
     """
 
+    __slots__ = ()
+
     def __init__(self, left: Expression, right: Expression):
         super().__init__(left, "*", right)
 
@@ -255,6 +286,8 @@ class Div(BinOp):
     <left> / <right>
     """
 
+    __slots__ = ()
+
     def __init__(self, left: Expression, right: Expression):
         super().__init__(left, "/", right)
 
@@ -264,6 +297,8 @@ class LessThan(UBinOp):
     <left> < <right>
     """
 
+    __slots__ = ()
+
     def __init__(self, left: Expression, right: Expression):
         super().__init__(left, "<", right)
 
@@ -273,6 +308,8 @@ class Pow(UBinOp):
     <left> ** <right>
     """
 
+    __slots__ = ()
+
     def __init__(self, left: Expression, right: Expression):
         super().__init__(left, "**", right)
 
@@ -282,6 +319,8 @@ class _Mod(UBinOp):
     <left> % <right>
     """
 
+    __slots__ = ()
+
     def __init__(self, left: Expression, right: Expression):
         super().__init__(left, "%", right)
 
@@ -291,8 +330,10 @@ class UnaryOp(Expression):
     <op>(<expr>)
     """
 
+    __slots__ = ("oper", "expr")
+
     def __init__(self, oper: str, expr: Expression):
-        self.oper = typed_strict(oper, str)
+        self.oper = sys.intern(typed_strict(oper, str))
         self.expr = typed_strict(expr, Expression)
         super().__init__(self.__class__.__name__)
 
@@ -314,6 +355,8 @@ class Mod(BinOp):
     <left> % <right>
     """
 
+    __slots__ = ()
+
     def __init__(self, left: Expression, right: Expression):
         self.left = typed_strict(left, Expression)
         self.right = typed_strict(right, Expression)
@@ -343,6 +386,8 @@ class FloorDiv(BinOp):
     Follows Python conventions
     """
 
+    __slots__ = ()
+
     def __init__(self, left: Expression, right: Expression):
         self.left = typed_strict(left, Expression)
         self.right = typed_strict(right, Expression)
@@ -373,3 +418,125 @@ class FloorDiv(BinOp):
                 ),
             ),
         ).verilog()
+
+
+# Structural key -> canonical expression
+_hash_consed: weakref.WeakValueDictionary[
+    tuple[object, ...], Expression
+] = weakref.WeakValueDictionary()
+
+# id(expression) -> expression, for expressions that are canonical
+_canonical: weakref.WeakValueDictionary[int, Expression] = weakref.WeakValueDictionary()
+
+
+def _hash_cons_key(expr: Expression) -> tuple[object, ...]:
+    """
+    Structural key of an expression whose children are canonical
+    """
+    if isinstance(expr, ExclusiveVar):
+        return (
+            type(expr),
+            expr.ver_name,
+            expr.py_name,
+            expr.width,
+            expr.is_signed,
+            expr.initial_value,
+            expr.exclusive_group,
+        )
+    if isinstance(expr, Var):
+        return (
+            type(expr),
+            expr.ver_name,
+            expr.py_name,
+            expr.width,
+            expr.is_signed,
+            expr.initial_value,
+        )
+    if isinstance(expr, Int):
+        return (type(expr), expr.value)
+    if isinstance(expr, UBinOp):
+        return (type(expr), expr.oper, id(expr.left), id(expr.right))
+    if isinstance(expr, UnaryOp):
+        return (type(expr), expr.oper, id(expr.expr))
+    if isinstance(expr, Ternary):
+        return (type(expr), id(expr.condition), id(expr.left), id(expr.right))
+    return (type(expr), expr.string)
+
+
+def hash_cons(expr: Expression) -> Expression:
+    """
+    Gets the canonical instance of an expression,
+    such that structurally equal hash-consed expressions are the same object.
+
+    Subtrees are shared, so hash-consed expressions must not be mutated.
+    Can be compared by identity instead of by their strings.
+    """
+    if _canonical.get(id(expr)) is expr:
+        return expr
+
+    children: dict[str, Expression] = {}
+    if isinstance(expr, UBinOp):
+        children = {"left": expr.left, "right": expr.right}
+    elif isinstance(expr, UnaryOp):
+        children = {"expr": expr.expr}
+    elif isinstance(expr, Ternary):
+        children = {
+            "condition": expr.condition,
+            "left": expr.left,
+            "right": expr.right,
+        }
+    consed = {name: hash_cons(child) for name, child in children.items()}
+    if any(consed[name] is not child for name, child in children.items()):
+        expr = copy.copy(expr)
+        for name, child in consed.items():
+            setattr(expr, name, child)
+
+    key = _hash_cons_key(expr)
+    canonical = _hash_consed.get(key)
+    if canonical is None:
+        _hash_consed[key] = expr
+        _canonical[id(expr)] = expr
+        canonical = expr
+    return canonical
+
+
+_ExpressionT = TypeVar("_ExpressionT", bound=Expression)
+
+
+def rename_vars(expr: _ExpressionT, rename: Callable[[str], str]) -> _ExpressionT:
+    """
+    Gets a copy of an expression with the names of its variables renamed,
+    subtrees without renamed variables are shared
+    """
+    if isinstance(expr, Var):
+        ver_name, py_name = rename(expr.ver_name), rename(expr.py_name)
+        if ver_name == expr.ver_name and py_name == expr.py_name:
+            return expr
+        renamed = copy.copy(expr)
+        renamed.ver_name = ver_name
+        renamed.py_name = py_name
+        renamed.string = ver_name
+        if isinstance(renamed, ExclusiveVar):
+            renamed.exclusive_group = rename(renamed.exclusive_group)
+        return renamed
+
+    children: dict[str, Expression] = {}
+    if isinstance(expr, UBinOp):
+        children = {"left": expr.left, "right": expr.right}
+    elif isinstance(expr, UnaryOp):
+        children = {"expr": expr.expr}
+    elif isinstance(expr, Ternary):
+        children = {
+            "condition": expr.condition,
+            "left": expr.left,
+            "right": expr.right,
+        }
+    renamed_children = {
+        name: rename_vars(child, rename) for name, child in children.items()
+    }
+    if all(renamed_children[name] is child for name, child in children.items()):
+        return expr
+    expr = copy.copy(expr)
+    for name, child in renamed_children.items():
+        setattr(expr, name, child)
+    return expr
@@ -9,9 +9,12 @@ Element := Vertex | Edge
 
 from __future__ import annotations
 
-from typing import Iterator, Optional
+import copy
+from array import array
+from typing import Callable, Iterable, Iterator, Optional
 
 from python2verilog.ir import expressions as expr
+from python2verilog.utils.bitset import Bitset
 from python2verilog.utils.typed import guard, typed, typed_strict
 
 
@@ -35,18 +38,39 @@ def get_variables(exp: expr.Expression) -> Iterator[expr.Var]:
 class Element:
     """
     Element, base class for vertex or edge
+
+    An optimal element (created by the optimizer) is given its origin's unique_id
+    and an integer, its own unique_id is only formatted when first read
     """
 
-    def __init__(self, unique_id: str, name: str = ""):
+    __slots__ = ("name", "_unique_id", "_optimal", "_formatted_id")
+
+    def __init__(self, unique_id: str, name: str = "", optimal: Optional[int] = None):
         self.name = typed_strict(name, str)
-        self.unique_id = typed_strict(unique_id, str)
+        self._unique_id = typed_strict(unique_id, str)
+        self._optimal = typed(optimal, int)
+        self._formatted_id: Optional[str] = None
+
+    @property
+    def unique_id(self) -> str:
+        """
+        Unique id, `<origin unique_id>_optimal_<optimal>` for optimal elements
+        """
+        if self._optimal is None:
+            return self._unique_id
+        if self._formatted_id is None:
+            self._formatted_id = f"{self._unique_id}_optimal_{self._optimal}"
+        return self._formatted_id
 
     def __hash__(self) -> int:
-        return hash(self.unique_id)
+        return hash((self._unique_id, self._optimal))
 
     def __eq__(self, __value: object):
         if isinstance(__value, Element):
-            return self.unique_id == __value.unique_id
+            return (
+                self._unique_id == __value._unique_id
+                and self._optimal == __value._optimal
+            )
         return False
 
     def visit_nonclocked(self) -> Iterator[Element]:
@@ -76,6 +100,28 @@ class Element:
 
         The reason reads are also included is because checking a callee's
         ready signal more than once in a clock cycle is usually incorrect.
+
+        Elements shared by several paths are only walked once
+        """
+        visited: set[int] = {id(self)}
+        stack: list[Element] = [self]
+        while stack:
+            element = stack.pop()
+            yield from element.local_exclusions()
+            for child in element.exclusion_children():
+                if id(child) not in visited:
+                    visited.add(id(child))
+                    stack.append(child)
+
+    def local_exclusions(self) -> Iterator[str]:
+        """
+        Exclusion groups read or written to by this element itself
+        """
+        yield from ()
+
+    def exclusion_children(self) -> Iterator[Element]:
+        """
+        Elements whose exclusions are included in the exclusions of this element
         """
         yield from ()
 
@@ -85,6 +131,8 @@ class BasicElement(Element):
     Basic element with a single child
     """
 
+    __slots__ = ("_child", "_optimal_child")
+
     def __init__(
         self,
         unique_id: str,
@@ -145,6 +193,8 @@ class Node(Element):
     Vertex
     """
 
+    __slots__ = ()
+
     def __repr__(self) -> str:
         return self.name
 
@@ -154,6 +204,14 @@ class IfElseNode(Node, Element):
     Represents an if-else statement
     """
 
+    __slots__ = (
+        "true_edge",
+        "false_edge",
+        "condition",
+        "_optimal_true_edge",
+        "_optimal_false_edge",
+    )
+
     def __init__(
         self,
         unique_id: str,
@@ -205,21 +263,23 @@ class IfElseNode(Node, Element):
         if self._optimal_false_edge:
             yield self._optimal_false_edge
 
-    def exclusions(self):
+    def local_exclusions(self):
         for var in get_variables(self.condition):
             if isinstance(var, expr.ExclusiveVar):
                 yield var.exclusive_group
-        yield from self.optimal_true_edge.exclusions()
-        yield from self.optimal_false_edge.exclusions()
+
+    def exclusion_children(self):
+        yield self.optimal_true_edge
+        yield self.optimal_false_edge
 
     def __repr__(self):
         return f"If{self.condition}"
 
     def visit_nonclocked(self) -> Iterator[Element]:
         yield self
-        yield Node(unique_id="", name="True Branch")
+        yield Node(unique_id=f"{self.unique_id}_true", name="True Branch")
         yield from self.optimal_true_edge.visit_nonclocked()
-        yield Node(unique_id="", name="False Branch")
+        yield Node(unique_id=f"{self.unique_id}_false", name="False Branch")
         yield from self.optimal_false_edge.visit_nonclocked()
 
 
@@ -229,6 +289,8 @@ class BasicNode(Node, BasicElement):
     Has one child.
     """
 
+    __slots__ = ()
+
     def __init__(self, unique_id: str, *args, child: Edge | None = None, **kwargs):
         super().__init__(unique_id, *args, **kwargs)
         self._child = child
@@ -254,6 +316,8 @@ class AssignNode(BasicNode):
     the next statements, without a clock cycle having to pass
     """
 
+    __slots__ = ("lvalue", "rvalue")
+
     def __init__(
         self,
         unique_id: str,
@@ -271,13 +335,15 @@ class AssignNode(BasicNode):
     def __repr__(self):
         return f"{self.lvalue} = {self.rvalue}"
 
-    def exclusions(self):
+    def local_exclusions(self):
         for var in get_variables(self.lvalue):
             if isinstance(var, expr.ExclusiveVar):
                 yield var.exclusive_group
         yield from get_variables(self.rvalue)
+
+    def exclusion_children(self):
         if self._child:
-            yield from self.child.exclusions()
+            yield self.child
 
 
 class Edge(BasicElement):
@@ -285,6 +351,8 @@ class Edge(BasicElement):
     Represents an edge between two vertices
     """
 
+    __slots__ = ()
+
     def __init__(self, unique_id: str, *args, child: Element | None = None, **kwargs):
         super().__init__(unique_id, *args, child=child, **kwargs)
         self._child = child
@@ -302,8 +370,10 @@ class NonClockedEdge(Edge):
     i.e. no clock cycle has to pass for the next node to be executed
     """
 
-    def exclusions(self):
-        yield from self.child.exclusions()
+    __slots__ = ()
+
+    def exclusion_children(self):
+        yield self.child
 
     def __repr__(self) -> str:
         return "=>"
@@ -315,86 +385,227 @@ class ClockedEdge(Edge):
     i.e. a clock cycle has to pass for the next node to be executed
     """
 
-    def exclusions(self):
-        yield from ()
+    __slots__ = ()
 
     def __repr__(self):
         return "=/>"
 
 
-def create_networkx_adjacency_list(node: Element):
+def optimal_children(element: Element) -> Iterator[Optional[Element]]:
     """
-    Creates adjacency list from a node
+    Gets the children of an element on its optimal paths,
+    i.e. [optimal_child] or [optimal_true_edge, optimal_false_edge]
+    """
+    if isinstance(element, IfElseNode):
+        yield element.optimal_true_edge
+        yield element.optimal_false_edge
+    elif isinstance(element, BasicElement):
+        yield element.optimal_child
 
-    Assumes names are unique
+
+class Arena:
     """
-    adjacency_list = {}
+    Array-backed view of the graph reachable from a root
 
-    def traverse_graph(curr_node: Element, visited: set[Element]):
-        if not curr_node:
-            return
+    Elements are referred to by their index in `elements` (the root is 0),
+    the successors of element i are `targets[offsets[i]:offsets[i + 1]]`,
+    where -1 stands for a missing child
+    """
 
-        nonlocal adjacency_list
-        if curr_node in visited:
-            return
+    __slots__ = ("elements", "offsets", "targets", "_indices")
 
-        visited.add(curr_node)
-        children = curr_node.children()
-        adjacency_list[curr_node] = children
+    def __init__(
+        self,
+        root: Element,
+        successors: Optional[Callable[[Element], Iterable[Optional[Element]]]] = None,
+    ):
+        """
+        :param successors: children of an element, defaults to element.children()
+        """
+        self.elements: list[Element] = []
+        self.offsets = array("l", [0])
+        self.targets = array("l")
+
+        # id(element) -> index
+        self._indices: dict[int, int] = {}
+
+        # Depth-first pre-order, same as a recursive walk
+        children: list[list[Optional[Element]]] = []
+        stack: list[Element] = [root]
+        while stack:
+            element = stack.pop()
+            if id(element) in self._indices:
+                continue
+            self._indices[id(element)] = len(self.elements)
+            self.elements.append(element)
+            children.append(
+                list(successors(element) if successors else element.children())
+            )
+            stack.extend(child for child in reversed(children[-1]) if child is not None)
 
-        for child in children:
-            traverse_graph(child, visited)
+        for element_children in children:
+            self.targets.extend(
+                -1 if child is None else self._indices[id(child)]
+                for child in element_children
+            )
+            self.offsets.append(len(self.targets))
 
-    traverse_graph(node, set())
-    return adjacency_list
+    def __len__(self) -> int:
+        return len(self.elements)
 
+    def index(self, element: Element) -> int:
+        """
+        Gets index of element
+        """
+        return self._indices[id(element)]
 
-def create_cytoscape_elements(node: Element):
+    def successors(self, index: int) -> array[int]:
+        """
+        Gets indices of the successors of an element
+        """
+        return self.targets[self.offsets[index] : self.offsets[index + 1]]
+
+    def visited(self) -> Bitset:
+        """
+        Creates an empty visited set for the elements
+        """
+        return Bitset(len(self.elements))
+
+    def components(self) -> list[int]:
+        """
+        Strongly connected component of each element,
+        i.e. elements on a common cycle share a component
+
+        Tarjan's algorithm with an explicit stack
+        """
+        component = [-1] * len(self)
+        order = [-1] * len(self)
+        lowlink = [0] * len(self)
+        # Discovered elements without a component, i.e. Tarjan's stack
+        members: list[int] = []
+        discovered = components = 0
+
+        def discover(index: int):
+            nonlocal discovered
+            order[index] = lowlink[index] = discovered
+            discovered += 1
+            members.append(index)
+
+        for start in range(len(self)):
+            if order[start] >= 0:
+                continue
+            discover(start)
+            # (element, position of its next successor in targets)
+            work = [(start, self.offsets[start])]
+            while work:
+                index, position = work[-1]
+                if position < self.offsets[index + 1]:
+                    work[-1] = (index, position + 1)
+                    successor = self.targets[position]
+                    if successor < 0:
+                        continue
+                    if order[successor] < 0:
+                        discover(successor)
+                        work.append((successor, self.offsets[successor]))
+                    elif component[successor] < 0:
+                        lowlink[index] = min(lowlink[index], order[successor])
+                    continue
+                work.pop()
+                if work:
+                    parent, _ = work[-1]
+                    lowlink[parent] = min(lowlink[parent], lowlink[index])
+                if lowlink[index] == order[index]:
+                    while True:
+                        member = members.pop()
+                        component[member] = components
+                        if member == index:
+                            break
+                    components += 1
+        return component
+
+
+def clone_graph(root: Element, rename: Callable[[str], str]) -> dict[int, Element]:
+    """
+    Copies the graph reachable from root,
+    renaming the unique ids of its elements and the variables of its expressions
+
+    :return: id(element) -> copy of element
+    """
+    # pylint: disable=protected-access
+    arena = Arena(root)
+    clones: dict[int, Element] = {}
+    for element in arena.elements:
+        clone = copy.copy(element)
+        clone._unique_id = rename(element._unique_id)
+        clone._formatted_id = None
+        clones[id(element)] = clone
+
+    def relink(child):
+        return None if child is None else clones[id(child)]
+
+    for clone in clones.values():
+        if isinstance(clone, BasicElement):
+            clone._child = relink(clone._child)
+            clone._optimal_child = relink(clone._optimal_child)
+        if isinstance(clone, AssignNode):
+            clone.lvalue = expr.rename_vars(clone.lvalue, rename)
+            clone.rvalue = expr.rename_vars(clone.rvalue, rename)
+        elif isinstance(clone, IfElseNode):
+            clone.true_edge = relink(clone.true_edge)
+            clone.false_edge = relink(clone.false_edge)
+            clone._optimal_true_edge = relink(clone._optimal_true_edge)
+            clone._optimal_false_edge = relink(clone._optimal_false_edge)
+            clone.condition = expr.rename_vars(clone.condition, rename)
+    return clones
+
+
+def create_networkx_adjacency_list(node: Element):
     """
     Creates adjacency list from a node
 
     Assumes names are unique
     """
-    nodes = []
-    edges = []
+    arena = Arena(node)
+    return {
+        element: [arena.elements[child] for child in arena.successors(index)]
+        for index, element in enumerate(arena.elements)
+    }
 
-    def traverse_graph(curr_node: Element, visited: set[str]):
-        if not curr_node:
-            return
 
-        nonlocal nodes
-        if curr_node.unique_id in visited:
-            return
+def create_cytoscape_elements(node: Element):
+    """
+    Creates adjacency list from a node
 
-        visited.add(curr_node.unique_id)
-        children = curr_node.children()
+    Assumes names are unique
+    """
+    nodes = []
+    edges = []
 
-        if not isinstance(curr_node, Edge):
-            nodes.append(
+    arena = Arena(node)
+    for index, element in enumerate(arena.elements):
+        if isinstance(element, Edge):
+            continue
+        nodes.append(
+            {
+                "data": {
+                    "id": element.unique_id,
+                    "label": str(element),
+                    "class": str(element.__class__.__name__),
+                }
+            }
+        )
+        for child in arena.successors(index):
+            edge = arena.elements[child]
+            assert guard(edge, BasicElement)
+            edges.append(
                 {
                     "data": {
-                        "id": curr_node.unique_id,
-                        "label": str(curr_node),
-                        "class": str(curr_node.__class__.__name__),
+                        "source": element.unique_id,
+                        "target": edge.child.unique_id,
+                        "class": str(edge.__class__.__name__),
+                        "label": str(edge),
                     }
                 }
             )
-            for child in curr_node.children():
-                assert guard(child, BasicElement)
-                edges.append(
-                    {
-                        "data": {
-                            "source": curr_node.unique_id,
-                            "target": child.child.unique_id,
-                            "class": str(child.__class__.__name__),
-                            "label": str(child),
-                        }
-                    }
-                )
-
-            for child in children:
-                assert guard(child, BasicElement)
-                traverse_graph(child.child, visited)
 
-    traverse_graph(node, set())
     return {"nodes": nodes, "edges": edges}
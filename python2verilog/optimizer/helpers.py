@@ -16,24 +16,50 @@ def backwards_replace(
 
     Note: ignores exclusive vars in replacement process
 
-    :return: a copy of the updated expression.
+    Expressions are not mutated, only the nodes above a replacement are copied,
+    so unchanged subtrees (and mapped values) are shared with the result.
+
+    :return: the updated expression, or expr itself if nothing was replaced.
     """
-    expr = copy.deepcopy(expr)
-    if isinstance(expr, ir.Var):
-        for key in mapping:
-            if key.to_string() == expr.to_string():
-                return mapping[key]
-    elif isinstance(expr, (ir.UInt, ir.Int)):
-        return expr
-    elif isinstance(expr, (ir.BinOp, ir.UBinOp)):
-        expr.left = backwards_replace(expr.left, mapping)
-        expr.right = backwards_replace(expr.right, mapping)
-    elif isinstance(expr, ir.Ternary):
-        expr.condition = backwards_replace(expr.condition, mapping)
-        expr.left = backwards_replace(expr.left, mapping)
-        expr.right = backwards_replace(expr.right, mapping)
-    elif isinstance(expr, ir.UnaryOp):
-        expr.expr = backwards_replace(expr.expr, mapping)
-    else:
-        raise TypeError(f"{type(expr)} {expr}")
-    return expr
+    # id(expression) -> replaced expression, for subtrees shared within expr
+    replaced: dict[int, ir.Expression] = {}
+
+    def replace(expr: ir.Expression) -> ir.Expression:
+        if id(expr) in replaced:
+            return replaced[id(expr)]
+        result: ir.Expression = expr
+        if isinstance(expr, ir.Var):
+            result = mapping.get(expr, expr)
+        elif isinstance(expr, (ir.UInt, ir.Int)):
+            pass
+        elif isinstance(expr, (ir.BinOp, ir.UBinOp)):
+            left = replace(expr.left)
+            right = replace(expr.right)
+            if left is not expr.left or right is not expr.right:
+                result = copy.copy(expr)
+                result.left = left
+                result.right = right
+        elif isinstance(expr, ir.Ternary):
+            condition = replace(expr.condition)
+            left = replace(expr.left)
+            right = replace(expr.right)
+            if (
+                condition is not expr.condition
+                or left is not expr.left
+                or right is not expr.right
+            ):
+                result = copy.copy(expr)
+                result.condition = condition
+                result.left = left
+                result.right = right
+        elif isinstance(expr, ir.UnaryOp):
+            inner = replace(expr.expr)
+            if inner is not expr.expr:
+                result = copy.copy(expr)
+                result.expr = inner
+        else:
+            raise TypeError(f"{type(expr)} {expr}")
+        replaced[id(expr)] = result
+        return result
+
+    return replace(expr)
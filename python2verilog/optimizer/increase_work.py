@@ -3,9 +3,9 @@ IncreaseWorkPerClockCycle
 """
 
 import copy
-import itertools
 import logging
-from typing import Any, Callable, Iterator
+from enum import Enum
+from typing import Any, Callable, Hashable, Iterator
 
 from python2verilog import ir
 from python2verilog.optimizer.helpers import backwards_replace
@@ -13,6 +13,96 @@ from python2verilog.utils.peek_counter import PeekCounter
 from python2verilog.utils.typed import guard, guard_dict, typed
 
 
+class _Work(Enum):
+    """
+    Kinds of work items on the optimizer's stack
+    """
+
+    APPLY = 0  # (node,)
+    PATH = 1  # (edge, new_mapping, old_mapping, visited_path, groups)
+    ASSIGN = 2  # (key, new_edge, node, optimal, rvalue)
+    IFELSE = 3  # (key, new_edge, node, optimal, condition)
+    OPTIMAL_CHILD = 4  # (root,)
+    OPTIMAL_TRUE = 5  # (root,)
+    OPTIMAL_FALSE = 6  # (root,)
+
+
+class _Caches:
+    """
+    Caches of the optimizer
+
+    Exclusions of an if-else node include its optimal edges,
+    so the cached exclusions and memoized paths are cleared
+    whenever an optimal edge is set.
+    Paths are keyed with the generation they were started in,
+    as a path may set optimal edges before it is memoized
+    """
+
+    # Number of memoized paths before they are cleared
+    PATH_LIMIT = 1 << 16
+
+    def __init__(self, root: ir.Node):
+        # id(element) -> strongly connected component of element
+        arena = ir.Arena(root)
+        self.components = dict(zip(map(id, arena.elements), arena.components()))
+
+        # unique_id -> exclusions of node
+        self.exclusions: dict[str, set[Any]] = {}
+
+        # state key -> optimal edge created from that state
+        self.paths: dict[Hashable, ir.Edge] = {}
+        self.generation = 0
+        self.hits = 0
+        # id(expression) -> expression, keeps expressions in keys alive
+        self.expressions: dict[int, ir.Expression] = {}
+
+    def node_exclusions(self, node: ir.Element) -> set[Any]:
+        """
+        Exclusions of a node, see `ir.Element.exclusions`,
+        built from the cached exclusions of the elements it includes
+        """
+        # (element, if its children are cached)
+        stack = [(node, False)]
+        while stack:
+            element, expanded = stack.pop()
+            if element.unique_id in self.exclusions:
+                continue
+            if expanded:
+                exclusions = set(element.local_exclusions())
+                for child in element.exclusion_children():
+                    exclusions |= self.exclusions.get(child.unique_id, set())
+                self.exclusions[element.unique_id] = exclusions
+            else:
+                stack.append((element, True))
+                stack.extend((child, False) for child in element.exclusion_children())
+        return self.exclusions[node.unique_id]
+
+    def mapping_key(self, mapping: dict[ir.Var, ir.Expression]) -> frozenset[Any]:
+        """
+        Hashable key for a mapping of hash-consed expressions, by their identity
+        """
+        for value in mapping.values():
+            self.expressions.setdefault(id(value), value)
+        return frozenset((var.ver_name, id(value)) for var, value in mapping.items())
+
+    def memoize(self, key: Hashable, edge: ir.Edge):
+        """
+        Memoizes the optimal edge created from a state
+        """
+        if len(self.paths) >= self.PATH_LIMIT:
+            self.clear()
+        self.paths[key] = edge
+
+    def clear(self):
+        """
+        Clears the cached exclusions and memoized paths
+        """
+        self.exclusions.clear()
+        self.paths.clear()
+        self.expressions.clear()
+        self.generation += 1
+
+
 class IncreaseWorkPerClockCycle:
     """
     A closure for the increase work per clock cycle optimizer
@@ -28,6 +118,16 @@ class IncreaseWorkPerClockCycle:
         1) hardware optimized with `threshold=0` completes in O(n) cycles
 
         2) hardware optimized with `threshold=x` for `x > 0` completes in O(n/(x+1)) cycles
+
+    The graph is walked with an explicit work stack (in the same depth-first
+    order as a recursive walk) so deep graphs do not hit the recursion limit.
+    Mapped values are hash-consed, so identical values share one expression.
+
+    Optimal paths are memoized on their state, so paths that reach an edge
+    in the same state, e.g. after either branch of an if-else, share one subpath.
+    Visit counts only matter for nodes that can be visited again,
+    i.e. nodes on a cycle with the current node, so a path only keeps
+    the visit counts of the strongly connected component it is in.
     """
 
     def __init__(self, root: ir.Node, threshold: int = 0):
@@ -38,6 +138,11 @@ class IncreaseWorkPerClockCycle:
         self.make_unique = counter.next
         self.make_unique_peek = counter.peek
 
+        self._stack: list[tuple[Any, ...]] = []
+        self._results: list[ir.Edge] = []
+
+        self._caches = _Caches(root)
+
         self.apply(root)
 
     @staticmethod
@@ -65,15 +170,17 @@ class IncreaseWorkPerClockCycle:
             iterable = func(iterable)
         yield from iterable
 
-    def apply_recursive(
+    def apply_path(
         self,
         edge: ir.Edge,
         new_mapping: dict[ir.Var, ir.Expression],
         old_mapping: dict[ir.Var, ir.Expression],
         visited_path: dict[str, int],
-    ) -> ir.Edge:
+        groups: frozenset[str],
+    ):
         """
-        Recursively visits the children, conditionally adding them to an optimal path
+        Visits the children, conditionally adding them to an optimal path.
+        Pushes the resulting edge, or the work to create it, onto the stack.
 
         The concept of mapping is as follows:
 
@@ -85,21 +192,21 @@ class IncreaseWorkPerClockCycle:
         {a: 1, b: 1}
 
         :param mapping: values of variables, given the previous logic
-        :param visited: visited unique_ids and exclusive vars for this nonclocked sequence
+        :param visited_path: visit counts of the nodes of the path
+            in the strongly connected component of the edge's parent
+        :param groups: exclusive groups visited by the path
         """
         assert guard(edge, ir.Edge)
         assert guard_dict(new_mapping, ir.Var, ir.Expression)
         assert guard_dict(old_mapping, ir.Var, ir.Expression)
         assert guard(visited_path, dict)
-        for key, value in visited_path.items():
-            assert isinstance(key, (str, ir.Var)), f"{type(key)}"
-            assert guard(value, int), f"{type(value)}"
+        assert guard(groups, frozenset)
 
         node = edge.child
         assert node
         logging.debug(
             "%s node %s, new %s, old %s",
-            self.apply_recursive.__name__,
+            self.apply_path.__name__,
             node,
             new_mapping,
             old_mapping,
@@ -109,83 +216,120 @@ class IncreaseWorkPerClockCycle:
         if isinstance(edge, ir.ClockedEdge):
             old_mapping = copy.copy(new_mapping)
 
+        # Nodes visited before an edge that is not on a cycle cannot be visited again
+        components = self._caches.components
+        if components[id(edge)] != components[id(node)]:
+            visited_path = {}
+
+        key = (
+            self._caches.generation,
+            id(edge),
+            self._caches.mapping_key(new_mapping),
+            self._caches.mapping_key(old_mapping),
+            frozenset(visited_path.items()),
+            groups,
+        )
+        if key in self._caches.paths:
+            self._caches.hits += 1
+            self._results.append(self._caches.paths[key])
+            return
+
         # Check for cyclic paths
         if (
             node.unique_id in visited_path
             and visited_path[node.unique_id] > self.threshold
         ):
             assert guard(node, ir.Node)
-            self.apply(node)
-            return edge
-
-        # if "_data = _data__state2_while0_out0" == str(node):
-        #     breakpoint()
+            self._end_path(key, edge)
+            return
 
         # Exclusive vars can only be visited once
-        exclusive_vars = set(node.exclusions())
-        if exclusive_vars & visited_path.keys():
+        exclusive_vars = self._caches.node_exclusions(node)
+        if exclusive_vars & groups:
             logging.debug(
                 "Intersection %s = {%s & %s} ending on %s",
-                exclusive_vars & visited_path.keys(),
+                exclusive_vars & groups,
                 exclusive_vars,
-                visited_path.keys(),
+                groups,
                 node,
             )
             assert guard(edge, ir.ClockedEdge)
             assert guard(node, ir.Node)
-            self.apply(node)
-            return edge
+            self._end_path(key, edge)
+            return
 
         # Update visited
         if isinstance(node, ir.AssignNode) and isinstance(node.lvalue, ir.ExclusiveVar):
             assert guard(
                 node.lvalue.exclusive_group, str
             ), f"{type(node.lvalue.exclusive_group)}"
-            visited_path[node.lvalue.exclusive_group] = 1
+            groups = groups | {node.lvalue.exclusive_group}
         visited_path[node.unique_id] = visited_path.get(node.unique_id, 0) + 1
 
         new_edge: ir.Edge = ir.NonClockedEdge(
-            unique_id=f"{edge.unique_id}_optimal_{self.make_unique()}"
+            unique_id=edge.unique_id, optimal=self.make_unique()
         )
         if isinstance(node, ir.IfElseNode):
-            new_edge.child = ir.IfElseNode(
-                unique_id=f"{node.unique_id}_optimal_{self.make_unique()}",
-                condition=backwards_replace(node.condition, old_mapping),
-                true_edge=self.apply_recursive(
-                    edge=node.true_edge,
-                    new_mapping=copy.copy(new_mapping),
-                    old_mapping=copy.copy(old_mapping),
-                    visited_path=copy.copy(visited_path),
-                ),
-                false_edge=self.apply_recursive(
-                    edge=node.false_edge,
-                    new_mapping=copy.copy(new_mapping),
-                    old_mapping=copy.copy(old_mapping),
-                    visited_path=copy.copy(visited_path),
-                ),
+            self._stack.append(
+                (
+                    _Work.IFELSE,
+                    key,
+                    new_edge,
+                    node,
+                    self.make_unique(),
+                    backwards_replace(node.condition, old_mapping),
+                )
             )
+            # Reversed, so the true branch is done first
+            for branch in (node.false_edge, node.true_edge):
+                self._stack.append(
+                    (
+                        _Work.PATH,
+                        branch,
+                        copy.copy(new_mapping),
+                        copy.copy(old_mapping),
+                        copy.copy(visited_path),
+                        groups,
+                    )
+                )
         elif isinstance(node, ir.AssignNode):
-            unique_id = f"{node.unique_id}_optimal_{self.make_unique()}"
-            new_rvalue = backwards_replace(node.rvalue, old_mapping)
+            optimal = self.make_unique()
+            new_rvalue = ir.hash_cons(backwards_replace(node.rvalue, old_mapping))
             new_mapping[node.lvalue] = new_rvalue
             if node.has_child():
                 assert guard(node.child, ir.Edge)
-                new_edge.child = ir.AssignNode(
-                    unique_id=unique_id,
-                    lvalue=node.lvalue,
-                    rvalue=new_rvalue,
-                    child=self.apply_recursive(
-                        edge=node.child,
-                        new_mapping=new_mapping,
-                        old_mapping=old_mapping,
-                        visited_path=visited_path,
-                    ),
+                self._stack.append(
+                    (_Work.ASSIGN, key, new_edge, node, optimal, new_rvalue)
+                )
+                self._stack.append(
+                    (
+                        _Work.PATH,
+                        node.child,
+                        new_mapping,
+                        old_mapping,
+                        visited_path,
+                        groups,
+                    )
                 )
             else:
                 new_edge.child = node
+                self._memoize(key, new_edge)
         else:
             raise RuntimeError(f"{type(node)}")
-        return new_edge
+
+    def _memoize(self, key: Hashable, edge: ir.Edge):
+        """
+        Memoizes the optimal edge created from a state, and pushes it as a result
+        """
+        self._caches.memoize(key, edge)
+        self._results.append(edge)
+
+    def _end_path(self, key: Hashable, edge: ir.Edge):
+        """
+        Ends an optimal path on edge, then optimizes the node it leads to
+        """
+        self._memoize(key, edge)
+        self._stack.append((_Work.APPLY, edge.child))
 
     def apply(
         self,
@@ -194,9 +338,63 @@ class IncreaseWorkPerClockCycle:
         """
         Optimizes a node, by increasing amount of work done in a cycle.
         Creates an optimal path that maximizes nonclocked edges.
+
+        Nodes that optimal paths end on are optimized as well.
         """
         assert guard(root, ir.Node)
-        logging.debug("%s on %s", self.apply.__name__, root)
+        self._stack.append((_Work.APPLY, root))
+        while self._stack:
+            work, *args = self._stack.pop()
+            if work == _Work.APPLY:
+                self._apply_node(*args)
+            elif work == _Work.PATH:
+                self.apply_path(*args)
+            elif work == _Work.ASSIGN:
+                key, new_edge, node, optimal, rvalue = args
+                new_edge.child = ir.AssignNode(
+                    unique_id=node.unique_id,
+                    optimal=optimal,
+                    lvalue=node.lvalue,
+                    rvalue=rvalue,
+                    child=self._results.pop(),
+                )
+                self._memoize(key, new_edge)
+            elif work == _Work.IFELSE:
+                key, new_edge, node, optimal, condition = args
+                false_edge = self._results.pop()
+                true_edge = self._results.pop()
+                new_edge.child = ir.IfElseNode(
+                    unique_id=node.unique_id,
+                    optimal=optimal,
+                    condition=condition,
+                    true_edge=true_edge,
+                    false_edge=false_edge,
+                )
+                self._memoize(key, new_edge)
+            elif work == _Work.OPTIMAL_CHILD:
+                args[0].optimal_child = self._results.pop()
+            elif work == _Work.OPTIMAL_TRUE:
+                args[0].optimal_true_edge = self._results.pop()
+                self._caches.clear()
+            elif work == _Work.OPTIMAL_FALSE:
+                args[0].optimal_false_edge = self._results.pop()
+                self._caches.clear()
+            else:
+                raise RuntimeError(f"{work}")
+        assert not self._results, self._results
+        logging.debug(
+            "%s on %s reused %s memoized paths",
+            self.apply.__name__,
+            root,
+            self._caches.hits,
+        )
+
+    def _apply_node(self, root: ir.Node) -> None:
+        """
+        Pushes the work to create the optimal path(s) of a node
+        """
+        assert guard(root, ir.Node)
+        logging.debug("%s on %s", self._apply_node.__name__, root)
 
         if root.unique_id in self.visited:
             return
@@ -204,19 +402,21 @@ class IncreaseWorkPerClockCycle:
 
         if isinstance(root, ir.BasicNode):
             mapper: dict[ir.Var, ir.Expression] = {}
-            visited_path: dict[str, int] = {}
+            groups: frozenset[str] = frozenset()
             if isinstance(root, ir.AssignNode):
-                mapper[root.lvalue] = root.rvalue
+                mapper[root.lvalue] = ir.hash_cons(root.rvalue)
                 if isinstance(root.lvalue, ir.ExclusiveVar):
-                    visited_path[root.lvalue.exclusive_group] = 1
+                    groups = frozenset((root.lvalue.exclusive_group,))
             if root.has_child():
                 assert guard(root.child, ir.Edge)
                 assert guard(root.child.child, ir.Node)
-                root.optimal_child = self.apply_recursive(
-                    root.child, mapper, {}, visited_path
-                )
+                self._stack.append((_Work.OPTIMAL_CHILD, root))
+                self._stack.append((_Work.PATH, root.child, mapper, {}, {}, groups))
         elif isinstance(root, ir.IfElseNode):
-            root.optimal_true_edge = self.apply_recursive(root.true_edge, {}, {}, {})
-            root.optimal_false_edge = self.apply_recursive(root.false_edge, {}, {}, {})
+            # Reversed, so the optimal true edge is set before the false path
+            self._stack.append((_Work.OPTIMAL_FALSE, root))
+            self._stack.append((_Work.PATH, root.false_edge, {}, {}, {}, frozenset()))
+            self._stack.append((_Work.OPTIMAL_TRUE, root))
+            self._stack.append((_Work.PATH, root.true_edge, {}, {}, {}, frozenset()))
         else:
             raise RuntimeError(f"{type(root)}")
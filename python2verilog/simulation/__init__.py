@@ -2,4 +2,11 @@
 Wrappers for simulation tools
 """
 
-from .display import UnknownValueError, parse_stdout, strip_ready, strip_valid
+from .display import (
+    UnknownValueError,
+    parse_records,
+    parse_stdout,
+    strip_ready,
+    strip_records,
+    strip_valid,
+)
@@ -0,0 +1,379 @@
+"""
+Batch interpreter of the optimized IR graph, using NumPy
+
+Runs many test cases in lockstep, one lane per test case.
+Every variable is an array with a value per lane,
+if-else conditions become masks, and all lanes advance each clock cycle
+until every lane is done, with the ready signal always high.
+
+Requires NumPy, unlike the scalar interpreter.
+Unknown values are not modelled, registers start at zero.
+"""
+
+import operator
+from typing import Callable, Optional, Sequence, Union
+
+import numpy as np
+import numpy.typing as npt
+
+from python2verilog import ir
+from python2verilog.simulation.interpreter import (
+    ARITHMETIC_OPERATORS,
+    COMPARISON_OPERATORS,
+    Machine,
+    callee_parser,
+    parse_with_callees,
+)
+from python2verilog.utils.typed import typed_strict
+
+Array = npt.NDArray[np.int64]
+Value = Union[Array, int]
+
+
+def _wrap(value: Value) -> Array:
+    """
+    Wraps to 32-bit signed integers
+    """
+    return np.asarray(value, dtype=np.int64).astype(np.int32).astype(np.int64)
+
+
+def _safe_divisor(right: Array) -> tuple[Array, npt.NDArray[np.bool_]]:
+    """
+    Divisor without zeros, and where it was zero
+    """
+    zero = right == 0
+    return np.where(zero, 1, right), zero
+
+
+def _truncated_div(left: Array, right: Array) -> Array:
+    """
+    Verilog division, rounds towards zero
+    """
+    right, zero = _safe_divisor(right)
+    quotient = np.abs(left) // np.abs(right)
+    quotient = np.where((left < 0) == (right < 0), quotient, -quotient)
+    return _wrap(np.where(zero, 0, quotient))
+
+
+def _truncated_mod(left: Array, right: Array) -> Array:
+    """
+    Verilog modulo, takes the sign of the dividend
+    """
+    right, zero = _safe_divisor(right)
+    return np.where(zero, 0, np.fmod(left, right))
+
+
+def _floor_div(left: Array, right: Array) -> Array:
+    right, zero = _safe_divisor(right)
+    return _wrap(np.where(zero, 0, np.floor_divide(left, right)))
+
+
+def _floor_mod(left: Array, right: Array) -> Array:
+    # ((left % right) + right) % right
+    return _truncated_mod(_wrap(_truncated_mod(left, right) + right), right)
+
+
+# Without unknown values, case equality is equality
+_COMPARISON_OPERATORS = COMPARISON_OPERATORS | {
+    "===": operator.eq,
+    "!==": operator.ne,
+}
+
+_BINARY_OPERATORS: dict[str, Callable[[Array, Array], Array]] = {
+    "/": _truncated_div,
+    "%": _truncated_mod,
+    "&&": lambda left, right: ((left != 0) & (right != 0)).astype(np.int64),
+    "||": lambda left, right: ((left != 0) | (right != 0)).astype(np.int64),
+}
+
+
+class _BatchMachine(Machine[Array]):
+    """
+    Lanes of a module instance, with their registers
+    and those of their generator instances
+    """
+
+    def __init__(
+        self,
+        context: ir.Context,
+        root: ir.Node,
+        parse_callee: Callable[[ir.Context], tuple[ir.Context, ir.Node]],
+        lanes: int,
+    ):
+        super().__init__(context, root, np.zeros(lanes, dtype=np.int64))
+
+        # State name -> value of the state register
+        self.codes: dict[str, int] = {
+            name: code
+            for code, name in enumerate(
+                sorted(
+                    {
+                        context.idle_state.ver_name,
+                        context.done_state.ver_name,
+                        context.entry_state.ver_name,
+                        *self.graph.states,
+                    }
+                ),
+                start=1,
+            )
+        }
+
+        self.instances = [
+            (
+                instance,
+                _BatchMachine(
+                    *parse_callee(context.namespace[instance.module_name]),
+                    parse_callee,
+                    lanes,
+                ),
+            )
+            for instance in context.generator_instances.values()
+        ]
+
+    def evaluate(self, expr: ir.Expression, values: dict[str, Array]) -> Value:
+        """
+        Evaluates an expression for every lane
+        """
+        # pylint: disable=too-many-return-statements
+        if isinstance(expr, ir.State):
+            return self.codes[expr.ver_name]
+        if isinstance(expr, ir.Var):
+            return values.get(expr.ver_name, self.initial)
+        if isinstance(expr, ir.Int):
+            return int(_wrap(expr.value))
+        if isinstance(expr, ir.UInt):
+            return int(expr.to_string())
+        if isinstance(expr, ir.Ternary):
+            return np.asarray(
+                np.where(
+                    self.evaluate(expr.condition, values) != 0,
+                    self.evaluate(expr.left, values),
+                    self.evaluate(expr.right, values),
+                ),
+                dtype=np.int64,
+            )
+        if isinstance(expr, ir.UnaryOp):
+            operand = np.asarray(self.evaluate(expr.expr, values), dtype=np.int64)
+            if expr.oper == "!":
+                return np.asarray(operand == 0, dtype=np.int64)
+            if expr.oper == "-":
+                return _wrap(-operand)
+            raise TypeError(f"Unsupported operator {expr.oper} in {expr}")
+        if isinstance(expr, ir.UBinOp):
+            left = np.asarray(self.evaluate(expr.left, values), dtype=np.int64)
+            right = np.asarray(self.evaluate(expr.right, values), dtype=np.int64)
+            if isinstance(expr, ir.Mod):
+                return _floor_mod(left, right)
+            if isinstance(expr, ir.FloorDiv):
+                return _floor_div(left, right)
+            if expr.oper in ARITHMETIC_OPERATORS:
+                return _wrap(ARITHMETIC_OPERATORS[expr.oper](left, right))
+            if expr.oper in _COMPARISON_OPERATORS:
+                return np.asarray(
+                    _COMPARISON_OPERATORS[expr.oper](left, right), dtype=np.int64
+                )
+            if expr.oper not in _BINARY_OPERATORS:
+                raise TypeError(f"Unsupported operator {expr.oper} in {expr}")
+            return _BINARY_OPERATORS[expr.oper](left, right)
+        raise TypeError(f"Cannot interpret {type(expr)} {expr}")
+
+    def _assignments(self, values: dict[str, Array]) -> dict[str, Array]:
+        # pylint: disable=too-many-locals
+        context = self.context
+        signals = context.signals
+        updates: dict[str, Array] = {}
+
+        def assign(name: str, value: Value, mask: npt.NDArray[np.bool_]):
+            """
+            Nonblocking assignment in the lanes of mask
+            """
+            updates[name] = np.where(
+                mask, value, updates.get(name, values.get(name, self.initial))
+            )
+
+        everywhere = np.ones_like(self.initial, dtype=np.bool_)
+        for instance, _ in self.instances:
+            assign(instance.signals.ready.ver_name, 0, everywhere)
+            assign(instance.signals.start.ver_name, 0, everywhere)
+
+        ready = values.get(signals.ready.ver_name, self.initial) != 0
+        start = values.get(signals.start.ver_name, self.initial) != 0
+        valid = values.get(signals.valid.ver_name, self.initial) != 0
+        assign(signals.valid.ver_name, 0, ready)
+        assign(signals.done.ver_name, 0, ready)
+        restart = (values.get(signals.reset.ver_name, self.initial) != 0) | start
+        assign(
+            context.state_var.ver_name,
+            self.codes[context.idle_state.ver_name],
+            restart,
+        )
+        assign(signals.done.ver_name, 0, restart)
+        assign(signals.valid.ver_name, 0, restart)
+
+        if start.any():
+            inputs = {
+                var.ver_name: values.get(var.py_name, self.initial)
+                for var in self.graph.input_vars
+            }
+            for name, value in inputs.items():
+                assign(name, value, start)
+            if context.optimization_level > 0:
+                # Entry state reads the inputs, not the cached inputs
+                self._walk(0, start, values | inputs, assign)
+            else:
+                assign(
+                    context.state_var.ver_name,
+                    self.codes[context.entry_state.ver_name],
+                    start,
+                )
+
+        running = ~start & (ready | ~valid)
+        state = values.get(context.state_var.ver_name, self.initial)
+        for name, index in self.graph.states.items():
+            mask = running & (state == self.codes[name])
+            if mask.any():
+                self._walk(index, mask, values, assign)
+        return updates
+
+    def _walk(
+        self,
+        index: int,
+        mask: npt.NDArray[np.bool_],
+        values: dict[str, Array],
+        assign: Callable[[str, Value, npt.NDArray[np.bool_]], None],
+    ):
+        """
+        Walks the optimal paths from a node until clocked edges,
+        in the lanes of mask
+        """
+        arena = self.graph.arena
+        stack = [(index, mask)]
+        while stack:
+            index, mask = stack.pop()
+            while index >= 0:
+                element = arena.elements[index]
+                successors = arena.successors(index)
+                if isinstance(element, ir.AssignNode):
+                    assign(
+                        element.lvalue.ver_name,
+                        self.evaluate(element.rvalue, values),
+                        mask,
+                    )
+                    index = successors[0]
+                elif isinstance(element, ir.IfElseNode):
+                    condition = np.asarray(
+                        self.evaluate(element.condition, values) != 0, dtype=np.bool_
+                    )
+                    false_mask = mask & ~condition
+                    if false_mask.any():
+                        stack.append((successors[1], false_mask))
+                    mask = mask & condition
+                    index = successors[0] if mask.any() else -1
+                elif isinstance(element, ir.NonClockedEdge):
+                    index = successors[0]
+                elif isinstance(element, ir.ClockedEdge):
+                    child = arena.elements[successors[0]].unique_id
+                    assign(self.context.state_var.ver_name, self.codes[child], mask)
+                    index = -1
+                else:
+                    raise TypeError(f"{type(element)}")
+
+
+class BatchInterpreter:
+    """
+    Interprets the optimized IR graph of a context for many test cases at once,
+    with the generator instances it uses
+
+    Models the module made by the code generator,
+    driven by a testbench whose ready signal is always high
+    """
+
+    def __init__(self, context: ir.Context, root: Optional[ir.Node] = None):
+        """
+        :param root: optimized root of the context, parsed from the context if None
+        """
+        if root is None:
+            context, root = parse_with_callees(typed_strict(context, ir.Context))
+        self.context = context
+        self.root = typed_strict(root, ir.Node)
+        self._parse = callee_parser()
+
+    def run(
+        self,
+        test_cases: Optional[Sequence[tuple[int, ...]]] = None,
+        max_cycles: Optional[int] = None,
+    ) -> tuple[list[Array], Array]:
+        """
+        Runs every test case in its own lane
+
+        :param test_cases: defaults to the context's test cases
+        :param max_cycles: raises if a lane needs more clock cycles
+        :return: (outputs, cycles) of each test case,
+            outputs are the rows of valid outputs, an array of shape (rows, outputs),
+            cycles are the clock cycles from start until done
+        """
+        # pylint: disable=too-many-locals
+        if test_cases is None:
+            test_cases = self.context.test_cases
+        lanes = len(test_cases)
+        if not lanes:
+            return [], np.zeros(0, dtype=np.int64)
+        machine = _BatchMachine(self.context, self.root, self._parse, lanes)
+        signals = self.context.signals
+        ones = np.ones(lanes, dtype=np.int64)
+
+        # Reset, then start every lane
+        machine.posedge({signals.ready.ver_name: ones, signals.reset.ver_name: ones})
+        machine.commit()
+        arguments = np.array(test_cases, dtype=np.int64).reshape(
+            lanes, len(machine.graph.input_vars)
+        )
+        ports = {signals.ready.ver_name: ones, signals.start.ver_name: ones}
+        for i, var in enumerate(machine.graph.input_vars):
+            ports[var.py_name] = _wrap(arguments[:, i])
+        machine.posedge(ports)
+        machine.commit()
+
+        ports = {signals.ready.ver_name: ones}
+        cycles = np.ones(lanes, dtype=np.int64)
+        captured_lanes: list[Array] = [np.zeros(0, dtype=np.int64)]
+        captured_outputs: list[Array] = [
+            np.zeros((0, len(machine.graph.output_vars)), dtype=np.int64)
+        ]
+
+        def capture(mask: npt.NDArray[np.bool_]):
+            """
+            Outputs of the lanes of mask
+            """
+            outputs = [
+                machine.reg(var.ver_name)[mask] for var in machine.graph.output_vars
+            ]
+            captured_lanes.append(np.flatnonzero(mask))
+            captured_outputs.append(
+                np.stack(outputs, axis=1)
+                if outputs
+                else np.zeros((len(captured_lanes[-1]), 0), dtype=np.int64)
+            )
+
+        active = np.ones(lanes, dtype=np.bool_)
+        while True:
+            valid = machine.reg(signals.valid.ver_name) != 0
+            done = machine.reg(signals.done.ver_name) != 0
+            finished = active & done & valid
+            if not self.context.is_generator:
+                capture(finished)
+            active &= ~finished
+            if not active.any():
+                break
+            capture(active & valid)
+            if max_cycles is not None and cycles.max() >= max_cycles:
+                raise RuntimeError(f"{self.context.name} exceeded {max_cycles} cycles")
+            machine.posedge(ports)
+            machine.commit()
+            cycles += active
+
+        # Rows were captured in order of cycle, group them by lane
+        owners = np.concatenate(captured_lanes)
+        rows = np.concatenate(captured_outputs)[np.argsort(owners, kind="stable")]
+        counts = np.bincount(owners, minlength=lanes)
+        return np.split(rows, np.cumsum(counts)[:-1]), cycles
@@ -0,0 +1,547 @@
+"""
+Compiled C simulator of the FSM
+
+The case statement made by `FsmBuilder` is a plain state machine,
+so the module's always block is lowered to C statements,
+with a `switch` on the state register, and compiled with the system C compiler
+into a shared object that is loaded with ctypes.
+
+Registers are 32-bit signed integers that start at zero,
+unknown values are not modelled.
+Test cases are driven as the testbench does with its ready signal always high,
+the clock loop runs in C, so long running generators take no Python per cycle.
+"""
+
+import ctypes
+import hashlib
+import logging
+import os
+import subprocess
+import tempfile
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Optional, Union
+
+from python2verilog import ir
+from python2verilog.backend.verilog import ast as ver
+from python2verilog.backend.verilog.codegen import CodeGen
+from python2verilog.simulation.interpreter import (
+    callee_parser,
+    parse,
+    parse_with_callees,
+)
+from python2verilog.utils import env, lru
+from python2verilog.utils.lines import Lines
+from python2verilog.utils.typed import typed_strict
+
+_RUNTIME = """\
+#include <stdint.h>
+#include <stdlib.h>
+
+static inline int32_t p2v_add(int32_t a, int32_t b) {
+    return (int32_t)((uint32_t)a + (uint32_t)b);
+}
+static inline int32_t p2v_sub(int32_t a, int32_t b) {
+    return (int32_t)((uint32_t)a - (uint32_t)b);
+}
+static inline int32_t p2v_mul(int32_t a, int32_t b) {
+    return (int32_t)((uint32_t)a * (uint32_t)b);
+}
+static inline int32_t p2v_neg(int32_t a) {
+    return (int32_t)(0u - (uint32_t)a);
+}
+/* Rounds towards zero, division by zero is unknown in Verilog */
+static inline int32_t p2v_div(int32_t a, int32_t b) {
+    if (b == 0) return 0;
+    if (b == -1) return p2v_neg(a);
+    return a / b;
+}
+/* Takes the sign of the dividend */
+static inline int32_t p2v_rem(int32_t a, int32_t b) {
+    if (b == 0 || b == -1) return 0;
+    return a % b;
+}
+/* ((a % b) + b) % b */
+static inline int32_t p2v_mod(int32_t a, int32_t b) {
+    return p2v_rem(p2v_add(p2v_rem(a, b), b), b);
+}
+static inline int32_t p2v_floordiv(int32_t a, int32_t b) {
+    if (p2v_rem(a, b) == 0) return p2v_div(a, b);
+    return p2v_sub(p2v_div(a, b), (a < 0) ^ (b < 0));
+}
+"""
+
+_DRIVER = """\
+typedef struct {{
+    {top}_t cur;
+    {top}_t nxt;
+    long cycles;
+    int finished;
+}} p2v_sim;
+
+static void p2v_clock(p2v_sim *sim) {{
+    sim->nxt = sim->cur;
+    {top}_posedge(&sim->cur, &sim->nxt);
+    sim->cur = sim->nxt;
+    sim->cycles++;
+}}
+
+void *p2v_new(void) {{
+    p2v_sim *sim = calloc(1, sizeof(p2v_sim));
+    if (!sim) return NULL;
+    sim->cur.{ready} = 1;
+    sim->cur.{reset} = 1;
+    p2v_clock(sim);
+    sim->cur.{reset} = 0;
+    sim->finished = 1;
+    return sim;
+}}
+
+void p2v_free(void *sim) {{
+    free(sim);
+}}
+
+long p2v_cycles(const void *sim) {{
+    return ((const p2v_sim *)sim)->cycles;
+}}
+
+int p2v_finished(const void *sim) {{
+    return ((const p2v_sim *)sim)->finished;
+}}
+
+void p2v_start(void *handle, const int32_t *args) {{
+    p2v_sim *sim = handle;
+{inputs}
+    sim->cur.{start} = 1;
+    p2v_clock(sim);
+    sim->cur.{start} = 0;
+    sim->finished = 0;
+}}
+
+/* Writes up to capacity rows of valid outputs, -1 if max_cycles is exceeded */
+long p2v_fill(void *handle, int32_t *rows, long capacity, long max_cycles) {{
+    p2v_sim *sim = handle;
+    long count = 0;
+    while (!(sim->cur.{done} && sim->cur.{valid})) {{
+        if (sim->cur.{valid}) {{
+            if (count == capacity) return count;
+{outputs}
+            count++;
+        }}
+        if (max_cycles >= 0 && sim->cycles >= max_cycles) return -1;
+        p2v_clock(sim);
+    }}
+    if (!sim->finished && {is_function}) {{
+        if (count == capacity) return count;
+{outputs}
+        count++;
+    }}
+    sim->finished = 1;
+    return count;
+}}
+"""
+
+
+def _field(name: str) -> str:
+    """
+    Struct field of a signal, prefixed to avoid C keywords
+    """
+    return f"v_{name}"
+
+
+def _literal(value: int) -> str:
+    """
+    32-bit signed C literal
+    """
+    value = ((value + (1 << 31)) & 0xFFFFFFFF) - (1 << 31)
+    return "INT32_MIN" if value == -(1 << 31) else str(value)
+
+
+_FUNCTIONS = {
+    "+": "p2v_add",
+    "-": "p2v_sub",
+    "*": "p2v_mul",
+    "/": "p2v_div",
+    "%": "p2v_rem",
+}
+_OPERATORS = {
+    "<": "<",
+    "<=": "<=",
+    ">": ">",
+    ">=": ">=",
+    "==": "==",
+    "===": "==",
+    "!=": "!=",
+    "!==": "!=",
+    "&&": "&&",
+    "||": "||",
+    "&": "&",
+    "|": "|",
+    "^": "^",
+}
+
+
+class _ModuleLowering:
+    """
+    Lowers the always block of a module to a C posedge function,
+    that computes the next registers `n` from the current registers `c`
+    """
+
+    def __init__(
+        self,
+        context: ir.Context,
+        root: ir.Node,
+        module_name: Callable[[ir.Context], str],
+    ):
+        self.context = context
+        self.name = module_name(context)
+        codegen = CodeGen(root, context)
+        self.states = {state: code for code, state in enumerate(sorted(context.states))}
+        module = codegen.get_module()
+        always = next(
+            stmt for stmt in module.body if isinstance(stmt, ver.PosedgeSyncAlways)
+        )
+
+        signals = context.signals
+        self.fields = {
+            signals.ready.ver_name,
+            signals.start.ver_name,
+            signals.reset.ver_name,
+            signals.valid.ver_name,
+            signals.done.ver_name,
+            context.state_var.ver_name,
+        }
+        self.fields.update(var.py_name for var in context.input_vars)
+        self.fields.update(var.ver_name for var in context.output_vars)
+
+        # Instance wires read from the registers of the instance
+        self.wires: dict[str, str] = {}
+        self.instances: list[tuple[ir.Instance, ir.Context]] = []
+        for instance in context.generator_instances.values():
+            callee = context.namespace[instance.module_name]
+            self.instances.append((instance, callee))
+            field = f"i{instance.var.ver_name}"
+            for var, output in zip(instance.outputs, callee.output_vars):
+                self.wires[var.ver_name] = f"c->{field}.{_field(output.ver_name)}"
+            for name in ("valid", "done"):
+                self.wires[
+                    getattr(instance.signals, name).ver_name
+                ] = f"c->{field}.{_field(getattr(callee.signals, name).ver_name)}"
+            self.fields.update(var.ver_name for var in instance.inputs)
+            self.fields.add(instance.signals.ready.ver_name)
+            self.fields.add(instance.signals.start.ver_name)
+
+        self.body = Lines()
+        for stmt in always.body:
+            self.body.concat(self.statement(stmt))
+
+    def read(self, name: str) -> str:
+        """
+        Current value of a signal
+        """
+        if name in self.wires:
+            return self.wires[name]
+        self.fields.add(name)
+        return f"c->{_field(name)}"
+
+    def expression(self, expr: ir.Expression) -> str:
+        """
+        C expression of an expression, evaluated as Verilog would
+        """
+        # pylint: disable=too-many-return-statements
+        if isinstance(expr, ir.State):
+            return str(self.states.setdefault(expr.ver_name, len(self.states)))
+        if isinstance(expr, ir.Var):
+            return self.read(expr.ver_name)
+        if isinstance(expr, ir.Int):
+            return _literal(expr.value)
+        if isinstance(expr, ir.UInt):
+            return _literal(int(expr.to_string()))
+        if isinstance(expr, ir.Ternary):
+            return (
+                f"({self.expression(expr.condition)} ? "
+                f"{self.expression(expr.left)} : {self.expression(expr.right)})"
+            )
+        if isinstance(expr, ir.UnaryOp):
+            operand = self.expression(expr.expr)
+            if expr.oper == "!":
+                return f"(!{operand})"
+            if expr.oper == "-":
+                return f"p2v_neg({operand})"
+            raise TypeError(f"Unsupported operator {expr.oper} in {expr}")
+        if isinstance(expr, ir.UBinOp):
+            left = self.expression(expr.left)
+            right = self.expression(expr.right)
+            if isinstance(expr, ir.Mod):
+                return f"p2v_mod({left}, {right})"
+            if isinstance(expr, ir.FloorDiv):
+                return f"p2v_floordiv({left}, {right})"
+            if expr.oper in _FUNCTIONS:
+                return f"{_FUNCTIONS[expr.oper]}({left}, {right})"
+            if expr.oper in _OPERATORS:
+                return f"({left} {_OPERATORS[expr.oper]} {right})"
+            raise TypeError(f"Unsupported operator {expr.oper} in {expr}")
+        if type(expr) is ir.Expression:  # pylint: disable=unidiomatic-typecheck
+            # Module input ports
+            return self.read(expr.to_string())
+        raise TypeError(f"Cannot lower {type(expr)} {expr}")
+
+    def statement(self, stmt: ver.Statement) -> Lines:
+        """
+        C statements of a Verilog statement
+        """
+        lines = Lines()
+        if isinstance(stmt, ver.NonBlockingSubsitution):
+            self.fields.add(stmt.lvalue.ver_name)
+            lines += (
+                f"n->{_field(stmt.lvalue.ver_name)} = "
+                f"{self.expression(stmt.rvalue)};"
+            )
+        elif isinstance(stmt, ver.IfElse):
+            lines += f"if ({self.expression(stmt.condition)}) {{"
+            for child in stmt.then_body:
+                lines.concat(self.statement(child), indent=1)
+            if stmt.else_body:
+                lines += "} else {"
+                for child in stmt.else_body:
+                    lines.concat(self.statement(child), indent=1)
+            lines += "}"
+        elif isinstance(stmt, ver.Case):
+            lines += f"switch ({self.expression(stmt.condition)}) {{"
+            for item in stmt.case_items:
+                lines += f"case {self.expression(item.condition)}: {{"
+                for child in item.statements:
+                    lines.concat(self.statement(child), indent=1)
+                lines += "    break;"
+                lines += "}"
+            lines += "}"
+        elif type(stmt) is ver.Statement:  # pylint: disable=unidiomatic-typecheck
+            # Comments and debug displays
+            pass
+        else:
+            raise TypeError(f"Cannot lower {type(stmt)} {stmt}")
+        return lines
+
+    def to_lines(self, module_name: Callable[[ir.Context], str]) -> Lines:
+        """
+        Struct of the registers and the posedge function
+        """
+        lines: Lines = Lines("typedef struct {")
+        for name in sorted(self.fields):
+            lines += f"    int32_t {_field(name)};"
+        for instance, callee in self.instances:
+            lines += f"    {module_name(callee)}_t i{instance.var.ver_name};"
+        lines += f"}} {self.name}_t;"
+        lines.blank()
+        lines += (
+            f"static void {self.name}_posedge"
+            f"(const {self.name}_t *c, {self.name}_t *n) {{"
+        )
+        lines.concat(self.body, indent=1)
+        for instance, callee in self.instances:
+            field = f"i{instance.var.ver_name}"
+            callee_name = module_name(callee)
+            lines += "    {"
+            lines += f"        {callee_name}_t ports = c->{field};"
+            for var, inst_var in zip(callee.input_vars, instance.inputs):
+                lines += (
+                    f"        ports.{_field(var.py_name)} = "
+                    f"c->{_field(inst_var.ver_name)};"
+                )
+            for name in ("ready", "start", "reset"):
+                lines += (
+                    f"        ports.{_field(getattr(callee.signals, name).ver_name)}"
+                    f" = {self.read(getattr(instance.signals, name).ver_name)};"
+                )
+            lines += f"        {callee_name}_posedge(&ports, &n->{field});"
+            lines += "    }"
+        lines += "}"
+        lines.blank()
+        return lines
+
+
+def lower_to_c(
+    context: ir.Context,
+    root: ir.Node,
+    parse_callee: Callable[[ir.Context], tuple[ir.Context, ir.Node]] = parse,
+) -> str:
+    """
+    Lowers a context and the generator instances it uses to a C simulator
+
+    Exports `p2v_new`, `p2v_free`, `p2v_start`, `p2v_fill`,
+    `p2v_cycles` and `p2v_finished`
+
+    :param root: optimized root of the context
+    :param parse_callee: parses the context of a generator instance
+    """
+    lines = Lines(_RUNTIME)
+    lowered: set[str] = set()
+
+    def module_name(callee: ir.Context) -> str:
+        return f"m_{callee.name}"
+
+    def lower(context: ir.Context, root: ir.Node):
+        """
+        Lowers callees before their callers
+        """
+        lowered.add(context.name)
+        for instance in context.generator_instances.values():
+            if instance.module_name not in lowered:
+                lower(*parse_callee(context.namespace[instance.module_name]))
+        lines.concat(_ModuleLowering(context, root, module_name).to_lines(module_name))
+
+    lower(context, root)
+
+    signals = context.signals
+    lines.concat(
+        Lines(
+            _DRIVER.format(
+                top=module_name(context),
+                ready=_field(signals.ready.ver_name),
+                reset=_field(signals.reset.ver_name),
+                start=_field(signals.start.ver_name),
+                valid=_field(signals.valid.ver_name),
+                done=_field(signals.done.ver_name),
+                is_function=int(not context.is_generator),
+                inputs="\n".join(
+                    f"    sim->cur.{_field(var.py_name)} = args[{i}];"
+                    for i, var in enumerate(context.input_vars)
+                ),
+                outputs="\n".join(
+                    f"            rows[count * {len(context.output_vars)} + {i}]"
+                    f" = sim->cur.{_field(var.ver_name)};"
+                    for i, var in enumerate(context.output_vars)
+                ),
+            )
+        )
+    )
+    return lines.to_string()
+
+
+def _compile(cc_path: str, source: str, path: Path):
+    """
+    Compiles C source into a shared object at path
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=path.parent) as temp_dir:
+        source_path = Path(temp_dir) / "simulator.c"
+        source_path.write_text(source, encoding="utf8")
+        shared = Path(temp_dir) / "simulator.so"
+        cmd = [
+            cc_path,
+            "-O2",
+            "-shared",
+            "-fPIC",
+            str(source_path),
+            "-o",
+            str(shared),
+        ]
+        logging.debug("Compiling simulator with %s", cmd)
+        result = subprocess.run(cmd, capture_output=True, text=True, check=False)
+        if result.returncode != 0:
+            raise RuntimeError(f"cc failed {result.stdout} {result.stderr}")
+        os.replace(shared, path)
+
+
+class CSimulator:
+    """
+    Simulates a context with a C simulator lowered from its FSM
+
+    Shared objects are cached in `directory` by a hash of the C compiler path
+    and the C source, so unchanged designs are not recompiled.
+    The least recently used shared objects are evicted once their total size
+    exceeds the limit set by env var
+    """
+
+    def __init__(
+        self,
+        context: ir.Context,
+        root: Optional[ir.Node] = None,
+        directory: Optional[Union[str, os.PathLike[str]]] = None,
+    ):
+        """
+        :param root: optimized root of the context, parsed from the context if None
+        """
+        if root is None:
+            context, root = parse_with_callees(typed_strict(context, ir.Context))
+        self.context = context
+        self.source = lower_to_c(context, typed_strict(root, ir.Node), callee_parser())
+
+        cc_path = env.get_var(env.Vars.CC_PATH) or "cc"
+        if directory is None:
+            directory = Path(tempfile.gettempdir()) / "python2verilog"
+        digest = hashlib.sha256()
+        for part in (cc_path, self.source):
+            digest.update(part.encode())
+            digest.update(b"\0")
+        self.path = Path(directory) / f"{digest.hexdigest()}.so"
+        if self.path.exists():
+            lru.touch(self.path)
+        else:
+            _compile(cc_path, self.source, self.path)
+            lru.evict(self.path.parent, ".so", lru.max_bytes(), keep=self.path)
+
+        self._library = ctypes.CDLL(str(self.path))
+        self._library.p2v_new.restype = ctypes.c_void_p
+        self._library.p2v_free.argtypes = [ctypes.c_void_p]
+        self._library.p2v_cycles.argtypes = [ctypes.c_void_p]
+        self._library.p2v_cycles.restype = ctypes.c_long
+        self._library.p2v_finished.argtypes = [ctypes.c_void_p]
+        self._library.p2v_start.argtypes = [
+            ctypes.c_void_p,
+            ctypes.POINTER(ctypes.c_int32),
+        ]
+        self._library.p2v_fill.argtypes = [
+            ctypes.c_void_p,
+            ctypes.POINTER(ctypes.c_int32),
+            ctypes.c_long,
+            ctypes.c_long,
+        ]
+        self._library.p2v_fill.restype = ctypes.c_long
+
+        # Number of positive clock edges of the last run
+        self.cycles = 0
+
+    def run(
+        self,
+        test_cases: Optional[Iterable[tuple[int, ...]]] = None,
+        max_cycles: Optional[int] = None,
+        chunk: int = 4096,
+    ) -> Iterator[Union[tuple[int, ...], int]]:
+        """
+        Runs test cases, yielding the same outputs as `strip_valid` on
+        the rows of a testbench whose ready signal is always high
+
+        :param test_cases: defaults to the context's test cases
+        :param max_cycles: raises if more clock cycles are needed
+        :param chunk: rows copied out of the simulator at a time
+        """
+        if test_cases is None:
+            test_cases = self.context.test_cases
+        width = len(self.context.output_vars)
+        rows = (ctypes.c_int32 * max(1, chunk * width))()
+        args = (ctypes.c_int32 * max(1, len(self.context.input_vars)))()
+        limit = -1 if max_cycles is None else max_cycles
+
+        sim = self._library.p2v_new()
+        if not sim:
+            raise MemoryError(f"Cannot allocate simulator of {self.context.name}")
+        try:
+            for test_case in test_cases:
+                logging.debug("Simulating %s%s", self.context.name, test_case)
+                for i, arg in enumerate(test_case):
+                    args[i] = ((int(arg) + (1 << 31)) & 0xFFFFFFFF) - (1 << 31)
+                self._library.p2v_start(sim, args)
+                while True:
+                    count = self._library.p2v_fill(sim, rows, chunk, limit)
+                    self.cycles = self._library.p2v_cycles(sim)
+                    if count < 0:
+                        raise RuntimeError(
+                            f"{self.context.name} exceeded {max_cycles} cycles"
+                        )
+                    values = rows[: count * width]
+                    for i in range(0, len(values), width):
+                        yield values[i] if width == 1 else tuple(values[i : i + width])
+                    if self._library.p2v_finished(sim):
+                        break
+        finally:
+            self._library.p2v_free(sim)
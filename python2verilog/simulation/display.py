@@ -2,9 +2,10 @@
 Parses Verilog display statements
 """
 
-from typing import Iterable, Iterator, Union
+import struct
+from typing import BinaryIO, Iterable, Iterator, Optional, Union
 
-from python2verilog.exceptions import UnknownValueError
+from python2verilog.exceptions import TruncatedRecordError, UnknownValueError
 
 
 def parse_stdout(stdout: str) -> Iterator[tuple[str, ...]]:
@@ -80,3 +81,75 @@ def strip_valid(
                 yield int(row[0])
         except ValueError as e:
             raise UnknownValueError(f"Unknown logic value in outputs {row}") from e
+
+
+def _parse_hex(field: bytes, bits: int) -> Optional[int]:
+    """
+    Parses a hex field as a signed integer, None if unknown
+    """
+    try:
+        value = int(field, 16)
+    except ValueError:
+        return None
+    return value - (1 << bits) if bits > 1 and value >> (bits - 1) else value
+
+
+def _parse_record(record: bytes, output_count: int) -> tuple[Optional[int], ...]:
+    """
+    Parses a record that has unknown values
+    """
+    fields = [_parse_hex(record[0:1], 1), _parse_hex(record[1:2], 1)]
+    for i in range(output_count):
+        fields.append(_parse_hex(record[2 + 8 * i : 10 + 8 * i], 32))
+    return tuple(fields)
+
+
+def parse_records(
+    stream: BinaryIO, output_count: int, chunk: int = 4096
+) -> Iterator[tuple[Optional[int], ...]]:
+    """
+    Incrementally parses the fixed-width hex records of a testbench made with
+    `stream_display`, reading `chunk` records at a time,
+    so memory is bounded and rows are yielded while the simulation runs
+
+    :return: [ready, valid, output0, output1, ...], None for unknown values
+    """
+    size = 2 + 8 * output_count + 1
+    record = struct.Struct(">B" + "i" * output_count)
+    buffer = b""
+    while True:
+        data = stream.read(size * chunk)
+        if not data:
+            break
+        buffer += data
+        end = len(buffer) - len(buffer) % size
+        block, buffer = buffer[:end], buffer[end:]
+        try:
+            # Newlines are whitespace, ready and valid share a byte
+            decoded = bytes.fromhex(block.decode("ascii"))
+        except ValueError:
+            for i in range(0, end, size):
+                yield _parse_record(block[i : i + size], output_count)
+            continue
+        for ready_valid, *outputs in record.iter_unpack(decoded):
+            yield (ready_valid >> 4, ready_valid & 0xF, *outputs)
+    if buffer:
+        raise TruncatedRecordError(f"Truncated record {buffer!r}")
+
+
+def strip_records(
+    rows: Iterable[tuple[Optional[int], ...]]
+) -> Iterator[Union[tuple[int, ...], int]]:
+    """
+    Filters records by ready and valid,
+    as `strip_valid` and `strip_ready` do for parsed display statements
+
+    Throws if ready, but an output is unknown.
+
+    :return: [output0, output1, ...]
+    """
+    for ready, valid, *outputs in rows:
+        if ready == 1 and valid == 1:
+            if None in outputs:
+                raise UnknownValueError(f"Unknown logic value in outputs {outputs}")
+            yield outputs[0] if len(outputs) == 1 else tuple(outputs)  # type: ignore
@@ -0,0 +1,540 @@
+"""
+Cycle-accurate interpreter of the optimized IR graph
+
+A fast alternative to simulating the generated Verilog with iverilog.
+The graph is executed one clock cycle at a time, with the semantics of the
+module and testbench generated from it (nonblocking assignments, start, done
+and the ready/valid handshake), so the displayed rows and cycle counts match.
+
+Values are 32-bit signed integers, state names, or None for unknown (`x`),
+e.g. registers that have not been assigned yet.
+"""
+
+import logging
+import operator
+from typing import (
+    Any,
+    Callable,
+    Generic,
+    Iterable,
+    Iterator,
+    NamedTuple,
+    Optional,
+    TypeVar,
+    Union,
+)
+
+from python2verilog import ir
+from python2verilog.backend.verilog.config import TestbenchConfig
+from python2verilog.frontend.function import Function
+from python2verilog.optimizer import IncreaseWorkPerClockCycle
+from python2verilog.utils.typed import typed_strict
+
+Value = Union[int, str, None]
+ValueT = TypeVar("ValueT")
+
+# Operators that are the same for integers and NumPy arrays, before wrapping
+ARITHMETIC_OPERATORS: dict[str, Callable[[Any, Any], Any]] = {
+    "+": operator.add,
+    "-": operator.sub,
+    "*": operator.mul,
+    "&": operator.and_,
+    "|": operator.or_,
+    "^": operator.xor,
+}
+COMPARISON_OPERATORS: dict[str, Callable[[Any, Any], Any]] = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+
+def _wrap(value: int) -> int:
+    """
+    Wraps to a 32-bit signed integer
+    """
+    return ((value + (1 << 31)) & 0xFFFFFFFF) - (1 << 31)
+
+
+def _truncated_div(left: int, right: int) -> Value:
+    """
+    Verilog division, rounds towards zero
+    """
+    if right == 0:
+        return None
+    quotient = abs(left) // abs(right)
+    return _wrap(quotient if (left < 0) == (right < 0) else -quotient)
+
+
+def _truncated_mod(left: int, right: int) -> Value:
+    """
+    Verilog modulo, takes the sign of the dividend
+    """
+    if right == 0:
+        return None
+    remainder = abs(left) % abs(right)
+    return remainder if left >= 0 else -remainder
+
+
+def _truthy(value: Value) -> bool:
+    """
+    If a condition is taken, unknown is not
+    """
+    return value is not None and value != 0
+
+
+def _logical_and(left: Value, right: Value) -> Value:
+    if (left is not None and not left) or (right is not None and not right):
+        return 0
+    if left is None or right is None:
+        return None
+    return 1
+
+
+def _logical_or(left: Value, right: Value) -> Value:
+    if _truthy(left) or _truthy(right):
+        return 1
+    if left is None or right is None:
+        return None
+    return 0
+
+
+def _integer(value: Value) -> Optional[int]:
+    """
+    Value as an integer, states are only assigned and compared
+    """
+    if isinstance(value, str):
+        raise TypeError(f"Cannot use state {value} as an integer")
+    return value
+
+
+def _integer_unary_op(expr: ir.UnaryOp, operand: Optional[int]) -> Value:
+    """
+    Evaluates an unary operator on an integer, unknown if it is
+    """
+    if operand is None:
+        return None
+    if expr.oper == "!":
+        return int(not operand)
+    if expr.oper == "-":
+        return _wrap(-operand)
+    raise TypeError(f"Unsupported operator {expr.oper} in {expr}")
+
+
+def _integer_bin_op(
+    expr: ir.UBinOp, left: Optional[int], right: Optional[int]
+) -> Value:
+    """
+    Evaluates a binary operator on integers, unknown if either is
+    """
+    if left is None or right is None:
+        return None
+    if isinstance(expr, ir.Mod):
+        # ((left % right) + right) % right
+        remainder = _truncated_mod(left, right)
+        assert isinstance(remainder, int)
+        return _truncated_mod(_wrap(remainder + right), right)
+    if isinstance(expr, ir.FloorDiv):
+        quotient = _truncated_div(left, right)
+        assert isinstance(quotient, int)
+        if _truncated_mod(left, right) == 0:
+            return quotient
+        return _wrap(quotient - ((left < 0) ^ (right < 0)))
+    if expr.oper in ARITHMETIC_OPERATORS:
+        return _wrap(ARITHMETIC_OPERATORS[expr.oper](left, right))
+    if expr.oper in COMPARISON_OPERATORS:
+        return int(COMPARISON_OPERATORS[expr.oper](left, right))
+    if expr.oper == "/":
+        return _truncated_div(left, right)
+    if expr.oper == "%":
+        return _truncated_mod(left, right)
+    raise TypeError(f"Unsupported operator {expr.oper} in {expr}")
+
+
+def evaluate(expr: ir.Expression, values: dict[str, Value]) -> Value:
+    """
+    Evaluates an expression as Verilog would
+
+    :param values: values of variables by their ver_name
+    """
+    # pylint: disable=too-many-return-statements
+    if isinstance(expr, ir.State):
+        return expr.ver_name
+    if isinstance(expr, ir.Var):
+        return values.get(expr.ver_name)
+    if isinstance(expr, ir.Int):
+        return _wrap(expr.value)
+    if isinstance(expr, ir.UInt):
+        return int(expr.to_string())
+    if isinstance(expr, ir.Ternary):
+        condition = evaluate(expr.condition, values)
+        if condition is None:
+            left = evaluate(expr.left, values)
+            return left if left == evaluate(expr.right, values) else None
+        return evaluate(expr.left if condition else expr.right, values)
+    if isinstance(expr, ir.UnaryOp):
+        return _integer_unary_op(expr, _integer(evaluate(expr.expr, values)))
+    if isinstance(expr, ir.UBinOp):
+        left = evaluate(expr.left, values)
+        right = evaluate(expr.right, values)
+        if expr.oper == "&&":
+            return _logical_and(left, right)
+        if expr.oper == "||":
+            return _logical_or(left, right)
+        if expr.oper == "===":
+            return int(left == right)
+        if expr.oper == "!==":
+            return int(left != right)
+        return _integer_bin_op(expr, _integer(left), _integer(right))
+    raise TypeError(f"Cannot interpret {type(expr)} {expr}")
+
+
+def parse(context: ir.Context) -> tuple[ir.Context, ir.Node]:
+    """
+    Parses and optimizes a context, as is done before code generation
+
+    :return: context, root
+    """
+    context.validate()
+    context, root = Function(context).parse_function()
+    context.freeze()
+    if context.optimization_level > 0:
+        IncreaseWorkPerClockCycle(root, threshold=context.optimization_level - 1)
+    return context, root
+
+
+def parse_with_callees(context: ir.Context) -> tuple[ir.Context, ir.Node]:
+    """
+    Parses and optimizes a context, after validating the contexts it can call
+
+    As in code generation, callees are validated before their callers,
+    e.g. inline calls need output types from type hints
+
+    :return: context, root
+    """
+    for callee in context.namespace.values():
+        callee.validate()
+    return parse(context)
+
+
+def callee_parser() -> Callable[[ir.Context], tuple[ir.Context, ir.Node]]:
+    """
+    Parser of callees, parsing each once, such that its instances share the graph
+    """
+    parsed: dict[str, tuple[ir.Context, ir.Node]] = {}
+
+    def parse_callee(context: ir.Context) -> tuple[ir.Context, ir.Node]:
+        if context.name not in parsed:
+            parsed[context.name] = parse(context)
+        return parsed[context.name]
+
+    return parse_callee
+
+
+def case_items(context: ir.Context, arena: ir.Arena) -> dict[str, int]:
+    """
+    Case items of the module's case statement
+
+    :return: state name -> index of the node the case item starts on
+    """
+    states: dict[str, int] = {}
+    for index, element in enumerate(arena.elements):
+        if isinstance(element, ir.ClockedEdge):
+            child = arena.successors(index)[0]
+            states.setdefault(arena.elements[child].unique_id, child)
+    root = arena.elements[0].unique_id
+    if context.optimization_level > 0:
+        # Entry state is done in the same cycle as start
+        states.pop(root, None)
+    else:
+        states.setdefault(root, 0)
+    return states
+
+
+class Graph(NamedTuple):
+    """
+    Optimized graph of a context, as its module runs it
+    """
+
+    arena: ir.Arena
+
+    # State name -> index of the node the case item starts on
+    states: dict[str, int]
+
+    # Context makes copies of these on each access
+    input_vars: list[ir.Var]
+    output_vars: list[ir.Var]
+
+
+class Machine(Generic[ValueT]):
+    """
+    An instance of a module, with its registers and those of its generator instances
+
+    Subclasses compute the registers after a positive clock edge
+    """
+
+    def __init__(self, context: ir.Context, root: ir.Node, initial: ValueT):
+        """
+        :param initial: value of registers that have not been assigned
+        """
+        self.context = context
+        arena = ir.Arena(root, ir.optimal_children)
+        self.graph = Graph(
+            arena,
+            case_items(context, arena),
+            context.input_vars,
+            context.output_vars,
+        )
+        self.initial = initial
+        self.regs: dict[str, ValueT] = {}
+        self._next: dict[str, ValueT] = {}
+        self.instances: list[tuple[ir.Instance, Machine[ValueT]]] = []
+
+    def reg(self, name: str) -> ValueT:
+        """
+        Value of a register
+        """
+        return self.regs.get(name, self.initial)
+
+    def posedge(self, ports: dict[str, ValueT]):
+        """
+        Computes the registers after a positive clock edge, without updating them
+
+        :param ports: values of the module's inputs
+        """
+        values = self._values(ports)
+        self._next = self._assignments(values)
+        self._posedge_instances(values)
+
+    def _assignments(self, values: dict[str, ValueT]) -> dict[str, ValueT]:
+        """
+        Nonblocking assignments of a positive clock edge
+
+        :param values: values the module reads
+        """
+        raise NotImplementedError("Derived class must implement _assignments")
+
+    def commit(self):
+        """
+        Updates the registers, as nonblocking assignments do
+        """
+        self.regs.update(self._next)
+        self._next = {}
+        for _, machine in self.instances:
+            machine.commit()
+
+    def _values(self, ports: dict[str, ValueT]) -> dict[str, ValueT]:
+        """
+        Values the module reads,
+        i.e. its registers, its ports and the outputs of its generator instances
+        """
+        values = dict(self.regs)
+        values.update(ports)
+        for instance, machine in self.instances:
+            callee = machine.context.signals
+            for var, output in zip(instance.outputs, machine.graph.output_vars):
+                values[var.ver_name] = machine.reg(output.ver_name)
+            values[instance.signals.valid.ver_name] = machine.reg(callee.valid.ver_name)
+            values[instance.signals.done.ver_name] = machine.reg(callee.done.ver_name)
+        return values
+
+    def _posedge_instances(self, values: dict[str, ValueT]):
+        """
+        Computes the registers of the generator instances
+        after a positive clock edge, from the values the module read
+        """
+        for instance, machine in self.instances:
+            callee = machine.context.signals
+            ports = {
+                var.py_name: values.get(inst_var.ver_name, self.initial)
+                for var, inst_var in zip(machine.graph.input_vars, instance.inputs)
+            }
+            for name in ("ready", "start", "reset"):
+                ports[getattr(callee, name).ver_name] = values.get(
+                    getattr(instance.signals, name).ver_name, self.initial
+                )
+            machine.posedge(ports)
+
+
+class _Machine(Machine[Value]):
+    """
+    Machine with a value per register, None for unknown
+    """
+
+    def __init__(
+        self,
+        context: ir.Context,
+        root: ir.Node,
+        parse_callee: Callable[[ir.Context], tuple[ir.Context, ir.Node]],
+    ):
+        super().__init__(context, root, None)
+        self.instances = [
+            (
+                instance,
+                _Machine(
+                    *parse_callee(context.namespace[instance.module_name]),
+                    parse_callee,
+                ),
+            )
+            for instance in context.generator_instances.values()
+        ]
+
+    def _assignments(self, values: dict[str, Value]) -> dict[str, Value]:
+        context = self.context
+        signals = context.signals
+        updates: dict[str, Value] = {}
+        for instance, _ in self.instances:
+            updates[instance.signals.ready.ver_name] = 0
+            updates[instance.signals.start.ver_name] = 0
+
+        ready = values.get(signals.ready.ver_name)
+        start = values.get(signals.start.ver_name)
+        valid = values.get(signals.valid.ver_name)
+        if _truthy(ready):
+            updates[signals.valid.ver_name] = 0
+            updates[signals.done.ver_name] = 0
+        if _truthy(_logical_or(values.get(signals.reset.ver_name), start)):
+            updates[context.state_var.ver_name] = context.idle_state.ver_name
+            updates[signals.done.ver_name] = 0
+            updates[signals.valid.ver_name] = 0
+
+        if _truthy(start):
+            inputs = {
+                var.ver_name: values.get(var.py_name) for var in self.graph.input_vars
+            }
+            updates.update(inputs)
+            if context.optimization_level > 0:
+                # Entry state reads the inputs, not the cached inputs
+                self._walk(0, values | inputs, updates)
+            else:
+                updates[context.state_var.ver_name] = context.entry_state.ver_name
+        elif _truthy(_logical_or(ready, None if valid is None else int(not valid))):
+            state = values.get(context.state_var.ver_name)
+            index = self.graph.states.get(state) if isinstance(state, str) else None
+            if index is not None:
+                self._walk(index, values, updates)
+        return updates
+
+    def _walk(self, index: int, values: dict[str, Value], updates: dict[str, Value]):
+        """
+        Walks the optimal path from a node until a clocked edge
+        """
+        arena = self.graph.arena
+        while index >= 0:
+            element = arena.elements[index]
+            successors = arena.successors(index)
+            if isinstance(element, ir.AssignNode):
+                updates[element.lvalue.ver_name] = evaluate(element.rvalue, values)
+                index = successors[0]
+            elif isinstance(element, ir.IfElseNode):
+                condition = evaluate(element.condition, values)
+                index = successors[0] if _truthy(condition) else successors[1]
+            elif isinstance(element, ir.NonClockedEdge):
+                index = successors[0]
+            elif isinstance(element, ir.ClockedEdge):
+                updates[self.context.state_var.ver_name] = arena.elements[
+                    successors[0]
+                ].unique_id
+                return
+            else:
+                raise TypeError(f"{type(element)}")
+
+
+class Interpreter:
+    """
+    Interprets the optimized IR graph of a context clock cycle by clock cycle,
+    with the generator instances it uses
+
+    Models the module and testbench made by the code generator
+    """
+
+    def __init__(self, context: ir.Context, root: Optional[ir.Node] = None):
+        """
+        :param root: optimized root of the context, parsed from the context if None
+        """
+        if root is None:
+            context, root = parse_with_callees(typed_strict(context, ir.Context))
+        self.context = context
+        self._machine = _Machine(context, typed_strict(root, ir.Node), callee_parser())
+
+        # Number of positive clock edges so far
+        self.cycles = 0
+
+    def _clock(self, ports: dict[str, Value], max_cycles: Optional[int]):
+        """
+        Positive clock edge
+        """
+        self.cycles += 1
+        if max_cycles is not None and self.cycles > max_cycles:
+            raise RuntimeError(f"{self.context.name} exceeded {max_cycles} cycles")
+        self._machine.posedge(ports)
+        self._machine.commit()
+
+    def _display(self, ports: dict[str, Value]) -> tuple[str, ...]:
+        """
+        Row the testbench displays, [ready, valid, output0, output1, ...]
+        """
+        signals = self.context.signals
+        regs = self._machine.regs
+        row = [ports[signals.ready.ver_name], regs.get(signals.valid.ver_name)]
+        row += [regs.get(var.ver_name) for var in self._machine.graph.output_vars]
+        return tuple("x" if value is None else str(value) for value in row)
+
+    def run(
+        self,
+        test_cases: Optional[Iterable[tuple[int, ...]]] = None,
+        config: Optional[TestbenchConfig] = None,
+        max_cycles: Optional[int] = None,
+    ) -> Iterator[tuple[str, ...]]:
+        """
+        Runs test cases as the testbench does,
+        yielding the same rows as `display.parse_stdout` on its output
+
+        :param test_cases: defaults to the context's test cases
+        :param config: the testbench's config
+        :param max_cycles: raises if more clock cycles are needed
+        """
+        # pylint: disable=too-many-locals
+        if test_cases is None:
+            test_cases = self.context.test_cases
+        if config is None:
+            config = TestbenchConfig()
+        signals = self.context.signals
+        ready, start = signals.ready.ver_name, signals.start.ver_name
+
+        ports: dict[str, Value] = {ready: 1, start: 0, signals.reset.ver_name: 1}
+        self._clock(ports, max_cycles)
+        ports[signals.reset.ver_name] = 0
+        random_wait_counter = 8
+
+        keep_going = ir.UBinOp(
+            ir.UnaryOp("!", ir.BinOp(signals.done, "&&", signals.valid)),
+            "||",
+            ir.UnaryOp("!", signals.ready),
+        )
+        for test_case in test_cases:
+            logging.debug("Interpreting %s%s", self.context.name, test_case)
+            if config.read_test_cases:
+                random_wait_counter = 8
+            for var, arg in zip(self._machine.graph.input_vars, test_case):
+                ports[var.py_name] = _wrap(int(arg))
+            ports[start] = 1
+            self._clock(ports, max_cycles)
+            for var in self._machine.graph.input_vars:
+                ports[var.py_name] = None
+            ports[start] = 0
+
+            while _truthy(evaluate(keep_going, self._machine.regs | ports)):
+                if ports[ready]:
+                    yield self._display(ports)
+                    random_wait_counter = 4
+                self._clock(ports, max_cycles)
+                if config.random_ready:
+                    random_wait_counter -= 1
+                    ports[ready] = int(random_wait_counter == 0)
+
+            if not self.context.is_generator and ports[ready]:
+                yield self._display(ports)
@@ -2,161 +2,419 @@
 Icarious Verilog CLI Abstractions
 """
 
+import errno
+import hashlib
 import logging
 import os
+import pty
+import shlex
 import signal
 import subprocess
 import tempfile
+import threading
 import time
-from typing import Iterable, Optional, Union
+import tty
+from pathlib import Path
+from typing import BinaryIO, Generator, Iterable, Optional, Union
 
-from python2verilog.utils import env
+from python2verilog.backend.verilog.testbench import Testbench
+from python2verilog.exceptions import TruncatedRecordError
+from python2verilog.simulation.display import parse_records
+from python2verilog.utils import env, lru
 from python2verilog.utils.typed import guard_dict
 
 
+def iverilog_path() -> str:
+    """
+    Path to iverilog, from env var or PATH
+    """
+    return env.get_var(env.Vars.IVERILOG_PATH) or "iverilog"
+
+
+def vvp_path(iverilog: Optional[str] = None) -> str:
+    """
+    Path to vvp, beside iverilog if it is there, otherwise from PATH
+    """
+    sibling = Path(iverilog or iverilog_path()).with_name("vvp")
+    if sibling.parent == Path(".") or not sibling.exists():
+        return "vvp"
+    return str(sibling)
+
+
+def compile_args(
+    top_level_module: str,
+    files: Iterable[Union[str, os.PathLike[str]]],
+    output: Union[str, os.PathLike[str]],
+) -> list[str]:
+    """
+    Returns the argv that compiles files into a vvp image
+
+    :param files: set of absolute paths to files required for simulation
+    """
+    return [
+        iverilog_path(),
+        "-g2005-sv",
+        "-Wall",
+        "-s",
+        top_level_module,
+        *map(str, files),
+        "-o",
+        str(output),
+    ]
+
+
 def make_cmd(top_level_module: str, files: Iterable[Union[str, os.PathLike[str]]]):
     """
-    Returns an iverilog command
+    Returns a shell command that compiles and simulates, to be run by hand
 
     :param files: set of absolute paths to files required for simulation
     """
-    cmd = (
-        f"{env.get_var(env.Vars.IVERILOG_PATH)} -g2005-sv -Wall -s {top_level_module} "
+    image = f"{top_level_module}.vvp"
+    return (
+        shlex.join(compile_args(top_level_module, files, image))
+        + " && "
+        + shlex.join([vvp_path(), "-n", image])
     )
-    cmd += " ".join(map(str, files)) + " "
-    # pylint: disable=consider-using-with
-    cache_file = tempfile.NamedTemporaryFile(mode="r", encoding="utf8")
-    cache_path = cache_file.name
-    cmd += f"-o {cache_path} && unbuffer vvp {cache_path} && rm {cache_path}"
-    return cmd
 
 
-def _write_data_to_paths(path_to_data: dict[str, str]):
+def _read_all(file: BinaryIO, chunks: list[bytes]):
+    """
+    Reads a pipe until EOF
+    """
+    for chunk in iter(lambda: file.read1(1 << 16), b""):  # type: ignore[attr-defined]
+        chunks.append(chunk)
+
+
+def _read_pty(master: int, chunks: list[bytes]):
     """
-    Writes data to respective path
+    Reads a pty until its slave is closed
     """
-    logging.debug("Writing data to paths start")
-    for path, data in path_to_data.items():
-        with open(path, mode="w", encoding="utf8") as file:
-            logging.debug("Writing %s to %s", len(data), file.name)
-            file.write(data)
-    logging.debug("Writing data to paths done")
+    while True:
+        try:
+            chunk = os.read(master, 1 << 16)
+        except OSError:  # EIO once the slave is closed
+            return
+        if not chunk:
+            return
+        chunks.append(chunk)
 
 
-def _run_cmd_with_fifos(
-    command: str, input_fifos: dict[str, str], timeout: Optional[int] = None
-):
+def _kill_group(process: subprocess.Popen[bytes]):
     """
-    Runs a command that uses fifos as input. DO NOT use this function with regular files.
+    Kills the process group of a process started in a new session
+    """
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
 
-    :param input_fifos: absolute file path of fifos -> data to write
 
-    :return: (stdout, stderr/exception)
+def run_vvp(args: list[str], timeout: Optional[float] = None) -> tuple[str, str]:
     """
-    guard_dict(input_fifos, str, str)  # type: ignore
-    # pylint: disable=subprocess-popen-preexec-fn
-    with subprocess.Popen(
-        command,
-        shell=True,
-        text=True,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        preexec_fn=os.setsid,
-    ) as process:
-        _write_data_to_paths(input_fifos)
+    Runs vvp with stdout on a pty, so it is line buffered
+    and the output up to a timeout is not lost in a buffer.
+    Stdout and stderr are read concurrently, so neither pipe can fill up.
 
-        try:
-            logging.debug("Waiting on process for %ss", timeout)
-            start_time = time.time()
-            process.wait(timeout=timeout)
-            logging.debug("Took %ss", time.time() - start_time)
-            assert process.stdout
-            assert process.stderr
-            return process.stdout.read(), process.stderr.read()
-        except subprocess.TimeoutExpired as e:
-            assert process.stdout
+    :return: (stdout, stderr)
+    """
+    master, slave = pty.openpty()
+    tty.setraw(slave)  # Keeps newlines as is
+    stdout: list[bytes] = []
+    stderr: list[bytes] = []
+    try:
+        with subprocess.Popen(
+            args,
+            stdin=subprocess.DEVNULL,
+            stdout=slave,
+            stderr=subprocess.PIPE,
+            start_new_session=True,
+        ) as process:
+            os.close(slave)
+            slave = -1
             assert process.stderr
-            stdout = process.stdout.read()
-            stderr = process.stderr.read()
-            logging.debug("%s, %s, %s", e, stdout, stderr)
-            os.killpg(os.getpgid(process.pid), signal.SIGTERM)
-            return stdout, stderr
+            readers = [
+                threading.Thread(target=_read_pty, args=(master, stdout)),
+                threading.Thread(target=_read_all, args=(process.stderr, stderr)),
+            ]
+            for reader in readers:
+                reader.start()
+            try:
+                logging.debug("Waiting on process for %ss", timeout)
+                start_time = time.time()
+                process.wait(timeout=timeout)
+                logging.debug("Took %ss", time.time() - start_time)
+            except subprocess.TimeoutExpired as e:
+                logging.debug("%s", e)
+                _kill_group(process)
+                process.wait()
+            for reader in readers:
+                reader.join()
+    finally:
+        if slave >= 0:
+            os.close(slave)
+        os.close(master)
+    return (
+        b"".join(stdout).decode("utf8", errors="replace"),
+        b"".join(stderr).decode("utf8", errors="replace"),
+    )
 
 
-def _run_cmd_with_files(
-    command: str, input_files: dict[str, str], timeout: Optional[int] = None
-):
+def _write_fifos(process: subprocess.Popen[bytes], input_fifos: dict[str, str]):
     """
-    Runs a command that uses files as input. DO NOT use this function with regular fifos.
+    Writes data to fifos as the process opens them,
+    stops if the process exits without opening one
+    """
+    for path, data in input_fifos.items():
+        while True:
+            try:
+                descriptor = os.open(path, os.O_WRONLY | os.O_NONBLOCK)
+                break
+            except OSError as e:
+                if e.errno != errno.ENXIO or process.poll() is not None:
+                    logging.debug("Stopped writing fifos %s", e)
+                    return
+                time.sleep(0.001)  # No reader yet
+        os.set_blocking(descriptor, True)
+        try:
+            with open(descriptor, mode="w", encoding="utf8") as file:
+                logging.debug("Writing %s to %s", len(data), path)
+                file.write(data)
+        except BrokenPipeError:
+            logging.debug("Process closed %s", path)
+            return
 
-    :param input_files: absolute file path of files -> data to write
 
+def _simulate(
+    top_level_module: str,
+    input_paths: dict[str, str],
+    is_fifo: bool,
+    timeout: Optional[float] = None,
+) -> tuple[str, str]:
+    """
+    Compiles with iverilog into a temporary directory, then runs vvp
+
+    :param input_paths: absolute file path of files or fifos -> data of fifos
     :return: (stdout, stderr/exception)
     """
-    guard_dict(input_files, str, str)  # type: ignore
-    # _write_data_to_paths(input_files)
-    # pylint: disable=subprocess-popen-preexec-fn
-    with subprocess.Popen(
-        command,
-        shell=True,
-        text=True,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        preexec_fn=os.setsid,
-    ) as process:
-        try:
-            logging.debug("Waiting on process for %ss", timeout)
-            start_time = time.time()
-            process.wait(timeout=timeout)
-            logging.debug("Took %ss", time.time() - start_time)
-            assert process.stdout
-            assert process.stderr
-            return process.stdout.read(), process.stderr.read()
-        except subprocess.TimeoutExpired as e:
-            assert process.stdout
-            assert process.stderr
-            stdout = process.stdout.read()
-            stderr = process.stderr.read()
-            logging.debug("%s, %s, %s", e, stdout, stderr)
-            os.killpg(os.getpgid(process.pid), signal.SIGTERM)
-            return stdout, stderr
+    with tempfile.TemporaryDirectory() as temp_dir, tempfile.TemporaryFile() as log:
+        image = Path(temp_dir) / "image.vvp"
+        args = compile_args(top_level_module, input_paths.keys(), image)
+        logging.debug("Compiling with %s", args)
+        with subprocess.Popen(args, stdout=log, stderr=subprocess.STDOUT) as process:
+            if is_fifo:
+                _write_fifos(process, input_paths)
+            returncode = process.wait()
+        if returncode != 0:
+            log.seek(0)
+            return "", log.read().decode("utf8", errors="replace")
+        return run_vvp([vvp_path(), "-n", str(image)], timeout=timeout)
 
 
 def run_with_fifos(
     top_level_module: str,
     input_fifos: dict[str, str],
     timeout: Optional[int] = None,
-):
+) -> tuple[str, str]:
     """
     Run iverilog with fifos
 
+    :param input_fifos: absolute file path of fifos -> data to write
     :return: (stdout, stderr/exception)
     """
-    iverilog_cmd = make_cmd(
-        top_level_module=top_level_module,
-        files=input_fifos.keys(),
-    )
-    logging.debug("Simulation with command:\n%s", iverilog_cmd)
-    return _run_cmd_with_fifos(
-        command=iverilog_cmd, input_fifos=input_fifos, timeout=timeout
-    )
+    guard_dict(input_fifos, str, str)  # type: ignore
+    return _simulate(top_level_module, input_fifos, is_fifo=True, timeout=timeout)
 
 
 def run_with_files(
     top_level_module: str,
     input_files: dict[str, str],
     timeout: Optional[int] = None,
-):
+) -> tuple[str, str]:
     """
     Run iverilog with files
 
+    :param input_files: absolute file path of existing files -> unused
     :return: (stdout, stderr/exception)
     """
-    iverilog_cmd = make_cmd(
-        top_level_module=top_level_module,
-        files=input_files.keys(),
-    )
-    logging.info("Made command `%s`", iverilog_cmd)
-    return _run_cmd_with_files(
-        command=iverilog_cmd, input_files=input_files, timeout=timeout
-    )
+    guard_dict(input_files, str, str)  # type: ignore
+    return _simulate(top_level_module, input_files, is_fifo=False, timeout=timeout)
+
+
+class VvpImage:
+    """
+    A design compiled once by iverilog into a vvp image, that can be run many times
+
+    Images are cached in `directory` by a hash of the iverilog path,
+    the top level module and the sources, so unchanged designs are not recompiled.
+    The least recently used images are evicted once their total size exceeds
+    the limit set by env var
+
+    For a testbench made with `read_test_cases`, test cases are given at runtime,
+    so new inputs do not require a recompile
+    """
+
+    def __init__(
+        self,
+        top_level_module: str,
+        sources: Iterable[str],
+        directory: Optional[Union[str, os.PathLike[str]]] = None,
+    ):
+        """
+        :param sources: Verilog source code, e.g. [module, testbench]
+        """
+        self.iverilog_path = iverilog_path()
+        sources = list(sources)
+        if directory is None:
+            directory = Path(tempfile.gettempdir()) / "python2verilog"
+        self.directory = Path(directory)
+
+        digest = hashlib.sha256()
+        for part in (self.iverilog_path, top_level_module, *sources):
+            digest.update(part.encode())
+            digest.update(b"\0")
+        self.path = self.directory / f"{digest.hexdigest()}.vvp"
+
+        if self.path.exists():
+            lru.touch(self.path)
+        else:
+            self._compile(top_level_module, sources)
+            lru.evict(self.directory, ".vvp", lru.max_bytes(), keep=self.path)
+
+    @property
+    def vvp_path(self) -> str:
+        """
+        Path to vvp
+        """
+        return vvp_path(self.iverilog_path)
+
+    def _compile(self, top_level_module: str, sources: list[str]):
+        """
+        Compiles sources into the image
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with tempfile.TemporaryDirectory(dir=self.directory) as temp_dir:
+            files = []
+            for i, source in enumerate(sources):
+                file = Path(temp_dir) / f"source{i}.sv"
+                file.write_text(source, encoding="utf8")
+                files.append(str(file))
+            image = Path(temp_dir) / "image.vvp"
+            cmd = compile_args(top_level_module, files, image)
+            logging.debug("Compiling image with %s", cmd)
+            result = subprocess.run(cmd, capture_output=True, text=True, check=False)
+            if result.returncode != 0:
+                raise RuntimeError(f"iverilog failed {result.stdout} {result.stderr}")
+            os.replace(image, self.path)
+
+    def run(
+        self,
+        plusargs: Optional[dict[str, str]] = None,
+        timeout: Optional[float] = None,
+    ) -> tuple[str, str]:
+        """
+        Runs the image, with `+key=value` for each plusarg
+
+        :return: (stdout, stderr)
+        """
+        cmd = [self.vvp_path, "-n", str(self.path)]
+        cmd += [f"+{key}={value}" for key, value in (plusargs or {}).items()]
+        logging.debug("Running image with %s", cmd)
+        return run_vvp(cmd, timeout=timeout)
+
+    def stream(
+        self,
+        output_count: int,
+        plusargs: Optional[dict[str, str]] = None,
+        timeout: Optional[float] = None,
+    ) -> Generator[tuple[Optional[int], ...], None, None]:
+        """
+        Runs the image of a testbench made with `stream_display`,
+        yielding its records while it runs, see `display.parse_records`
+
+        Records are written to a pipe given by `+display=/dev/fd/<n>`.
+        The simulation's process group is killed on timeout,
+        or if the caller stops iterating, e.g. on a mismatch.
+        On timeout, the records written so far are yielded,
+        without a record the simulation was cut off in.
+
+        :param output_count: number of outputs of the module
+        :raises RuntimeError: if the simulation fails, e.g. on `$fatal`
+        """
+        read_fd, write_fd = os.pipe()
+        cmd = [self.vvp_path, "-n", str(self.path), f"+display=/dev/fd/{write_fd}"]
+        cmd += [f"+{key}={value}" for key, value in (plusargs or {}).items()]
+        logging.debug("Streaming image with %s", cmd)
+        with tempfile.TemporaryFile() as output, open(read_fd, "rb") as records:
+            try:
+                # pylint: disable=consider-using-with
+                process = subprocess.Popen(
+                    cmd,
+                    stdout=output,
+                    stderr=output,
+                    pass_fds=(write_fd,),
+                    start_new_session=True,
+                )
+            finally:
+                os.close(write_fd)
+
+            expired = threading.Event()
+
+            def expire():
+                expired.set()
+                _kill_group(process)
+
+            timer = threading.Timer(timeout, expire) if timeout else None
+            try:
+                if timer:
+                    timer.start()
+                try:
+                    yield from parse_records(records, output_count)
+                except TruncatedRecordError:
+                    if not expired.is_set():
+                        raise
+                    logging.debug("Dropped the record cut off by the timeout")
+                returncode = process.wait()
+            finally:
+                if timer:
+                    timer.cancel()
+                if process.poll() is None:
+                    _kill_group(process)
+                    process.wait()
+            output.seek(0)
+            log = output.read().decode("utf8", errors="replace")
+            logging.debug("%s", log)
+            if returncode != 0 and not expired.is_set():
+                raise RuntimeError(f"vvp failed with {returncode} {log}")
+
+    def stream_test_cases(
+        self,
+        output_count: int,
+        test_cases: Iterable[tuple[int, ...]],
+        timeout: Optional[float] = None,
+    ) -> Generator[tuple[Optional[int], ...], None, None]:
+        """
+        Streams the image on test cases, given by a data file
+
+        The data file is ignored by testbenches that do not `read_test_cases`
+        """
+        with tempfile.TemporaryDirectory() as temp_dir:
+            data = Path(temp_dir) / "test_cases.txt"
+            data.write_text(Testbench.format_test_cases(test_cases), encoding="utf8")
+            yield from self.stream(
+                output_count, {"test_cases": str(data)}, timeout=timeout
+            )
+
+    def run_test_cases(
+        self,
+        test_cases: Iterable[tuple[int, ...]],
+        timeout: Optional[float] = None,
+    ) -> tuple[str, str]:
+        """
+        Runs the image on test cases, given by a data file
+
+        :return: (stdout, stderr)
+        """
+        with tempfile.TemporaryDirectory() as temp_dir:
+            data = Path(temp_dir) / "test_cases.txt"
+            data.write_text(Testbench.format_test_cases(test_cases), encoding="utf8")
+            return self.run({"test_cases": str(data)}, timeout=timeout)
@@ -0,0 +1,150 @@
+"""
+Opt-in pool of warm simulation workers
+
+Each worker process creates a pair of fifos once, for the module and testbench,
+and reuses them for every simulation it runs,
+instead of creating temporary fifos and a new process per simulation.
+Jobs are submitted through the executor's multiprocessing queues.
+
+Enabled by setting the `SIMULATION_POOL` env var to the number of workers,
+or to empty for the cpu count
+"""
+
+import atexit
+import logging
+import os
+import shutil
+import tempfile
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing.util import Finalize
+from typing import Optional
+
+from python2verilog.simulation import iverilog
+from python2verilog.utils import env
+
+# Fifos of this worker process, (module, testbench)
+_worker_fifos: Optional[tuple[str, str]] = None
+
+
+def _init_worker():
+    """
+    Creates the fifos of a worker, removed when the worker exits
+    """
+    global _worker_fifos  # pylint: disable=global-statement
+    directory = tempfile.mkdtemp(prefix="python2verilog")
+    module_fifo = os.path.join(directory, "module.sv")
+    tb_fifo = os.path.join(directory, "testbench.sv")
+    os.mkfifo(module_fifo)
+    os.mkfifo(tb_fifo)
+    _worker_fifos = (module_fifo, tb_fifo)
+    Finalize(
+        None,
+        shutil.rmtree,
+        args=(directory,),
+        kwargs={"ignore_errors": True},
+        exitpriority=0,
+    )
+    logging.debug("Simulation worker %s using %s", os.getpid(), directory)
+
+
+def _simulate(
+    top_level_module: str, module: str, testbench: str, timeout: Optional[int]
+) -> tuple[str, str]:
+    """
+    Simulates in a worker, with its fifos
+
+    :return: (stdout, stderr/exception)
+    """
+    assert _worker_fifos, "Worker was not initialized"
+    module_fifo, tb_fifo = _worker_fifos
+    return iverilog.run_with_fifos(
+        top_level_module, {module_fifo: module, tb_fifo: testbench}, timeout=timeout
+    )
+
+
+class SimulationPool:
+    """
+    Pool of worker processes that simulate with iverilog
+    """
+
+    def __init__(self, workers: Optional[int] = None):
+        """
+        :param workers: number of worker processes, defaults to cpu count
+        """
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker
+        )
+
+    def submit(
+        self,
+        top_level_module: str,
+        module: str,
+        testbench: str,
+        timeout: Optional[int] = None,
+    ) -> "Future[tuple[str, str]]":
+        """
+        Submits a simulation
+
+        :return: future of (stdout, stderr/exception)
+        """
+        return self.executor.submit(
+            _simulate, top_level_module, module, testbench, timeout
+        )
+
+    def run(
+        self,
+        top_level_module: str,
+        module: str,
+        testbench: str,
+        timeout: Optional[int] = None,
+    ) -> tuple[str, str]:
+        """
+        Simulates in a worker, waiting for the result
+
+        :return: (stdout, stderr/exception)
+        """
+        return self.submit(top_level_module, module, testbench, timeout).result()
+
+    def shutdown(self):
+        """
+        Stops the workers
+        """
+        self.executor.shutdown()
+
+
+_pool: Optional[SimulationPool] = None
+
+# Value of the env var that the pool was created with
+_pool_workers: Optional[str] = None
+
+
+def shutdown_pool():
+    """
+    Stops the workers of the pool, if any, a later `get_pool` creates a new pool
+    """
+    global _pool, _pool_workers  # pylint: disable=global-statement
+    if _pool is not None:
+        _pool.shutdown()
+    _pool, _pool_workers = None, None
+
+
+atexit.register(shutdown_pool)
+
+
+def get_pool() -> Optional[SimulationPool]:
+    """
+    Gets the pool configured by env var, created on first use,
+    or None if the pool is off
+
+    The pool is recreated if the env var changes, or shut down if it is unset
+    """
+    global _pool, _pool_workers  # pylint: disable=global-statement
+    workers = env.get_var(env.Vars.SIMULATION_POOL)
+    if _pool is not None and workers != _pool_workers:
+        shutdown_pool()
+    if workers is None:
+        return None
+    if _pool is None:
+        _pool = SimulationPool(int(workers) if workers else None)
+        _pool_workers = workers
+    return _pool
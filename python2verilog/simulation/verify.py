@@ -0,0 +1,62 @@
+"""
+Incremental comparison of simulated and expected outputs
+
+Outputs are compared as they are simulated, so a diverging design
+fails on its first mismatch instead of after the whole simulation
+"""
+
+from typing import Iterable, Optional, Union
+
+from python2verilog.exceptions import OutputMismatchError
+
+Output = Union[tuple[int, ...], int]
+
+
+def _valid_outputs(
+    records: Iterable[tuple[Optional[int], ...]]
+) -> Iterable[tuple[int, Union[tuple[Optional[int], ...], Optional[int]]]]:
+    """
+    Outputs of rows where ready and valid are high, as `display.strip_records`,
+    but unknown values are kept to be reported
+
+    :return: (row index, outputs)
+    """
+    for row, (ready, valid, *outputs) in enumerate(records):
+        if ready == 1 and valid == 1:
+            yield row, outputs[0] if len(outputs) == 1 else tuple(outputs)
+
+
+def compare_records(
+    records: Iterable[tuple[Optional[int], ...]],
+    expected: Iterable[tuple[tuple[int, ...], Iterable[Output]]],
+) -> int:
+    """
+    Compares records, see `display.parse_records`, with the expected outputs
+    of each test case, consuming both only as far as needed
+
+    Raises `OutputMismatchError` on the first mismatch,
+    at which point the caller should stop the simulation
+
+    :param expected: (test case, outputs of the test case) for each test case
+    :return: number of outputs compared
+    """
+    actual = iter(_valid_outputs(records))
+    row = -1
+    count = 0
+    test_case: tuple[int, ...] = ()
+    test_case_index, output_index = -1, -1
+    for test_case_index, (test_case, outputs) in enumerate(expected):
+        for output_index, output in enumerate(outputs):
+            row, value = next(actual, (row, None))
+            if value != output:
+                raise OutputMismatchError(
+                    test_case_index, test_case, output_index, row, output, value
+                )
+            count += 1
+    extra = next(actual, None)
+    if extra is not None:
+        # Attributed to the last test case
+        raise OutputMismatchError(
+            test_case_index, test_case, output_index + 1, extra[0], None, extra[1]
+        )
+    return count
@@ -0,0 +1,30 @@
+"""
+Fixed-size bitset
+"""
+
+
+class Bitset:
+    """
+    Set of integers in [0, size), one bit each
+    """
+
+    __slots__ = ("_bits", "_count")
+
+    def __init__(self, size: int):
+        self._bits = bytearray((size + 7) >> 3)
+        self._count = 0
+
+    def add(self, index: int) -> None:
+        """
+        Adds index to set
+        """
+        mask = 1 << (index & 7)
+        if not self._bits[index >> 3] & mask:
+            self._bits[index >> 3] |= mask
+            self._count += 1
+
+    def __contains__(self, index: int) -> bool:
+        return bool(self._bits[index >> 3] & (1 << (index & 7)))
+
+    def __len__(self) -> int:
+        return self._count
@@ -20,6 +20,9 @@ class Vars(Enum):
     # Path to iverilog
     IVERILOG_PATH = PREFIX + "IVERILOG_PATH"
 
+    # Path to the C compiler of the compiled simulator
+    CC_PATH = PREFIX + "CC_PATH"
+
     # Set to enable new SystemVerilog features
     IS_SYSTEM_VERILOG = PREFIX + "SYSTEM_VERILOG"
 
@@ -29,6 +32,20 @@ class Vars(Enum):
     # Add debug comments
     DEBUG_COMMENTS = PREFIX + "DEBUG_COMMENTS"
 
+    # Set to cache compiled Verilog on disk, in this directory if non-empty
+    CACHE_DIR = PREFIX + "CACHE_DIR"
+
+    # Maximum size in bytes of each on-disk cache,
+    # i.e. of compiled Verilog, vvp images and C simulators
+    CACHE_SIZE = PREFIX + "CACHE_SIZE"
+
+    # Set to simulate in a pool of warm workers, of this size if non-empty
+    SIMULATION_POOL = PREFIX + "SIMULATION_POOL"
+
+    # Set to convert namespaces to files in worker processes,
+    # this many if non-empty
+    PARALLEL_CONVERSION = PREFIX + "PARALLEL_CONVERSION"
+
 
 def set_debug_mode(mode: bool):
     """
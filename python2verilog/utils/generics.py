@@ -21,22 +21,40 @@ def pretty_dict(dic: dict[Any, Any], indent: int = 0) -> str:
     return result + "\t" * (indent) + "}\n"
 
 
+def attributes(obj: object) -> dict[str, Any]:
+    """
+    Returns the attributes of an object, from its __slots__ and __dict__
+    """
+    result = {}
+    for cls in reversed(type(obj).__mro__):
+        slots = cls.__dict__.get("__slots__", ())
+        for slot in (slots,) if isinstance(slots, str) else slots:
+            if slot not in ("__dict__", "__weakref__") and hasattr(obj, slot):
+                result[slot] = getattr(obj, slot)
+    result.update(getattr(obj, "__dict__", {}))
+    return result
+
+
 class GenericRepr:
     """
-    Implements a generic __repr__ based on self.__dict__
+    Implements a generic __repr__ based on the object's attributes
     """
 
+    __slots__ = ()
+
     @reprlib.recursive_repr()
     def __repr__(self):
-        items = [f"{key}=({repr(value)})" for key, value in self.__dict__.items()]
+        items = [f"{key}=({repr(value)})" for key, value in attributes(self).items()]
         return f"{self.__class__.__name__}({','.join(items)})"
 
 
 class GenericReprAndStr(GenericRepr):
     """
-    Implements a generic __repr__ and __str__ based on self.__dict__
+    Implements a generic __repr__ and __str__ based on the object's attributes
     """
 
+    __slots__ = ()
+
     @reprlib.recursive_repr()
     def __str__(self):
-        return f"{self.__class__.__name__}\n{pretty_dict(self.__dict__)}"
+        return f"{self.__class__.__name__}\n{pretty_dict(attributes(self))}"
@@ -2,6 +2,9 @@
 
 from __future__ import annotations
 
+import io
+from typing import TextIO
+
 
 class Lines:
     """
@@ -70,14 +73,11 @@ class Lines:
         self.lines = [self.__indent(indent_amount, line) for line in self.lines]
         return self
 
-    def to_string(self, indent: int = 0):
+    def to_string(self, indent: int = 0) -> str:
         """
         Converts all lines into a string with lines
         """
-        output = ""
-        for buffer in self.lines:
-            output += self.__indent(indent, buffer) + "\n"
-        return output
+        return "".join(self.__indent(indent, line) + "\n" for line in self.lines)
 
     def add(self, other: str):
         """
@@ -155,6 +155,70 @@ class Indent:
         return self.indentify(self.indent)
 
 
+class LineWriter:
+    """
+    Writes lines with indentation to a text stream,
+    buffered such that the stream is written to in large chunks
+    """
+
+    def __init__(self, stream: TextIO, buffer_size: int = 4096):
+        """
+        :param buffer_size: number of strings buffered before writing to stream
+        """
+        self.stream = stream
+        self.buffer_size = buffer_size
+        self.buffer: list[str] = []
+
+    def line(self, text: str, indent: int = 0):
+        """
+        Writes a line, indented if non-empty, same as `Lines.to_string`
+        """
+        if indent and len(text.strip()) > 0:
+            self.buffer.append(Indent.indentor * indent)
+        self.buffer.append(text)
+        self.buffer.append("\n")
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
+
+    def lines(self, lines: Lines, indent: int = 0):
+        """
+        Writes all lines
+        """
+        for line in lines.lines:
+            self.line(line, indent)
+
+    def flush(self):
+        """
+        Writes buffered lines to stream
+        """
+        self.stream.write("".join(self.buffer))
+        self.buffer.clear()
+
+
+class LinesWriter(LineWriter):
+    """
+    Writes lines with indentation to Lines, instead of a text stream
+    """
+
+    def __init__(self, lines: Lines):
+        super().__init__(io.StringIO())
+        self.target = lines
+
+    def line(self, text: str, indent: int = 0):
+        """
+        Adds a line, indented if non-empty, same as `LineWriter.line`
+        """
+        for part in text.split("\n"):
+            if indent and len(part.strip()) > 0:
+                part = Indent.indentor * indent + part
+            self.target.lines.append(part)
+
+    def flush(self):
+        """
+        Nothing is buffered
+        """
+
+
 class ImplementsToLines:
     """
     A base class defining an interface for classes that need to provide a 'to_lines' method
@@ -166,11 +230,51 @@ class ImplementsToLines:
         """
         raise NotImplementedError("Derived class must implement to_lines")
 
+    def write_lines(self, writer: LineWriter, indent: int = 0):
+        """
+        Writes lines to writer
+
+        Derived classes with nested statements should override this
+        to write them directly, instead of building Lines at every nesting level
+        """
+        writer.lines(self.to_lines(), indent)
+
+    def write(self, stream: TextIO):
+        """
+        Writes to a text stream, same output as `to_string`
+        """
+        writer = LineWriter(stream)
+        self.write_lines(writer)
+        writer.flush()
+
     def to_string(self):
         """
         To string
         """
-        return str(self.to_lines())
+        stream = io.StringIO()
+        self.write(stream)
+        return stream.getvalue()
 
     def __str__(self):
         return self.to_string()
+
+
+class ImplementsWriteLines(ImplementsToLines):
+    """
+    A base class for classes with nested lines, that implement `write_lines`
+    and derive `to_lines` from it
+    """
+
+    def to_lines(self):
+        """
+        To Lines, same lines as written by `write_lines`
+        """
+        lines = Lines()
+        self.write_lines(LinesWriter(lines))
+        return lines
+
+    def write_lines(self, writer: LineWriter, indent: int = 0):
+        """
+        Writes lines to writer
+        """
+        raise NotImplementedError("Derived class must implement write_lines")
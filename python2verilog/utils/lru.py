@@ -0,0 +1,63 @@
+"""
+Least recently used eviction of the files of on-disk caches
+
+Files are marked as used by their modification time
+"""
+
+import logging
+import os
+from pathlib import Path
+from typing import Optional
+
+from python2verilog.utils import env
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def max_bytes() -> int:
+    """
+    Size limit of each on-disk cache, configured by env var
+    """
+    value = env.get_var(env.Vars.CACHE_SIZE)
+    return int(value) if value else DEFAULT_MAX_BYTES
+
+
+def touch(path: Path) -> None:
+    """
+    Marks a file as recently used
+    """
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def evict(
+    directory: Path, suffix: str, limit: int, keep: Optional[Path] = None
+) -> None:
+    """
+    Removes the least recently used files ending in suffix
+    until their total size is within limit
+
+    :param keep: a file that is not removed, e.g. one about to be used
+    """
+    entries = []
+    total = 0
+    for path in directory.glob("*" + suffix):
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        total += stat.st_size
+        if path != keep:
+            entries.append((stat.st_mtime, stat.st_size, path))
+    entries.sort()
+    for _, size, path in entries:
+        if total <= limit:
+            break
+        try:
+            path.unlink()
+        except OSError:
+            continue
+        total -= size
+        logging.debug("Cache evicted %s", path.name)
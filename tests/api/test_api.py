@@ -1,14 +1,25 @@
 import atexit
 import os
+import tempfile
 import unittest
 from functools import wraps
 from pathlib import Path
 
 import pytest
 
-from python2verilog.api import Modes, new_namespace, verilogify
+from python2verilog.api import (
+    Modes,
+    namespace_to_file,
+    namespace_to_verilog,
+    namespace_to_verilog_parallel,
+    new_namespace,
+    verilogify,
+)
 from python2verilog.api.context import context_to_verilog, context_to_verilog_and_dump
+from python2verilog.api.exit_handler import namespace_exit_handler
+from python2verilog.api.file_namespaces import _file_namespaces
 from python2verilog.api.python import py_to_context
+from python2verilog.utils import env
 
 
 class TestParsePython(unittest.TestCase):
@@ -218,3 +229,91 @@ class TestVerilogify(unittest.TestCase):
         module, tb, cytoscape = context_to_verilog_and_dump(ns[circle_lines.__name__])
         with open(Path(__file__).parent / "circle_lines_cytoscape.log", mode="w") as f:
             f.write(str(cytoscape))
+
+    def test_parallel_namespace(self):
+        ns = {}
+
+        @verilogify(namespace=ns, optimization_level=1)
+        def increment(a):
+            return a + 1
+
+        @verilogify(namespace=ns, optimization_level=1)
+        def counter(n):
+            i = 0
+            while i < n:
+                j = increment(i)
+                yield j
+                i = j
+
+        increment(1)
+        list(counter(5))
+
+        self.assertEqual(
+            namespace_to_verilog_parallel(ns, processes=2),
+            namespace_to_verilog(ns),
+        )
+
+    def test_parallel_exit_handler(self):
+        ns = {}
+
+        @verilogify(namespace=ns, mode=Modes.OVERWRITE)
+        def first(n):
+            yield n
+
+        @verilogify(namespace=ns, mode=Modes.OVERWRITE)
+        def second(n):
+            yield n + 1
+
+        list(first(1))
+        list(second(1))
+
+        # Only this namespace is written
+        file_namespaces = dict(_file_namespaces)
+        processes = env.get_var(env.Vars.PARALLEL_CONVERSION)
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "exit"
+            try:
+                _file_namespaces.clear()
+                _file_namespaces[path] = ns
+                env.set_var(env.Vars.PARALLEL_CONVERSION, "2")
+                namespace_exit_handler()
+            finally:
+                env.set_var(env.Vars.PARALLEL_CONVERSION, processes)
+                _file_namespaces.clear()
+                _file_namespaces.update(file_namespaces)
+
+            module, testbench = namespace_to_verilog(ns)
+            self.assertEqual(Path(str(path) + ".sv").read_text(encoding="utf8"), module)
+            self.assertEqual(
+                Path(str(path) + "_tb.sv").read_text(encoding="utf8"), testbench
+            )
+
+    def test_incremental_write(self):
+        ns = {}
+
+        @verilogify(namespace=ns, mode=Modes.OVERWRITE)
+        def first(n):
+            yield n
+
+        @verilogify(namespace=ns, mode=Modes.OVERWRITE)
+        def second(n):
+            yield n + 1
+
+        list(first(1))
+        list(second(1))
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "incremental"
+            module_path = Path(str(path) + ".sv")
+            testbench_path = Path(str(path) + "_tb.sv")
+
+            self.assertEqual(namespace_to_file(path, ns), namespace_to_verilog(ns))
+            module_stat = module_path.stat()
+            testbench_stat = testbench_path.stat()
+
+            list(second(2))
+            module, testbench = namespace_to_file(path, ns)
+            self.assertEqual((module, testbench), namespace_to_verilog(ns))
+            self.assertEqual(module_path.stat().st_mtime_ns, module_stat.st_mtime_ns)
+            self.assertEqual(testbench_path.read_text(encoding="utf8"), testbench)
+            self.assertNotEqual(testbench_stat.st_size, testbench_path.stat().st_size)
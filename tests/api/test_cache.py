@@ -0,0 +1,121 @@
+import os
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import pytohdl
+
+from python2verilog import namespace_to_verilog, verilogify
+from python2verilog.api import cache as cache_module
+from python2verilog.api.cache import Cache
+from python2verilog.backend.verilog.config import CodegenConfig
+from python2verilog.utils import env
+
+
+class TestCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.previous = env.get_var(env.Vars.CACHE_DIR)
+
+    def tearDown(self):
+        env.set_var(env.Vars.CACHE_DIR, self.previous)
+        self.directory.cleanup()
+
+    def test_put_get(self):
+        cache = Cache(self.directory.name)
+        self.assertIsNone(cache.get("key"))
+        cache.put("key", "module", "testbench")
+        self.assertEqual(cache.get("key"), ("module", "testbench"))
+        self.assertEqual(
+            [path.name for path in Path(self.directory.name).iterdir()], ["key.json"]
+        )
+
+    def test_evict_least_recently_used(self):
+        cache = Cache(self.directory.name)
+        for key in ("a", "b", "c"):
+            cache.put(key, "x" * 100, "")
+        now = time.time()
+        os.utime(cache._path("a"), (now - 30, now - 30))
+        os.utime(cache._path("b"), (now - 20, now - 20))
+        os.utime(cache._path("c"), (now - 10, now - 10))
+        cache.get("a")  # Most recently used
+
+        cache.max_bytes = 2 * cache._path("a").stat().st_size
+        cache.evict()
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("c"))
+
+    def test_namespace(self):
+        env.set_var(env.Vars.CACHE_DIR, self.directory.name)
+
+        def make_namespace(optimization_level: int):
+            ns = {}
+
+            @verilogify(namespace=ns, optimization_level=optimization_level)
+            def counter(n):
+                i = 0
+                while i < n:
+                    yield i
+                    i += 1
+
+            counter(5)
+            return ns
+
+        config = CodegenConfig(random_ready=True)
+        expected = namespace_to_verilog(make_namespace(1), config)
+        self.assertEqual(len(list(Path(self.directory.name).iterdir())), 1)
+
+        self.assertEqual(namespace_to_verilog(make_namespace(1), config), expected)
+        self.assertEqual(len(list(Path(self.directory.name).iterdir())), 1)
+
+        namespace_to_verilog(make_namespace(2), config)
+        namespace_to_verilog(make_namespace(1), CodegenConfig(random_ready=False))
+        self.assertEqual(len(list(Path(self.directory.name).iterdir())), 3)
+
+    def test_env_vars(self):
+        env.set_var(env.Vars.CACHE_DIR, self.directory.name)
+        is_system_verilog = env.get_var(env.Vars.IS_SYSTEM_VERILOG)
+
+        def convert():
+            ns = {}
+
+            @verilogify(namespace=ns)
+            def counter(n):
+                i = 0
+                while i < n:
+                    yield i
+                    i += 1
+
+            counter(5)
+            module, _ = namespace_to_verilog(ns)
+            return module
+
+        try:
+            env.set_var(env.Vars.IS_SYSTEM_VERILOG, "")
+            self.assertIn("typedef enum", convert())
+            env.set_var(env.Vars.IS_SYSTEM_VERILOG, None)
+            self.assertNotIn("typedef enum", convert())
+            self.assertIn("localparam", convert())
+            self.assertEqual(len(list(Path(self.directory.name).iterdir())), 2)
+        finally:
+            env.set_var(env.Vars.IS_SYSTEM_VERILOG, is_system_verilog)
+
+    def test_translator_version(self):
+        ns = {}
+
+        @verilogify(namespace=ns)
+        def counter(n):
+            i = 0
+            while i < n:
+                yield i
+                i += 1
+
+        counter(5)
+        key = Cache.key(ns["counter"], CodegenConfig())
+        with mock.patch.object(cache_module, "_translator_digest", None):
+            with mock.patch.object(pytohdl, "__version__", "0.0.0", create=True):
+                self.assertNotEqual(Cache.key(ns["counter"], CodegenConfig()), key)
+        self.assertEqual(Cache.key(ns["counter"], CodegenConfig()), key)
@@ -1,7 +1,13 @@
 import logging
 import unittest
 
-from python2verilog.api import Modes, context_to_verilog, get_context, verilogify
+from python2verilog.api import (
+    Modes,
+    RecordPolicy,
+    context_to_verilog,
+    get_context,
+    verilogify,
+)
 from python2verilog.backend.verilog.config import CodegenConfig
 
 
@@ -26,3 +32,79 @@ class TestVerilogify(unittest.TestCase):
         )
         self.assertIn(count.__name__, testbench)
         self.assertIn(count.__name__, module)
+
+    def test_lazy_source(self):
+        namespace = {}
+
+        @verilogify(namespace=namespace)
+        def count(n):
+            i = 0
+            while i < n:
+                yield i
+                i += 1
+
+        context = namespace[count.__name__]
+        self.assertIsNone(context._py_ast)
+        self.assertEqual([var.py_name for var in context.input_vars], ["n"])
+
+        list(count(3))
+        self.assertEqual(context.py_ast.name, count.__name__)
+        self.assertIn("def count(n):", context.py_string)
+
+    def test_policy(self):
+        namespace = {}
+
+        @verilogify(
+            namespace=namespace,
+            policy=RecordPolicy(max_test_cases=4, dedupe=True, seed=0),
+        )
+        def count(n):
+            i = 0
+            while i < n:
+                yield i
+                i += 1
+
+        for n in [*range(16), *range(16)]:
+            self.assertListEqual(list(count(n)), list(range(n)))
+
+        test_cases = namespace[count.__name__].test_cases
+        self.assertEqual(len(test_cases), 4)
+        self.assertEqual(len(set(test_cases)), 4)
+
+    def test_production_policy(self):
+        namespace = {}
+
+        @verilogify(namespace=namespace, policy=RecordPolicy.production(2))
+        def count(n):
+            i = 0
+            while i < n:
+                yield i
+                i += 1
+
+        self.assertListEqual(list(count(20000)), list(range(20000)))
+        self.assertListEqual(list(count(3)), [0, 1, 2])
+        self.assertEqual(len(namespace[count.__name__].test_cases), 2)
+
+    def test_context_copy(self):
+        namespace = {}
+
+        @verilogify(namespace=namespace)
+        def count(n):
+            i = 0
+            while i < n:
+                yield i
+                i += 1
+
+        list(count(3))
+
+        context = get_context(count)
+        context.test_cases.append((5,))
+        context.add_state("_state_copy")
+        self.assertListEqual(get_context(count).test_cases, [(3,)])
+        self.assertNotIn("_state_copy", get_context(count).states)
+        self.assertIs(context.py_ast, context.copy().py_ast)
+
+        snapshot = context.snapshot()
+        self.assertIs(snapshot, snapshot.snapshot())
+        with self.assertRaises(AttributeError):
+            snapshot.name = "other"
@@ -3,7 +3,12 @@ import unittest
 
 from python2verilog import ir
 from python2verilog.backend.verilog import CodeGen
+from python2verilog.backend.verilog import ast as ver
 from python2verilog.backend.verilog.ast import Instantiation, Module, PosedgeSyncAlways
+from python2verilog.backend.verilog.config import StateEncoding, WidthInference
+from python2verilog.backend.verilog.minimize import minimize_states
+from python2verilog.backend.verilog.widths import infer_widths, input_range_checks
+from python2verilog.utils import env
 
 
 def assert_lines(test_case: unittest.TestCase, first: str, second: str):
@@ -95,6 +100,164 @@ def circle_lines(s_x, s_y, height) -> tuple[int, int]:
         # warnings.warn(inst.to_lines())
 
 
+class TestMinimize(unittest.TestCase):
+    def test_minimize_states(self):
+        context = ir.Context(name="minimize")
+        context.entry_state = ir.State("_entry")
+        state_var = context.state_var
+        x = ir.Var("x")
+
+        def goto(state: str):
+            return ver.NonBlockingSubsitution(state_var, ir.State(state))
+
+        def loop(state: str, value: int):
+            return ver.CaseItem(
+                ir.State(state),
+                [
+                    ver.NonBlockingSubsitution(x, ir.Int(value)),
+                    ver.IfElse(ir.Expression("cond"), [goto(state)], [goto("_done")]),
+                ],
+            )
+
+        case = ver.Case(
+            state_var,
+            [
+                ver.CaseItem(
+                    ir.State("_entry"),
+                    [ver.IfElse(ir.Expression("start"), [goto("_a")], [goto("_b")])],
+                ),
+                loop("_a", 1),
+                loop("_b", 1),
+                loop("_c", 2),
+                ver.CaseItem(ir.State("_d"), [goto("_c")]),
+            ],
+        )
+        minimize_states(case, context)
+        self.assertListEqual(
+            [item.condition.to_string() for item in case.case_items],
+            ["_entry", "_a", "_c", "_d"],
+        )
+        self.assertNotIn("_b", case.to_string())
+
+        # Loops of different values are not equivalent
+        case = ver.Case(state_var, [loop("_a", 1), loop("_b", 2)])
+        minimize_states(case, context)
+        self.assertEqual(len(case.case_items), 2)
+
+
+class TestStateEncoding(unittest.TestCase):
+    def test_codes(self):
+        for encoding in StateEncoding:
+            for count in (1, 2, 5, 8, 33):
+                width = encoding.width(count)
+                codes = [encoding.code(index) for index in range(count)]
+                self.assertEqual(len(set(codes)), count)
+                self.assertTrue(all(0 <= code < 2**width for code in codes))
+        self.assertEqual(StateEncoding.BINARY.width(5), 3)
+        self.assertEqual(StateEncoding.ONE_HOT.width(5), 5)
+        gray = [StateEncoding.GRAY.code(index) for index in range(8)]
+        for code, next_code in zip(gray, gray[1:]):
+            self.assertEqual(bin(code ^ next_code).count("1"), 1)
+
+    def test_module(self):
+        def encoded_module():
+            return Module(
+                "encoded",
+                localparams={"_a": ir.UInt(1), "_b": ir.UInt(32)},
+                state_width=6,
+            ).to_string()
+
+        is_system_verilog = env.get_var(env.Vars.IS_SYSTEM_VERILOG)
+        try:
+            env.set_var(env.Vars.IS_SYSTEM_VERILOG, None)
+            module = encoded_module()
+            self.assertIn("localparam [5:0] _a = 6'd1;", module)
+            self.assertIn("localparam [5:0] _b = 6'd32;", module)
+            self.assertIn("reg [5:0] _state;", module)
+
+            env.set_var(env.Vars.IS_SYSTEM_VERILOG, "")
+            module = encoded_module()
+            self.assertIn("typedef enum logic [5:0]{_a = 6'd1,_b = 6'd32}", module)
+        finally:
+            env.set_var(env.Vars.IS_SYSTEM_VERILOG, is_system_verilog)
+
+
+class TestWidthInference(unittest.TestCase):
+    def test_infer_widths(self):
+        context = ir.Context(name="widths")
+        n, i, j, k = map(context.make_var, "nijk")
+        context.input_vars = [n]
+        context.output_types = [int]
+        context.default_output_vars()
+        for var in (i, j, k):
+            context.add_local_var(var)
+        context.test_cases = [(3,), (-5,)]
+        state_var = context.state_var
+
+        def assign(var: ir.Var, value: ir.Expression):
+            return ver.NonBlockingSubsitution(var, value)
+
+        def goto(state: str):
+            return assign(state_var, ir.State(state))
+
+        start: list[ver.Statement] = [
+            assign(n, ir.Expression(n.py_name)),
+            assign(i, ir.Int(0)),
+            goto("_loop"),
+        ]
+        # The loop condition and increment are in different states
+        loop = ver.CaseItem(
+            ir.State("_loop"),
+            [ver.IfElse(ir.BinOp(i, "<", ir.Int(10)), [goto("_body")], [])],
+        )
+        body = ver.CaseItem(
+            ir.State("_body"),
+            [
+                assign(i, ir.BinOp(i, "+", ir.Int(1))),
+                assign(j, ir.BinOp(j, "+", n)),
+                goto("_loop"),
+            ],
+        )
+        case = ver.Case(state_var, [loop, body])
+        self.assertDictEqual(
+            infer_widths(start, case, context, WidthInference.STATIC),
+            {"_n": 32, "_i": 5, "_j": 32, "_k": 32},
+        )
+        self.assertDictEqual(
+            infer_widths(start, case, context, WidthInference.TEST_CASES),
+            {"_n": 4, "_i": 5, "_j": 32, "_k": 32},
+        )
+
+        # 10 * 10 is computed in the width of i
+        body.statements.insert(0, assign(k, ir.BinOp(i, "*", i)))
+        widths = infer_widths(start, case, context, WidthInference.STATIC)
+        self.assertEqual(widths["_k"], 8)
+        self.assertEqual(widths["_i"], 8)
+
+        # Unsigned operands zero-extend i
+        body.statements.insert(0, assign(j, ir.BinOp(i, "+", ir.Expression("u"))))
+        widths = infer_widths(start, case, context, WidthInference.STATIC)
+        self.assertEqual(widths["_i"], 32)
+
+    def test_input_range_checks(self):
+        context = ir.Context(name="checks")
+        context.input_vars = [context.make_var("n"), context.make_var("m")]
+        context.test_cases = [(3, -(2**31)), (-5, 2**31 - 1)]
+
+        self.assertListEqual(input_range_checks(context, WidthInference.STATIC), [])
+        # m is not bounded by the test cases
+        (check,) = input_range_checks(context, WidthInference.TEST_CASES)
+        assert_lines(
+            self,
+            check.to_string(),
+            """
+            if (((n < $signed(-5)) || (n > $signed(3)))) begin
+                $display("Error: input n = %0d is outside of -5 to 3 that widths were inferred for", n);
+            end
+            """.strip(),
+        )
+
+
 import networkx as nx
 from matplotlib import pyplot as plt
 
@@ -1,7 +1,6 @@
-import sys
-
 import pytest
 
+from python2verilog.backend.verilog.config import StateEncoding, WidthInference
 from python2verilog.utils import env
 
 from .utils import Argument
@@ -49,6 +48,31 @@ params = [
         action="store",
         help="Path to iverilog",
     ),
+    Argument(
+        "M",
+        "memory",
+        default=False,
+        action="store_true",
+        help="Set to query IR memory stats (per-element size and peak RSS)",
+    ),
+    Argument(
+        "state_encodings",
+        default=[],
+        nargs="+",
+        choices=[encoding.value for encoding in StateEncoding],
+        action="extend",
+        help="Set which state encodings are also tested, "
+        "and compared in cells when synthesizing",
+    ),
+    Argument(
+        "width_inferences",
+        default=[],
+        nargs="+",
+        choices=[inference.value for inference in WidthInference],
+        action="extend",
+        help="Set which register width inferences are also tested, "
+        "and compared in cells when synthesizing",
+    ),
     Argument(
         "E",
         "env_debug",
@@ -86,9 +110,6 @@ def argparse(request):
     args["optimization_levels"] = (
         set(args["optimization_levels"]) if args["optimization_levels"] else {1}
     )
-    sys.setrecursionlimit(
-        sys.getrecursionlimit() + max(args["optimization_levels"]) * 250
-    )
     env.set_var(env.Vars.IVERILOG_PATH, args["iverilog_path"])
     if args["synthesis"]:
         # Synthesis tool yosys does not support SystemVerilog features
@@ -103,3 +103,33 @@ class TestGenerator2Graph(unittest.TestCase):
         # module, testbench = namespace_to_verilog(ns)
 
         return
+
+    def test_inline_template(self):
+        ns = {}
+
+        @verilogify(namespace=ns)
+        def inc(a):
+            b = a + 1
+            return b
+
+        @verilogify(namespace=ns)
+        def twice(n):
+            x = inc(n)
+            y = inc(x)
+            yield x, y
+
+        inc(1)
+        list(twice(1))
+
+        cxt, _ = Function(get_context(twice).validate()).parse_function()
+        template = ns["inc"]._inline_template
+        self.assertIsNotNone(template)
+        names = [var.ver_name for var in cxt.local_vars]
+        self.assertEqual(len(names), len(set(names)))
+        self.assertTrue(all("\0" not in name for name in names))
+
+        first, _, _ = Function.parse_inline_template(ns["inc"], prefix="_first_")
+        second, _, _ = Function.parse_inline_template(ns["inc"], prefix="_second_")
+        self.assertIs(ns["inc"]._inline_template, template)
+        self.assertEqual(str(first.input_vars), "[__first_a]")
+        self.assertEqual(str(second.input_vars), "[__second_a]")
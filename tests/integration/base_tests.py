@@ -4,9 +4,8 @@ Base classes for integration tests
 
 import logging
 import os
-import re
-import subprocess
 import unittest
+from dataclasses import replace
 from pathlib import Path
 from types import FunctionType
 from typing import Iterable, Union
@@ -22,11 +21,16 @@ from python2verilog import (
     namespace_to_verilog,
     verilogify,
 )
-from python2verilog.backend.verilog.config import CodegenConfig
+from python2verilog.api.context import context_to_codegen
+from python2verilog.backend.verilog.config import (
+    CodegenConfig,
+    StateEncoding,
+    WidthInference,
+)
 from python2verilog.simulation import iverilog
 from python2verilog.simulation.display import strip_ready, strip_valid
 
-from .utils import make_tuple
+from .utils import ir_statistics, make_tuple, synthesis_statistics
 
 
 class BaseTestWrapper:
@@ -133,49 +137,54 @@ class BaseTestWrapper:
                     "Py Yields": len(expected),
                     "Ver Clks": len(actual_with_invalid),
                 }
+                if self.args.memory:
+                    _, ir_root = context_to_codegen(get_context(verilogified))
+                    statistics.update(ir_statistics(ir_root))
                 if self.args.synthesis and self.args.write:
-                    cmd = " ".join(
-                        [
-                            "./extern/yosys/oss-cad-suite/bin/yosys",
-                            "-QT",
-                            "-fverilog",
-                            file_stem + ".sv",
-                            "-p",
-                            "'proc; opt; fsm; opt; stat'",
-                        ]
+                    statistics.update(synthesis_statistics(file_stem + ".sv"))
+
+                # (label, config, yosys fsm pass) of each variant also tested
+                variants = [
+                    # Keep the encoding, instead of letting yosys recode the FSM
+                    (
+                        encoding.value,
+                        replace(config, state_encoding=encoding),
+                        "fsm -norecode",
+                    )
+                    for encoding in map(StateEncoding, self.args.state_encodings)
+                ] + [
+                    (
+                        f"widths-{inference.value}",
+                        replace(config, width_inference=inference),
+                        "fsm",
+                    )
+                    for inference in map(WidthInference, self.args.width_inferences)
+                ]
+                for label, variant_config, fsm in variants:
+                    variant_module, variant_testbench = namespace_to_verilog(
+                        ns, variant_config
                     )
-                    logging.info(f"Running yosys for synthesis {cmd}")
-                    stdout = subprocess.check_output(
-                        cmd,
-                        shell=True,
-                        text=True,
+                    variant_actual = list(
+                        strip_valid(
+                            strip_ready(
+                                get_actual_raw(
+                                    verilogified,
+                                    variant_module,
+                                    variant_testbench,
+                                    timeout=1 + len(expected) // 8000,
+                                )
+                            )
+                        )
                     )
-                    stats = stdout[stdout.find("Printing statistics.") :]
-
-                    def snake_case(text):
-                        return re.sub(r"[\W_]+", "_", text).strip("_").lower()
-
-                    lines = stats.strip().splitlines()
-                    data = {}
-
-                    for line in lines:
-                        if ":" in line:
-                            key, value = line.split(":")
-                            key = snake_case(key).split("number_of_")[-1]
-                            value = int(value.strip())
-                        else:
-                            try:
-                                index = line.find("$") + 10
-                                value = int(line[index:].strip())
-                                key = line[:index].strip()[1:]
-                                data[key] = value
-
-                            except ValueError:
-                                continue
-
-                        data[key] = value
-                    for key, value in data.items():
-                        statistics[key] = value
+                    self.assertListEqual(variant_actual, expected, label)
+
+                    if self.args.synthesis and self.args.write:
+                        path = f"{file_stem}_{label}.sv"
+                        with open(path, mode="w") as f:
+                            f.write(variant_module)
+                        statistics[f"Cells ({label})"] = synthesis_statistics(
+                            path, fsm=fsm
+                        ).get("cells")
 
                 self.__class__.statistics.append(statistics)
 
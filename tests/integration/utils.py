@@ -1,6 +1,13 @@
+import logging
+import re
+import resource
+import subprocess
+import sys
 from types import FunctionType
 from typing import Union
 
+from python2verilog import ir
+
 
 def make_tuple(input: Union[int, tuple[int, ...]]) -> tuple[int, ...]:
     """
@@ -22,3 +29,79 @@ def name_func(testcase_func: FunctionType, _: int, param: dict) -> str:
     else:
         # If given list of funcs, use first for naming
         return f"{testcase_func.__name__}::{param.args[0][0].__name__}"
+
+
+def ir_statistics(root: ir.Element) -> dict[str, Union[int, float]]:
+    """
+    Counts the graph elements reachable from root, their average size in bytes,
+    and the peak resident set size of the process in MiB
+    """
+    visited: set[int] = set()
+    stack = [root]
+    total_bytes = 0
+    while stack:
+        element = stack.pop()
+        if id(element) in visited:
+            continue
+        visited.add(id(element))
+        total_bytes += sys.getsizeof(element)
+        if hasattr(element, "__dict__"):
+            total_bytes += sys.getsizeof(element.__dict__)
+        stack.extend(element.children())
+    return {
+        "IR Elements": len(visited),
+        "Bytes/Element": round(total_bytes / len(visited), 1),
+        "Peak RSS (MiB)": round(
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1
+        ),
+    }
+
+
+def synthesis_statistics(path: str, fsm: str = "fsm") -> dict[str, int]:
+    """
+    Synthesizes a Verilog file with yosys and parses its statistics,
+    e.g. the number of cells and the count of each cell type
+
+    :param fsm: yosys fsm pass, e.g. `fsm -norecode` to keep the state encoding
+    """
+    cmd = " ".join(
+        [
+            "./extern/yosys/oss-cad-suite/bin/yosys",
+            "-QT",
+            "-fverilog",
+            path,
+            "-p",
+            f"'proc; opt; {fsm}; opt; stat'",
+        ]
+    )
+    logging.info(f"Running yosys for synthesis {cmd}")
+    stdout = subprocess.check_output(
+        cmd,
+        shell=True,
+        text=True,
+    )
+    stats = stdout[stdout.find("Printing statistics.") :]
+
+    def snake_case(text):
+        return re.sub(r"[\W_]+", "_", text).strip("_").lower()
+
+    lines = stats.strip().splitlines()
+    data = {}
+
+    for line in lines:
+        if ":" in line:
+            key, value = line.split(":")
+            key = snake_case(key).split("number_of_")[-1]
+            value = int(value.strip())
+        else:
+            try:
+                index = line.find("$") + 10
+                value = int(line[index:].strip())
+                key = line[:index].strip()[1:]
+                data[key] = value
+
+            except ValueError:
+                continue
+
+        data[key] = value
+    return data
@@ -23,3 +23,59 @@ class TestGraph(unittest.TestCase):
         # nx.draw(g, with_labels=True, font_weight="bold")
 
         # plt.savefig("path.png")
+
+    def test_optimal_unique_id(self):
+        node = AssignNode(unique_id="assign", lvalue=Var("a"), rvalue=Int(0))
+        optimal = AssignNode(
+            unique_id=node.unique_id, optimal=3, lvalue=Var("a"), rvalue=Int(0)
+        )
+        self.assertEqual(optimal.unique_id, "assign_optimal_3")
+        self.assertIs(optimal.unique_id, optimal.unique_id)
+        self.assertNotEqual(node, optimal)
+        self.assertEqual(
+            optimal,
+            AssignNode(unique_id="assign", optimal=3, lvalue=Var("b"), rvalue=Int(1)),
+        )
+        self.assertFalse(hasattr(optimal, "__dict__"))
+        self.assertFalse(hasattr(Add(Var("a"), Int(1)), "__dict__"))
+
+    def test_arena(self):
+        done = ClockedEdge(unique_id="done")
+        node = IfElseNode(
+            unique_id="if",
+            condition=Var("a"),
+            true_edge=NonClockedEdge(
+                unique_id="true",
+                child=AssignNode(
+                    unique_id="assign", lvalue=Var("a"), rvalue=Int(0), child=done
+                ),
+            ),
+            false_edge=done,
+        )
+        done.child = node
+
+        arena = Arena(node)
+        self.assertEqual(
+            [element.unique_id for element in arena.elements],
+            ["if", "true", "assign", "done"],
+        )
+        self.assertEqual(list(arena.successors(0)), [1, 3])
+        self.assertEqual(list(arena.successors(3)), [0])
+        self.assertEqual(
+            create_networkx_adjacency_list(node)[node], [node.true_edge, done]
+        )
+        branches = [
+            element
+            for element in node.visit_nonclocked()
+            if element.name.endswith("Branch")
+        ]
+        self.assertEqual(
+            [element.unique_id for element in branches], ["if_true", "if_false"]
+        )
+
+        visited = arena.visited()
+        visited.add(arena.index(done))
+        visited.add(arena.index(done))
+        self.assertIn(3, visited)
+        self.assertNotIn(2, visited)
+        self.assertEqual(len(visited), 1)
@@ -37,6 +37,28 @@ class TestGraphApplyMapping(unittest.TestCase):
         c = 1 + 0
         """
 
+    def test_replace_shares_subtrees(self):
+        a = ir.Var("a")
+        b = ir.Var("b")
+        two = ir.Int(2)
+        expr = ir.Add(ir.Mul(a, a), ir.Sub(b, ir.Int(1)))
+
+        replaced = backwards_replace(expr, {b: two})
+        self.assertEqual(replaced, ir.Add(ir.Mul(a, a), ir.Sub(two, ir.Int(1))))
+        self.assertIs(replaced.left, expr.left)
+        self.assertIs(replaced.right.left, two)
+        self.assertEqual(expr, ir.Add(ir.Mul(a, a), ir.Sub(b, ir.Int(1))))
+
+        self.assertIs(backwards_replace(expr, {}), expr)
+
+    def test_hash_cons(self):
+        first = ir.hash_cons(ir.Add(ir.Var("a"), ir.Int(1)))
+        second = ir.hash_cons(ir.Add(ir.Var("a"), ir.Int(1)))
+        self.assertIs(first, second)
+        self.assertIs(first.left, ir.hash_cons(ir.Var("a")))
+        self.assertIsNot(first, ir.hash_cons(ir.Sub(ir.Var("a"), ir.Int(1))))
+        self.assertIsNot(first, ir.hash_cons(ir.Add(ir.Var("a", width=8), ir.Int(1))))
+
     def test_combine_var(self):
         a = ir.Var("a")
         b = ir.Var("b")
@@ -105,3 +127,113 @@ class TestGraphApplyMapping(unittest.TestCase):
         case = FsmBuilder(head.child, ir.Context()).get_case()
         # logging.error("%s", case)
         self.assertTrue("_b <= _a" in str(case))
+
+    def test_deep_graph(self):
+        """
+        A chain deeper than the recursion limit is optimized into one path
+        """
+        a = ir.Var("a")
+
+        count_inst = itertools.count()
+        ui = lambda: str(next(count_inst))
+
+        # Deeper than the default recursion limit of 1000
+        depth = 3000
+        head = ir.ClockedEdge(ui())
+        node = head
+        for i in range(depth):
+            node.child = ir.AssignNode(ui(), lvalue=a, rvalue=ir.Int(i))
+            node = node.child
+            node.child = ir.ClockedEdge(ui())
+            node = node.child
+        last = ir.AssignNode(ui(), lvalue=a, rvalue=ir.Int(depth))
+        node.child = last
+
+        IncreaseWorkPerClockCycle(head.child)
+
+        length = 0
+        node = head.child.optimal_child.child
+        while node is not last:
+            length += 1
+            node = node.child.child
+        self.assertEqual(length, depth - 1)
+
+    def test_if_else_chain(self):
+        """
+        A chain of if-else diamonds has exponentially many paths,
+        paths reaching a join in the same state share one optimal subpath
+        """
+        a = ir.Var("a")
+        c = ir.Var("c")
+
+        count_inst = itertools.count()
+        ui = lambda: str(next(count_inst))
+
+        # 2**100 paths if not shared
+        diamonds = 100
+        root = ir.AssignNode(ui(), lvalue=a, rvalue=ir.Int(0))
+        tail = root
+        for i in range(diamonds):
+            join = ir.AssignNode(ui(), lvalue=c, rvalue=ir.Add(c, ir.Int(1)))
+            arms = [
+                ir.NonClockedEdge(
+                    ui(),
+                    child=ir.AssignNode(
+                        ui(),
+                        lvalue=a,
+                        rvalue=ir.Add(a, ir.Int(1)),
+                        child=ir.NonClockedEdge(ui(), child=join),
+                    ),
+                )
+                for _ in range(2)
+            ]
+            tail.child = ir.NonClockedEdge(
+                ui(),
+                child=ir.IfElseNode(
+                    ui(),
+                    condition=ir.LessThan(c, ir.Int(i)),
+                    true_edge=arms[0],
+                    false_edge=arms[1],
+                ),
+            )
+            tail = join
+
+        IncreaseWorkPerClockCycle(root)
+
+        ifelse = root.optimal_child.child
+        for _ in range(diamonds - 1):
+            true_join = ifelse.true_edge.child.child.child
+            false_join = ifelse.false_edge.child.child.child
+            self.assertIsNot(true_join, false_join)
+            self.assertIs(true_join.child, false_join.child)
+            ifelse = true_join.child.child
+        self.assertIs(ifelse.true_edge.child.child.child, tail)
+        self.assertIs(ifelse.false_edge.child.child.child, tail)
+
+    def test_deep_fsm(self):
+        """
+        A non-clocked chain deeper than the recursion limit is built into one state
+        """
+        a = ir.Var("a")
+
+        count_inst = itertools.count()
+        ui = lambda: str(next(count_inst))
+
+        # Deeper than the default recursion limit of 1000
+        depth = 3000
+        root = ir.AssignNode(ui(), lvalue=a, rvalue=ir.Int(0))
+        node = root
+        for i in range(1, depth):
+            node.child = ir.NonClockedEdge(ui())
+            node = node.child
+            node.child = ir.AssignNode(ui(), lvalue=a, rvalue=ir.Int(i))
+            node = node.child
+        node.child = ir.ClockedEdge(ui())
+        node.child.child = root
+
+        builder = FsmBuilder(root, ir.Context())
+        case = builder.get_case()
+        self.assertEqual(len(case.case_items), 1)
+        self.assertEqual(builder.case_item_count, 1)
+        self.assertEqual(builder.statement_count, depth + 1)
+        self.assertEqual(len(case.case_items[0].statements), depth + 1)
@@ -0,0 +1,41 @@
+"""
+Functions simulated by every backend
+"""
+
+
+def stepped(base: int, limit: int, step: int) -> tuple[int, int]:
+    i = base
+    while i < limit:
+        if i % 3 == 0:
+            yield i, i // 4
+        else:
+            yield -i, i * i
+        i += step
+
+
+def hrange(n: int) -> int:
+    i = 0
+    while i < n:
+        yield i
+        i += 1
+
+
+def multiply(a: int, b: int) -> int:
+    product = 0
+    while b > 0:
+        product += a
+        b -= 1
+    return product
+
+
+def pairs(n: int) -> tuple[int, int]:
+    for i in hrange(n):
+        product = multiply(i, i + 1)
+        yield i, product
+
+
+def triangle(n: int) -> int:
+    total = 0
+    for i in hrange(n):
+        total += i
+    return total
@@ -0,0 +1,85 @@
+"""
+Every simulation backend yields the outputs of the Python functions
+"""
+
+import unittest
+from types import FunctionType
+from typing import Iterator, Union
+
+from parameterized import parameterized
+
+from python2verilog.api import verilogify
+from python2verilog.api.modes import Modes
+from python2verilog.api.verilogify import (
+    get_actual_compiled,
+    get_actual_raw_interpreted,
+    get_context,
+    get_expected,
+)
+from python2verilog.simulation.batch import BatchInterpreter
+from python2verilog.simulation.display import strip_ready, strip_valid
+
+from .functions import hrange, multiply, pairs, stepped, triangle
+
+
+def interpret(verilogified: FunctionType) -> Iterator[Union[tuple[int, ...], int]]:
+    yield from strip_valid(strip_ready(get_actual_raw_interpreted(verilogified)))
+
+
+def interpret_batch(
+    verilogified: FunctionType,
+) -> Iterator[Union[tuple[int, ...], int]]:
+    outputs, _ = BatchInterpreter(get_context(verilogified)).run()
+    for lane in outputs:
+        for row in lane.tolist():
+            yield row[0] if len(row) == 1 else tuple(row)
+
+
+BACKENDS = [
+    ("interpreter", interpret),
+    ("batch", interpret_batch),
+    ("csim", get_actual_compiled),
+]
+
+
+def verilogify_all(*funcs: FunctionType, optimization_level: int = 1) -> FunctionType:
+    """
+    Verilogifies functions into one namespace
+
+    :return: the first function verilogified
+    """
+    ns: dict = {}
+    for func in reversed(funcs):
+        verilogified = verilogify(
+            namespace=ns, optimization_level=optimization_level, mode=Modes.OVERWRITE
+        )(func)
+    return verilogified
+
+
+class TestBackends(unittest.TestCase):
+    @parameterized.expand(BACKENDS)
+    def test_matches_expected(self, _, simulate):
+        for level in range(3):
+            verilogified = verilogify_all(stepped, optimization_level=level)
+            for test_case in [(0, 20, 3), (-11, 7, 2), (5, 5, 1), (-100, 100, 7)]:
+                verilogified(*test_case)
+
+            self.assertListEqual(
+                list(simulate(verilogified)), list(get_expected(verilogified))
+            )
+
+    @parameterized.expand(BACKENDS)
+    def test_generator_instances(self, _, simulate):
+        verilogified = verilogify_all(pairs, hrange, multiply)
+        verilogified(4)
+        verilogified(6)
+        self.assertListEqual(
+            list(simulate(verilogified)), list(get_expected(verilogified))
+        )
+
+        verilogified = verilogify_all(triangle, hrange)
+        for n in range(1, 50):
+            verilogified(n)
+        self.assertListEqual(
+            list(simulate(verilogified)), list(get_expected(verilogified))
+        )
@@ -0,0 +1,40 @@
+import unittest
+
+from python2verilog.api import verilogify
+from python2verilog.api.modes import Modes
+from python2verilog.api.verilogify import get_context
+from python2verilog.simulation.batch import BatchInterpreter
+from python2verilog.simulation.display import strip_ready, strip_valid
+from python2verilog.simulation.interpreter import Interpreter
+
+from .functions import hrange, stepped, triangle
+
+
+class TestBatchInterpreter(unittest.TestCase):
+    def test_lanes(self):
+        for level in range(3):
+            ns = {}
+            verilogified = verilogify(
+                namespace=ns, optimization_level=level, mode=Modes.OVERWRITE
+            )(stepped)
+            test_cases = [(0, 20, 3), (-11, 7, 2), (5, 5, 1), (-100, 100, 7)]
+            for test_case in test_cases:
+                verilogified(*test_case)
+
+            outputs, cycles = BatchInterpreter(get_context(verilogified)).run()
+            for i, test_case in enumerate(test_cases):
+                interpreter = Interpreter(get_context(verilogified))
+                rows = list(strip_valid(strip_ready(interpreter.run([test_case]))))
+                self.assertListEqual(list(map(tuple, outputs[i].tolist())), rows)
+                # Interpreter also counts the reset cycle
+                self.assertEqual(cycles[i], interpreter.cycles - 1)
+
+    def test_cycles(self):
+        ns = {}
+        verilogify(namespace=ns, mode=Modes.OVERWRITE)(hrange)
+        verilogified = verilogify(namespace=ns, mode=Modes.OVERWRITE)(triangle)
+        for n in range(1, 50):
+            verilogified(n)
+
+        _, cycles = BatchInterpreter(get_context(verilogified)).run()
+        self.assertTrue(all(cycles[:-1] < cycles[1:]))
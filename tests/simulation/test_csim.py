@@ -0,0 +1,63 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from python2verilog.api import verilogify
+from python2verilog.api.modes import Modes
+from python2verilog.api.verilogify import get_context, get_expected
+from python2verilog.simulation.csim import CSimulator
+from python2verilog.simulation.interpreter import Interpreter
+from python2verilog.utils import env
+
+from .functions import hrange, stepped
+
+
+class TestCSimulator(unittest.TestCase):
+    def test_cycles(self):
+        for level in range(3):
+            ns = {}
+            verilogified = verilogify(
+                namespace=ns, optimization_level=level, mode=Modes.OVERWRITE
+            )(stepped)
+            for test_case in [(0, 20, 3), (-11, 7, 2), (5, 5, 1), (-100, 100, 7)]:
+                verilogified(*test_case)
+
+            simulator = CSimulator(get_context(verilogified))
+            # Small chunks resume the simulation mid test case
+            self.assertListEqual(
+                list(simulator.run(chunk=3)), list(get_expected(verilogified))
+            )
+            interpreter = Interpreter(get_context(verilogified))
+            list(interpreter.run())
+            self.assertEqual(simulator.cycles, interpreter.cycles)
+
+            with self.assertRaises(RuntimeError):
+                list(simulator.run(max_cycles=10))
+
+    def test_long_running(self):
+        ns = {}
+        count = verilogify(namespace=ns, mode=Modes.OVERWRITE)(hrange)
+        count(1)
+        simulator = CSimulator(get_context(count))
+        self.assertEqual(sum(simulator.run([(1_000_000,)])), sum(range(1_000_000)))
+
+    def test_evict(self):
+        previous = env.get_var(env.Vars.CACHE_SIZE)
+        with tempfile.TemporaryDirectory() as directory:
+            simulators = []
+            try:
+                env.set_var(env.Vars.CACHE_SIZE, "1")
+                for func, test_case in ((hrange, (5,)), (stepped, (0, 20, 3))):
+                    ns = {}
+                    verilogified = verilogify(namespace=ns, mode=Modes.OVERWRITE)(func)
+                    verilogified(*test_case)
+                    simulators.append(
+                        CSimulator(get_context(verilogified), directory=directory)
+                    )
+            finally:
+                env.set_var(env.Vars.CACHE_SIZE, previous)
+
+            # Only the most recently compiled shared object is kept
+            self.assertListEqual(list(Path(directory).iterdir()), [simulators[1].path])
+            # A loaded shared object still runs after it is evicted
+            self.assertListEqual(list(simulators[0].run()), list(range(5)))
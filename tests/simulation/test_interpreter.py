@@ -0,0 +1,90 @@
+import unittest
+
+from python2verilog import ir
+from python2verilog.api import verilogify
+from python2verilog.api.modes import Modes
+from python2verilog.api.namespace import namespace_to_verilog
+from python2verilog.api.verilogify import (
+    get_actual_raw,
+    get_actual_raw_interpreted,
+    get_context,
+    get_expected,
+)
+from python2verilog.backend.verilog.config import CodegenConfig
+from python2verilog.simulation.display import strip_ready, strip_valid
+from python2verilog.simulation.interpreter import Interpreter, evaluate
+
+from .functions import hrange, stepped
+
+
+class TestInterpreter(unittest.TestCase):
+    def test_evaluate(self):
+        values = {"_a": -7, "_b": 2, "_x": None}
+        a, b, x = ir.Var("a"), ir.Var("b"), ir.Var("x")
+        self.assertEqual(evaluate(ir.FloorDiv(a, b), values), -7 // 2)
+        self.assertEqual(evaluate(ir.Mod(a, b), values), -7 % 2)
+        self.assertEqual(evaluate(ir.Div(a, b), values), -3)
+        self.assertEqual(evaluate(ir.Mul(ir.Int(1 << 30), b), values), -(1 << 31))
+
+        # Unknown values
+        self.assertIsNone(evaluate(ir.Add(a, x), values))
+        self.assertEqual(evaluate(ir.UBinOp(ir.Int(0), "&&", x), values), 0)
+        self.assertEqual(evaluate(ir.UBinOp(ir.Int(1), "||", x), values), 1)
+        self.assertIsNone(evaluate(ir.UBinOp(ir.Int(1), "&&", x), values))
+
+    def test_random_ready(self):
+        for level in range(3):
+            ns = {}
+            verilogified = verilogify(
+                namespace=ns, optimization_level=level, mode=Modes.OVERWRITE
+            )(stepped)
+            verilogified(0, 20, 3)
+            verilogified(-11, 7, 2)
+
+            actual = strip_valid(
+                strip_ready(
+                    get_actual_raw_interpreted(
+                        verilogified, CodegenConfig(random_ready=True)
+                    )
+                )
+            )
+            self.assertListEqual(list(actual), list(get_expected(verilogified)))
+
+    def test_cycles(self):
+        cycles = []
+        for level in (0, 1):
+            ns = {}
+            count = verilogify(
+                namespace=ns, optimization_level=level, mode=Modes.OVERWRITE
+            )(hrange)
+            count(10)
+
+            interpreter = Interpreter(get_context(count))
+            rows = list(interpreter.run())
+            self.assertListEqual(list(strip_valid(strip_ready(rows))), list(range(10)))
+            cycles.append(interpreter.cycles)
+
+            with self.assertRaises(RuntimeError):
+                list(Interpreter(get_context(count)).run(max_cycles=5))
+        self.assertLess(cycles[1], cycles[0])
+
+    def test_matches_iverilog(self):
+        ns = {}
+
+        @verilogify(namespace=ns, mode=Modes.OVERWRITE)
+        def fib(n):
+            a, b = 0, 1
+            while n > 0:
+                yield a
+                a, b = b, a + b
+                n -= 1
+
+        fib(10)
+        fib(3)
+
+        config = CodegenConfig(random_ready=True)
+        module, testbench = namespace_to_verilog(ns, config)
+        self.assertListEqual(
+            list(strip_ready(get_actual_raw_interpreted(fib, config))),
+            list(strip_ready(get_actual_raw(fib, module, testbench, timeout=1))),
+        )
@@ -1,9 +1,15 @@
 import unittest
 
-from python2verilog.simulation.iverilog import make_cmd
+from python2verilog.simulation.iverilog import compile_args, make_cmd
 
 
 class TestIVerilog(unittest.TestCase):
     def test_basics(self):
         result = make_cmd("name", ["a.sv", "b.sv"])
         self.assertTrue(result)
+        self.assertNotIn("unbuffer", result)
+
+    def test_compile_args(self):
+        args = compile_args("name", ["a.sv", "b c.sv"], "image.vvp")
+        self.assertEqual(args[-2:], ["-o", "image.vvp"])
+        self.assertIn("b c.sv", args)
@@ -1,3 +1,4 @@
+import io
 import logging
 import tempfile
 import unittest
@@ -13,8 +14,27 @@ from python2verilog.api.namespace import (
     namespace_to_verilog,
     new_namespace,
 )
-from python2verilog.api.verilogify import get_actual, get_actual_raw, get_expected
-from python2verilog.simulation import iverilog
+from python2verilog.api.verilogify import (
+    get_actual,
+    get_actual_raw,
+    get_actual_raw_parallel,
+    get_actual_streamed,
+    get_context,
+    get_expected,
+    verify_streamed,
+)
+from python2verilog.backend.verilog.config import CodegenConfig, WidthInference
+from python2verilog.exceptions import OutputMismatchError, TruncatedRecordError
+from python2verilog.simulation import iverilog, pool
+from python2verilog.simulation.display import (
+    parse_records,
+    parse_stdout,
+    strip_ready,
+    strip_records,
+    strip_valid,
+)
+from python2verilog.simulation.verify import compare_records
+from python2verilog.utils import env
 
 
 @pytest.mark.usefixtures("argparse")
@@ -98,6 +118,225 @@ def func() -> int:
             list(get_expected(dup_range_goal)),
         )
 
+    def test_image(self):
+        ns = {}
+
+        @verilogify(namespace=ns)
+        def count(n):
+            i = 0
+            while i < n:
+                yield i
+                i += 1
+
+        for n in (3, 5):
+            count(n)
+
+        module, testbench = namespace_to_verilog(ns)
+        expected = list(get_actual_raw(count, module, testbench, timeout=1))
+
+        module, testbench = namespace_to_verilog(
+            ns, CodegenConfig(read_test_cases=True)
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            image = iverilog.VvpImage(
+                get_context(count).testbench_name, [module, testbench], directory
+            )
+            stdout, err = image.run_test_cases([(3,), (5,)], timeout=1)
+            self.assertFalse(err)
+            self.assertListEqual(list(parse_stdout(stdout)), expected)
+
+            # Same design is not recompiled, new inputs reuse the image
+            self.assertEqual(
+                iverilog.VvpImage(
+                    get_context(count).testbench_name, [module, testbench], directory
+                ).path,
+                image.path,
+            )
+            stdout, err = image.run_test_cases([(2,)], timeout=1)
+            self.assertFalse(err)
+            self.assertListEqual(
+                list(strip_valid(strip_ready(parse_stdout(stdout)))), [0, 1]
+            )
+
+    def test_parallel(self):
+        ns = {}
+
+        @verilogify(namespace=ns)
+        def count(n):
+            i = 0
+            while i < n:
+                yield i
+                i += 1
+
+        for n in range(1, 12):
+            count(n)
+
+        module, testbench = namespace_to_verilog(ns)
+        serial = list(get_actual_raw(count, module, testbench))
+        self.assertListEqual(
+            list(strip_valid(strip_ready(serial))), list(get_expected(count))
+        )
+
+        module, testbench = namespace_to_verilog(
+            ns, CodegenConfig(read_test_cases=True)
+        )
+        self.assertListEqual(
+            list(get_actual_raw_parallel(count, module, testbench, processes=4)),
+            serial,
+        )
+
+        # The ready pattern restarts for each test case, so only outputs match
+        module, testbench = namespace_to_verilog(
+            ns, CodegenConfig(random_ready=True, read_test_cases=True)
+        )
+        self.assertListEqual(
+            list(
+                strip_valid(
+                    strip_ready(
+                        get_actual_raw_parallel(count, module, testbench, processes=4)
+                    )
+                )
+            ),
+            list(strip_valid(strip_ready(serial))),
+        )
+
+    def test_stream(self):
+        ns = {}
+
+        @verilogify(namespace=ns)
+        def pairs(n):
+            i = 0
+            while i < n:
+                yield i, -i
+                i += 1
+
+        for n in (3, 5):
+            pairs(n)
+
+        for config in (
+            CodegenConfig(stream_display=True),
+            CodegenConfig(stream_display=True, random_ready=True, read_test_cases=True),
+        ):
+            module, testbench = namespace_to_verilog(ns, config)
+            self.assertListEqual(
+                list(get_actual_streamed(pairs, module, testbench, timeout=1)),
+                list(get_expected(pairs)),
+            )
+
+    def test_stream_failure(self):
+        ns = {}
+
+        @verilogify(namespace=ns)
+        def count(n):
+            i = 0
+            while i < n:
+                yield i
+                i += 1
+
+        count(3)
+
+        module, testbench = namespace_to_verilog(
+            ns, CodegenConfig(stream_display=True, read_test_cases=True)
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            image = iverilog.VvpImage(
+                get_context(count).testbench_name, [module, testbench], directory
+            )
+            missing = str(Path(directory) / "missing.txt")
+            with self.assertRaises(RuntimeError):
+                list(image.stream(1, {"test_cases": missing}, timeout=1))
+
+    def test_parse_records(self):
+        records = b"10xxxxxxxx\n11ffffffff\n1100000005\n0100000007\n"
+        self.assertListEqual(
+            list(parse_records(io.BytesIO(records), 1, chunk=3)),
+            [(1, 0, None), (1, 1, -1), (1, 1, 5), (0, 1, 7)],
+        )
+        self.assertListEqual(
+            list(strip_records(parse_records(io.BytesIO(records), 1))), [-1, 5]
+        )
+        with self.assertRaises(TruncatedRecordError):
+            list(parse_records(io.BytesIO(records[:-1]), 1))
+
+    def test_verify(self):
+        ns = {}
+
+        @verilogify(namespace=ns)
+        def count(n):
+            i = 0
+            while i < n:
+                yield i
+                i += 1
+
+        for n in (3, 500):
+            count(n)
+
+        module, testbench = namespace_to_verilog(ns, CodegenConfig(stream_display=True))
+        self.assertEqual(verify_streamed(count, module, testbench, timeout=1), 503)
+
+        # Counts by 2 instead
+        module = module.replace("$signed(1)", "$signed(2)")
+        with self.assertRaises(OutputMismatchError) as error:
+            verify_streamed(count, module, testbench, timeout=1)
+        self.assertEqual(error.exception.test_case, (3,))
+        self.assertEqual(error.exception.output_index, 1)
+        self.assertEqual(error.exception.actual, 2)
+
+    def test_compare_records(self):
+        records = [(1, 0, 7), (1, 1, 0), (1, 1, 1), (0, 1, 9), (1, 1, 5)]
+        expected = [((2,), [0, 1]), ((1,), [5])]
+        self.assertEqual(compare_records(records, expected), 3)
+
+        with self.assertRaises(OutputMismatchError) as error:
+            compare_records(records, [((2,), [0, 1]), ((1,), [6])])
+        self.assertEqual(error.exception.test_case_index, 1)
+        self.assertEqual(error.exception.row, 4)
+
+        with self.assertRaises(OutputMismatchError) as error:
+            compare_records(records, [((2,), [0, 1])])
+        self.assertIsNone(error.exception.expected)
+
+        with self.assertRaises(OutputMismatchError) as error:
+            compare_records(records, expected + [((1,), [8])])
+        self.assertIsNone(error.exception.actual)
+
+    def test_pool(self):
+        ns = {}
+
+        @verilogify(namespace=ns)
+        def count(n):
+            i = 0
+            while i < n:
+                yield i
+                i += 1
+
+        for n in (3, 5):
+            count(n)
+
+        module, testbench = namespace_to_verilog(ns)
+        env.set_var(env.Vars.SIMULATION_POOL, "2")
+        try:
+            simulation_pool = pool.get_pool()
+            self.assertIsNotNone(simulation_pool)
+            for _ in range(4):  # Workers reuse their fifos
+                self.assertListEqual(
+                    list(get_actual(count, module, testbench, timeout=1)),
+                    list(get_expected(count)),
+                )
+            self.assertIs(pool.get_pool(), simulation_pool)
+
+            # Recreated with the new number of workers
+            env.set_var(env.Vars.SIMULATION_POOL, "1")
+            self.assertIsNot(pool.get_pool(), simulation_pool)
+            self.assertListEqual(
+                list(get_actual(count, module, testbench, timeout=1)),
+                list(get_expected(count)),
+            )
+        finally:
+            env.set_var(env.Vars.SIMULATION_POOL, None)
+            pool.shutdown_pool()
+        self.assertIsNone(pool.get_pool())
+
     def test_o1(self):
         ns = {}
 
@@ -413,3 +652,22 @@ def func() -> int:
             list(get_actual(read32to8_2, module, testbench, timeout=1)),
             list(get_expected(read32to8_2)),
         )
+
+    def test_out_of_range_input(self):
+        ns = {}
+
+        @verilogify(namespace=ns)
+        def square(n):
+            yield n * n
+
+        square(3)
+        square(-5)
+        config = CodegenConfig(width_inference=WidthInference.TEST_CASES)
+        module, _ = namespace_to_verilog(ns, config)
+        self.assertIn("reg signed [3:0] _n;", module)
+
+        # Outside of the recorded range of -5 to 3, which _n cannot hold
+        square(1000)
+        _, testbench = namespace_to_verilog(ns, config)
+        with self.assertRaises(ValueError):
+            list(strip_ready(get_actual_raw(square, module, testbench, timeout=1)))
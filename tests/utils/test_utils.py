@@ -1,6 +1,7 @@
+import io
 import unittest
 
-from python2verilog.utils.lines import Indent, Lines
+from python2verilog.utils.lines import Indent, Lines, LinesWriter, LineWriter
 
 
 class TestLines(unittest.TestCase):
@@ -56,3 +57,27 @@ class TestIndent(unittest.TestCase):
             self.assertEqual("abc 123" + Indent.indentor * i, "abc 123" + Indent(i))
             self.assertRaises(AssertionError, lambda: i + Indent(i))
             self.assertRaises(AssertionError, lambda: Indent(i) + None)
+
+
+class TestLineWriter(unittest.TestCase):
+    def test_all(self):
+        lines = Lines(["abc 123", "", "def 456"])
+        for buffer_size in (1, 2, 4096):
+            for indent in range(3):
+                stream = io.StringIO()
+                writer = LineWriter(stream, buffer_size)
+                writer.lines(lines, indent)
+                writer.flush()
+                self.assertEqual(lines.to_string(indent), stream.getvalue())
+
+    def test_lines_writer(self):
+        lines = Lines(["abc 123", "", "def 456"])
+        for indent in range(3):
+            written = Lines()
+            writer = LinesWriter(written)
+            writer.lines(lines, indent)
+            writer.line("ghi\n789", indent)
+            self.assertEqual(
+                written.to_string(),
+                lines.to_string(indent) + Lines(["ghi", "789"]).to_string(indent),
+            )